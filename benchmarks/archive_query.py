@@ -0,0 +1,105 @@
+"""
+Fills a schedule archive with synthetic months and times its per-worker queries.
+
+Usage:
+    python -m benchmarks.archive_query [--firms 20] [--workers 500] [--months 24] [--repeat 5]
+"""
+import argparse
+import calendar
+import statistics
+import tempfile
+import time
+from datetime import date
+from typing import Callable, Dict
+
+import numpy as np
+
+from mysite.archive import ScheduleArchive, month_index, months_back
+from mysite.bitset import CompactSchedule, pack_days
+
+
+def fill(
+        archive: ScheduleArchive,
+        firms: int,
+        workers: int,
+        months: int,
+        rng: np.random.Generator
+) -> float:
+    """
+    Appends one random schedule per firm and month ending with the current month.
+
+    Args:
+        archive (ScheduleArchive): The empty archive.
+        firms (int): The number of firms.
+        workers (int): The number of workers per firm.
+        months (int): The number of months.
+        rng (np.random.Generator): The random generator.
+
+    Returns:
+        float: The seconds spent appending.
+    """
+    today = date.today()
+    first = month_index(today.year, today.month) - months + 1
+    names = [f'Worker {index}' for index in range(workers)]
+    empty = np.zeros(workers, dtype=np.uint32)
+
+    spent = 0.0
+    for index in range(first, first + months):
+        year, month = divmod(index, 12)
+        days = calendar.monthrange(year, month + 1)[1]
+        columns = [str(day) for day in range(1, days + 1)]
+        for firm in range(firms):
+            work = pack_days(rng.random((workers, days)) < 0.7)
+            compact = CompactSchedule(work, empty, empty, names, columns, 'Boss', f'Firm {firm}')
+            started = time.perf_counter()
+            archive.append(compact, year, month + 1)
+            spent += time.perf_counter() - started
+    return spent
+
+
+def timed(
+        query: Callable[[], Dict[str, int]],
+        repeat: int
+) -> float:
+    """
+    Returns the median seconds of a query.
+    """
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        query()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--firms', type=int, default=20)
+    parser.add_argument('--workers', type=int, default=500)
+    parser.add_argument('--months', type=int, default=24)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        archive = ScheduleArchive(folder)
+        spent = fill(archive, args.firms, args.workers, args.months, np.random.default_rng(0))
+        appends = args.firms * args.months
+        print(f"{appends} appends in {spent:.2f}s ({spent / appends * 1000:.2f} ms each)")
+        print(f"{archive.worker_days():,} worker-days")
+
+        started = time.perf_counter()
+        archive.compact()
+        print(f"compact {time.perf_counter() - started:.3f}s")
+
+        since = months_back(12)
+        queries = {
+            'days worked, last 12 months': lambda: archive.days_worked(since=since),
+            'days worked, one firm': lambda: archive.days_worked(firm='Firm 0', since=since),
+            'weekend load, all months': archive.weekend_load
+        }
+        for name, query in queries.items():
+            print(f"{name:>30} {timed(query, args.repeat) * 1000:>8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
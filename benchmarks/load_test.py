@@ -0,0 +1,301 @@
+"""
+Drives the whole wizard with concurrent virtual users against a local server.
+
+The app from create_app runs on a threaded werkzeug server with a file-backed SQLite
+database, and the emails go to a local SMTP sink. Every virtual user repeats the flow
+/, /second_step, /third_step, /fourth_step, /fifth_step (confirm and send), waits for
+its email and ends with /cleanup_session.
+
+Usage:
+    python -m benchmarks.load_test [--users 8] [--flows 5] [--workers 20]
+                                   [--think 0] [--output load.json]
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from http.cookiejar import CookieJar
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from benchmarks.smtp_sink import SmtpSink
+
+WEEKDAYS = ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')
+EMAIL_ROUTE = 'email delivered'
+
+
+def make_flow(
+        creator: str,
+        workers: int,
+        rng: random.Random
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Builds the form payloads of one pass through the wizard.
+
+    Args:
+        creator (str): The creator name, which has to be unique among the stored drafts.
+        workers (int): The roster size.
+        rng (random.Random): The random generator.
+
+    Returns:
+        Dict[str, Dict[str, Any]]: The form fields of every step.
+    """
+    personal = []
+    for _ in range(workers):
+        days = rng.sample(range(1, 29), rng.randint(0, 3))
+        personal.append(','.join(str(day) for day in sorted(days)))
+    headcount = max(1, workers // 2)
+    return {
+        '/second_step': {'creator': creator, 'firm_name': 'Bench', 'number': str(workers)},
+        '/third_step': {
+            'names[]': [f'Worker {index}' for index in range(workers)],
+            'days[]': [str(rng.randint(8, 10)) for _ in range(workers)],
+            'personal[]': personal
+        },
+        '/fourth_step': {day: str(headcount) for day in WEEKDAYS}
+    }
+
+
+class VirtualUser:
+    """
+    A browser session with its own cookies that records the latency of every request.
+    """
+
+    def __init__(
+            self,
+            base_url: str,
+            samples: Dict[str, List[Tuple[float, bool]]],
+            lock: threading.Lock
+    ) -> None:
+        self.base_url = base_url
+        self.samples = samples
+        self.lock = lock
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(CookieJar()))
+
+    def record(self, route: str, seconds: float, ok: bool) -> None:
+        with self.lock:
+            self.samples[route].append((seconds, ok))
+
+    def request(
+            self,
+            route: str,
+            data: Optional[Dict[str, Any]] = None,
+            label: Optional[str] = None
+    ) -> bool:
+        body = urllib.parse.urlencode(data, doseq=True).encode() if data is not None else None
+        started = time.perf_counter()
+        try:
+            with self.opener.open(self.base_url + route, body, timeout=120) as response:
+                response.read()
+                ok = response.status < 400
+        except (urllib.error.URLError, OSError):
+            ok = False
+        self.record(label or route, time.perf_counter() - started, ok)
+        return ok
+
+    def run_flow(
+            self,
+            flow: Dict[str, Dict[str, Any]],
+            email: str,
+            sink: SmtpSink,
+            think: float,
+            email_timeout: float
+    ) -> bool:
+        """
+        Walks through the wizard once and returns whether every step succeeded.
+        """
+        steps = [
+            ('/', None, None),
+            ('/second_step', flow['/second_step'], None),
+            ('/third_step', flow['/third_step'], None),
+            ('/fourth_step', flow['/fourth_step'], None),
+            ('/fifth_step', {'email': email, 'fileType': 'xlsx'}, None),
+            ('/fifth_step', {'email': email, 'fileType': 'xlsx', 'send_file': 'true'},
+             '/fifth_step (send)')
+        ]
+        ok = True
+        for route, data, label in steps:
+            sent = time.perf_counter()
+            ok = self.request(route, data, label) and ok
+            time.sleep(think)
+
+        # The email latency runs from the send request until the sink has the message.
+        while sink.delivered(email) is None and time.perf_counter() - sent < email_timeout:
+            time.sleep(0.01)
+        delivered = sink.delivered(email)
+        self.record(EMAIL_ROUTE, (delivered or time.perf_counter()) - sent, delivered is not None)
+
+        return self.request('/cleanup_session', {}) and ok and delivered is not None
+
+
+def summarize(
+        samples: Dict[str, List[Tuple[float, bool]]],
+        elapsed: float
+) -> Dict[str, Any]:
+    """
+    Computes the latency percentiles and the error rate of every route and the throughput.
+
+    Args:
+        samples (Dict[str, List[Tuple[float, bool]]]): The latency and success of every request by route.
+        elapsed (float): The wall time of the run in seconds.
+
+    Returns:
+        Dict[str, Any]: The per-route statistics and the totals.
+    """
+    routes = {}
+    for route, records in samples.items():
+        latencies = np.array([seconds for seconds, _ in records])
+        errors = sum(1 for _, ok in records if not ok)
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        routes[route] = {
+            'requests': len(records),
+            'errors': errors,
+            'p50': float(p50),
+            'p95': float(p95),
+            'p99': float(p99),
+            'mean': statistics.fmean(latencies)
+        }
+    requests = sum(len(records) for route, records in samples.items() if route != EMAIL_ROUTE)
+    errors = sum(
+        route['errors'] for name, route in routes.items() if name != EMAIL_ROUTE
+    )
+    return {
+        'routes': routes,
+        'elapsed': elapsed,
+        'requests': requests,
+        'requests_per_second': requests / elapsed,
+        'error_rate': errors / requests if requests else 0.0
+    }
+
+
+def run(
+        users: int,
+        flows: int,
+        workers: int,
+        think: float,
+        email_timeout: float,
+        seed: int
+) -> Dict[str, Any]:
+    """
+    Starts the SMTP sink and the server and runs every virtual user's flows.
+
+    Args:
+        users (int): The number of concurrent virtual users.
+        flows (int): The number of wizard passes per user.
+        workers (int): The roster size of every schedule.
+        think (float): The seconds a user waits between steps.
+        email_timeout (float): The seconds a user waits for its email.
+        seed (int): The seed of the generated rosters.
+
+    Returns:
+        Dict[str, Any]: The statistics, see summarize, with the completed flows per second.
+    """
+    sink = SmtpSink()
+    threading.Thread(target=sink.serve_forever, daemon=True).start()
+
+    # The exports and the archive are written to the working directory.
+    folder = tempfile.mkdtemp(prefix='schedule-load-')
+    cwd = os.getcwd()
+    os.chdir(folder)
+    # The mail queue and the configs read the environment when mysite is first imported.
+    os.environ.update({
+        'SMTP_HOST': '127.0.0.1', 'SMTP_PORT': str(sink.server_address[1]), 'SMTP_SSL': '0',
+        'SMTP_RETRY_BACKOFF': '0.05'
+    })
+
+    from werkzeug.serving import make_server
+
+    from mysite.app import create_app
+    from mysite.config import TestConfig
+    from mysite.processor import create_database_structure
+
+    class LoadTestConfig(TestConfig):
+        KEY = 'load-test'
+        DATA_BASE = f"sqlite:///{os.path.join(folder, 'load.db')}"
+        METRICS_ENABLED = True
+
+    app = create_app(LoadTestConfig)
+    create_database_structure(app)
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f'http://127.0.0.1:{server.server_port}'
+
+    samples: Dict[str, List[Tuple[float, bool]]] = defaultdict(list)
+    lock = threading.Lock()
+
+    def user(index: int) -> int:
+        rng = random.Random(seed + index)
+        client = VirtualUser(base_url, samples, lock)
+        completed = 0
+        for flow in range(flows):
+            email = f'user{index}-{flow}@load.test'
+            payload = make_flow(f'Load Test {index}-{flow}', workers, rng)
+            completed += client.run_flow(payload, email, sink, think, email_timeout)
+        return completed
+
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=users) as executor:
+            completed = sum(executor.map(user, range(users)))
+        elapsed = time.perf_counter() - started
+    finally:
+        server.shutdown()
+        sink.shutdown()
+        os.chdir(cwd)
+        shutil.rmtree(folder, ignore_errors=True)
+
+    result = summarize(samples, elapsed)
+    result['flows'] = users * flows
+    result['completed_flows'] = completed
+    result['flows_per_second'] = completed / elapsed
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', type=int, default=8, help='concurrent virtual users')
+    parser.add_argument('--flows', type=int, default=5, help='wizard passes per user')
+    parser.add_argument('--workers', type=int, default=20, help='roster size')
+    parser.add_argument('--think', type=float, default=0.0, help='seconds between steps')
+    parser.add_argument('--email-timeout', type=float, default=30.0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='a JSON file to save the results to')
+    args = parser.parse_args()
+
+    result = run(args.users, args.flows, args.workers, args.think, args.email_timeout, args.seed)
+
+    print(f"{'route':>20} {'requests':>9} {'errors':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for route, stats in result['routes'].items():
+        print(
+            f"{route:>20} {stats['requests']:>9} {stats['errors']:>7} "
+            f"{stats['p50'] * 1000:>9.1f} {stats['p95'] * 1000:>9.1f} {stats['p99'] * 1000:>9.1f}"
+        )
+    print(
+        f"\n{result['completed_flows']}/{result['flows']} flows in {result['elapsed']:.2f}s, "
+        f"{result['flows_per_second']:.2f} flows/s, {result['requests_per_second']:.1f} requests/s, "
+        f"error rate {result['error_rate']:.2%}"
+    )
+
+    if args.output:
+        from benchmarks.pipeline import metadata
+
+        with open(args.output, 'w') as file:
+            json.dump({'meta': metadata(), 'args': vars(args), **result}, file, indent=2)
+        print(f"saved to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Compares solving many locations one after another with the sharded solve on the process pool.
+
+Usage:
+    python -m benchmarks.locations [--locations 4 16 64] [--workers 200] [--restarts 2]
+"""
+import argparse
+import calendar
+import os
+import random
+import time
+from typing import List
+
+import numpy as np
+
+from mysite.drafts import Draft, Worker
+from mysite.locations import Location, solve_locations
+from mysite.processor import _get_pool, generate_attempt
+
+YEAR, MONTH = 2025, 3
+
+
+def make_locations(
+        count: int,
+        workers: int,
+        seed: int = 0
+) -> List[Location]:
+    """
+    Builds synthetic locations with random personal days off.
+
+    Args:
+        count (int): The number of locations.
+        workers (int): The roster size of every location.
+        seed (int): The seed of the rosters.
+
+    Returns:
+        List[Location]: The locations.
+    """
+    rng = random.Random(seed)
+    locations = []
+    for index in range(count):
+        roster = [
+            Worker(f'Worker {worker}', rng.randint(8, 10), tuple(sorted(rng.sample(range(1, 29), 2))))
+            for worker in range(workers)
+        ]
+        draft = Draft('Bench', 'Firm', tuple(roster), (max(1, workers // 2),) * 7)
+        locations.append(Location(f'Store {index}', draft))
+    return locations
+
+
+def solve_sequentially(
+        locations: List[Location],
+        restarts: int
+) -> None:
+    """
+    Solves every attempt of every location in this process.
+    """
+    start_weekday, days_in_month = calendar.monthrange(YEAR, MONTH)
+    for location, child in zip(locations, np.random.SeedSequence(0).spawn(len(locations))):
+        draft = location.draft
+        for seed in child.spawn(restarts):
+            generate_attempt(
+                'numpy', draft.dict_days, draft.off_days, start_weekday, draft.weekly_plan,
+                days_in_month, seed, 1.0
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--locations', type=int, nargs='+', default=[4, 16, 64])
+    parser.add_argument('--workers', type=int, default=200)
+    parser.add_argument('--restarts', type=int, default=2)
+    args = parser.parse_args()
+
+    _get_pool().submit(int).result()
+    print(f"{os.cpu_count()} CPUs, {args.workers} workers per location, {args.restarts} restarts")
+    print(f"{'locations':>10} {'sequential':>12} {'pool':>10} {'speedup':>8}")
+    for count in args.locations:
+        locations = make_locations(count, args.workers)
+
+        started = time.perf_counter()
+        solve_sequentially(locations, args.restarts)
+        sequential = time.perf_counter() - started
+
+        started = time.perf_counter()
+        solve_locations(locations, YEAR, MONTH, 'numpy', seed=0, restarts=args.restarts)
+        pooled = time.perf_counter() - started
+
+        print(f"{count:>10} {sequential:>11.2f}s {pooled:>9.2f}s {sequential / pooled:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
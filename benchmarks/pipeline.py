@@ -0,0 +1,324 @@
+"""
+Benchmarks every stage of the scheduling pipeline across roster sizes and month shapes.
+
+Usage:
+    python -m benchmarks.pipeline [--workers 10 100 1000 10000] [--engines numpy pandas]
+                                  [--densities sparse dense] [--shapes all|sample]
+                                  [--formats csv xlsx] [--output results.json]
+                                  [--compare baseline.json]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from mysite.drafts import as_draft
+from mysite.engine import (UNCOVERED, WorkerState, assign_days, balance_days_off,
+                           frame_to_matrix, mark_uncovered, matrix_to_frame,
+                           off_day_mask, weekly_demand)
+from mysite.processor import (SOLVERS, add_creator_row, generate_attempt,
+                              generate_calendar_labels, look_column,
+                              validate_schedule_with_question_marks)
+
+DENSITIES = {
+    'sparse': (0, 1),
+    'medium': (2, 4),
+    'dense': (6, 10)
+}
+DAYS_IN_MONTH = (28, 29, 30, 31)
+SAMPLE_SHAPES = ((28, 0), (30, 3), (31, 6))
+
+
+def make_data(
+        workers: int,
+        density: str,
+        seed: int = 0
+) -> List[Dict[str, Any]]:
+    """
+    Builds synthetic table records as read by drafts.draft_from_records.
+
+    Args:
+        workers (int): The number of workers.
+        density (str): The amount of personal days off, one of DENSITIES.
+        seed (int): The seed of the synthetic roster.
+
+    Returns:
+        List[Dict[str, Any]]: The creator record, the worker records and the weekly plan record.
+    """
+    rng = random.Random(seed)
+    low, high = DENSITIES[density]
+    data = [{'id': 1, 'user_id': 'benchmark', 'creator': 'Benchmark',
+             'firm_name': 'Benchmark', 'number': workers}]
+    for index in range(workers):
+        personal = sorted(rng.sample(range(1, 29), rng.randint(low, high)))
+        data.append({
+            'id': index + 1,
+            'user_id': 'benchmark',
+            'name': f'Worker {index}',
+            'days': rng.randint(7, 10),
+            'personal': ','.join(map(str, personal))
+        })
+    week = [str(max(1, workers * share // 100)) for share in (60, 60, 60, 60, 65, 50, 45)]
+    data.append({'id': 1, 'user_id': 'benchmark', 'week': str(week)})
+    return data
+
+
+def measure(
+        stage: Callable[[], Any],
+        memory: bool
+) -> Tuple[Any, float, Optional[int]]:
+    """
+    Runs a stage, timing it and optionally tracing its peak memory in a second run.
+
+    Args:
+        stage (Callable[[], Any]): The stage to run.
+        memory (bool): Whether to trace the peak memory.
+
+    Returns:
+        Tuple[Any, float, Optional[int]]: The stage result, the wall time in seconds and the peak traced bytes.
+    """
+    started = time.perf_counter()
+    result = stage()
+    seconds = time.perf_counter() - started
+
+    peak = None
+    if memory:
+        tracemalloc.start()
+        stage()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result, seconds, peak
+
+
+def question_marks(
+        value: Any
+) -> Optional[int]:
+    """
+    Counts the "?" cells of a schedule matrix or grid, None for other stage results.
+    """
+    if isinstance(value, np.ndarray) and value.ndim == 2:
+        return int((value == UNCOVERED).sum())
+    if isinstance(value, pd.DataFrame):
+        return int((value == '?').to_numpy().sum())
+    return None
+
+
+def solver_stages(
+        engine: str,
+        data: List[Dict[str, Any]],
+        days_in_month: int,
+        start_weekday: int
+) -> Iterator[Tuple[str, Callable[[], Any]]]:
+    """
+    Yields the scheduling stages of an engine, each one working on the previous result.
+
+    The stages are closures; every one copies its input so it can be run twice.
+    """
+    draft = as_draft(data)
+    dict_days, off_days, weekly_plan = draft.dict_days, draft.off_days, draft.weekly_plan
+    state: Dict[str, Any] = {}
+
+    if engine == 'pandas':
+        def run_look_column() -> pd.DataFrame:
+            df = pd.DataFrame(index=range(len(dict_days)), columns=range(days_in_month))
+            state['df'] = look_column(
+                df, dict_days, off_days, start_weekday, weekly_plan, rng=random.Random(0)
+            )
+            return state['df']
+
+        def run_validate() -> pd.DataFrame:
+            df = validate_schedule_with_question_marks(
+                state['df'].copy(), weekly_plan, start_weekday
+            )
+            state['matrix'] = frame_to_matrix(df)
+            return df
+
+        yield 'look_column', run_look_column
+        yield 'validate', run_validate
+    elif engine == 'numpy':
+        demand = weekly_demand(weekly_plan, start_weekday, days_in_month)
+        off_mask = off_day_mask(off_days, days_in_month)
+
+        def run_assign() -> np.ndarray:
+            state['worker_state'] = WorkerState(len(dict_days))
+            state['assigned'] = assign_days(
+                off_mask, demand, np.random.default_rng(0), state['worker_state']
+            )
+            return state['assigned']
+
+        def run_balance() -> np.ndarray:
+            state['balanced'] = balance_days_off(
+                state['assigned'].copy(), dict_days, off_mask, np.random.default_rng(0),
+                state['worker_state'].days_off.copy()
+            )
+            return state['balanced']
+
+        def run_mark() -> np.ndarray:
+            state['matrix'] = mark_uncovered(state['balanced'].copy(), demand)
+            return state['matrix']
+
+        yield 'assign_days', run_assign
+        yield 'balance_days_off', run_balance
+        yield 'mark_uncovered', run_mark
+    else:
+        def run_solve() -> np.ndarray:
+            state['matrix'] = generate_attempt(
+                engine, dict_days, off_days, start_weekday, weekly_plan, days_in_month,
+                np.random.SeedSequence(0), 1.0
+            ).matrix
+            return state['matrix']
+
+        yield 'solve', run_solve
+
+    def run_frame() -> pd.DataFrame:
+        labels = generate_calendar_labels(days_in_month, start_weekday)
+        state['df'] = add_creator_row(matrix_to_frame(state['matrix'], draft.names, labels), draft)
+        return state['df']
+
+    yield 'frame', run_frame
+
+
+def export_stages(
+        state_df: Callable[[], pd.DataFrame],
+        formats: List[str],
+        folder: str
+) -> Iterator[Tuple[str, Callable[[], Any]]]:
+    """
+    Yields the export stages writing the final grid into a temporary folder.
+    """
+    if 'csv' in formats:
+        yield 'to_csv', lambda: state_df().to_csv(os.path.join(folder, 'schedule.csv'))
+    if 'xlsx' in formats:
+        yield 'to_excel', lambda: state_df().to_excel(os.path.join(folder, 'schedule.xlsx'))
+    if 'html' in formats:
+        yield 'to_html', lambda: state_df().to_html(classes='table table-striped table-bordered')
+
+
+def run(
+        workers: List[int],
+        engines: List[str],
+        densities: List[str],
+        shapes: List[Tuple[int, int]],
+        formats: List[str],
+        memory: bool
+) -> List[Dict[str, Any]]:
+    """
+    Runs every stage for every combination and collects one record per stage.
+    """
+    records = []
+    with tempfile.TemporaryDirectory() as folder:
+        for size in workers:
+            for density in densities:
+                data = make_data(size, density)
+                for engine in engines:
+                    for days_in_month, start_weekday in shapes:
+                        last: Dict[str, Any] = {}
+                        stages = list(solver_stages(engine, data, days_in_month, start_weekday))
+                        stages += list(export_stages(lambda: last['df'], formats, folder))
+                        for name, stage in stages:
+                            result, seconds, peak = measure(stage, memory)
+                            if isinstance(result, pd.DataFrame) and name == 'frame':
+                                last['df'] = result
+                            records.append({
+                                'workers': size,
+                                'density': density,
+                                'engine': engine,
+                                'days_in_month': days_in_month,
+                                'start_weekday': start_weekday,
+                                'stage': name,
+                                'seconds': seconds,
+                                'peak_bytes': peak,
+                                'question_marks': question_marks(result)
+                            })
+                            print(
+                                f"{size:>6} {density:>7} {engine:>12} "
+                                f"{days_in_month}d/{start_weekday} {name:>16} "
+                                f"{seconds * 1000:>10.2f} ms"
+                                + (f" {peak / 2 ** 20:>8.2f} MiB" if peak is not None else '')
+                            )
+    return records
+
+
+def metadata() -> Dict[str, Any]:
+    """
+    Describes the environment the benchmark ran in.
+    """
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'machine': platform.machine()
+    }
+
+
+def compare(
+        records: List[Dict[str, Any]],
+        baseline_path: str
+) -> None:
+    """
+    Prints the wall time ratio of every stage against a previous run.
+    """
+    with open(baseline_path) as file:
+        baseline = json.load(file)
+
+    def key(record: Dict[str, Any]) -> Tuple:
+        return (record['workers'], record['density'], record['engine'],
+                record['days_in_month'], record['start_weekday'], record['stage'])
+
+    previous = {key(record): record for record in baseline['results']}
+    print(f"\ncompared with {baseline['meta'].get('commit')}")
+    for record in records:
+        old = previous.get(key(record))
+        if old and old['seconds']:
+            ratio = record['seconds'] / old['seconds']
+            marker = '  <- slower' if ratio > 1.2 else ''
+            print(f"{' '.join(map(str, key(record))):>60} {ratio:>6.2f}x{marker}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, nargs='+', default=[10, 100, 1000, 10000])
+    parser.add_argument('--engines', nargs='+', default=['numpy'], choices=sorted(SOLVERS))
+    parser.add_argument('--densities', nargs='+', default=list(DENSITIES), choices=list(DENSITIES))
+    parser.add_argument('--shapes', choices=['all', 'sample'], default='all')
+    parser.add_argument('--formats', nargs='*', default=['csv', 'xlsx', 'html'])
+    parser.add_argument('--no-memory', action='store_true', help='skip the peak memory runs')
+    parser.add_argument('--output', default='benchmark_pipeline.json')
+    parser.add_argument('--compare', help='a previous JSON output to compare with')
+    args = parser.parse_args()
+
+    shapes = SAMPLE_SHAPES if args.shapes == 'sample' else [
+        (days, weekday) for days in DAYS_IN_MONTH for weekday in range(7)
+    ]
+    records = run(
+        args.workers, args.engines, args.densities, list(shapes), args.formats,
+        memory=not args.no_memory
+    )
+    with open(args.output, 'w') as file:
+        json.dump({'meta': metadata(), 'results': records}, file, indent=2)
+    print(f"\nsaved {len(records)} results to {args.output}")
+
+    if args.compare:
+        compare(records, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""
+Compares per-row commits with the bulk roster insert on a file-backed SQLite database.
+
+Usage:
+    python -m benchmarks.roster_insert [--sizes 10 100 1000 10000] [--batch-size 1000]
+"""
+import argparse
+import os
+import tempfile
+import time
+from typing import Dict, List
+
+from mysite.app import create_app
+from mysite.config import TestConfig
+from mysite.models import Second, db
+from mysite.processor import create_database_structure, save_roster
+
+
+def make_roster(
+        size: int
+) -> Dict[str, List[str]]:
+    """
+    Builds a synthetic roster in the shape of the third step form.
+
+    Args:
+        size (int): The number of workers.
+
+    Returns:
+        Dict[str, List[str]]: The names, days and personal days off lists.
+    """
+    return {
+        'names': [f'Worker {index}' for index in range(size)],
+        'days': [str(8 + index % 3) for index in range(size)],
+        'personal': [f'{index % 28 + 1},{(index + 7) % 28 + 1}' for index in range(size)]
+    }
+
+
+def insert_per_row(
+        user_id: str,
+        names: List[str],
+        days: List[str],
+        personal: List[str]
+) -> None:
+    """
+    Inserts the roster the way the third step used to, one commit per worker.
+    """
+    for name, day, personal_days in zip(names, days, personal):
+        db.session.add(Second(name=name, days=day, personal=personal_days, user_id=user_id))
+        db.session.commit()
+
+
+def run(
+        sizes: List[int],
+        batch_size: int
+) -> List[Dict[str, float]]:
+    """
+    Times both insert paths for every roster size on a fresh database.
+
+    Args:
+        sizes (List[int]): The roster sizes.
+        batch_size (int): The maximum number of rows per bulk INSERT statement.
+
+    Returns:
+        List[Dict[str, float]]: The timings in seconds for every size.
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as folder:
+        class BenchmarkConfig(TestConfig):
+            KEY = 'benchmark'
+            DATA_BASE = f"sqlite:///{os.path.join(folder, 'benchmark.db')}"
+
+        app = create_app(BenchmarkConfig)
+        create_database_structure(app)
+
+        with app.app_context():
+            for size in sizes:
+                roster = make_roster(size)
+
+                started = time.perf_counter()
+                insert_per_row(f'per-row-{size}', **roster)
+                per_row = time.perf_counter() - started
+
+                started = time.perf_counter()
+                save_roster(f'bulk-{size}', batch_size=batch_size, **roster)
+                bulk = time.perf_counter() - started
+
+                results.append({
+                    'rows': size,
+                    'per_row_seconds': per_row,
+                    'bulk_seconds': bulk,
+                    'speedup': per_row / bulk if bulk else float('inf')
+                })
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000, 10000])
+    parser.add_argument('--batch-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    print(f"{'rows':>8} {'per-row, s':>12} {'bulk, s':>10} {'speedup':>9}")
+    for result in run(args.sizes, args.batch_size):
+        print(
+            f"{result['rows']:>8} {result['per_row_seconds']:>12.4f} "
+            f"{result['bulk_seconds']:>10.4f} {result['speedup']:>8.1f}x"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+A local SMTP server for the load test and the test suite.
+
+It accepts any login, records the messages and the time each recipient got one,
+and can refuse the first messages with a temporary error.
+"""
+import socketserver
+import threading
+import time
+from typing import Dict, List, Optional
+
+
+class SmtpSink(socketserver.ThreadingTCPServer):
+    """
+    A minimal SMTP server that accepts any login and records the messages it receives.
+
+    Attributes:
+        messages (List[Dict[str, object]]): The recipients and the body of every accepted message.
+        received (Dict[str, float]): The perf_counter time of the last message of each recipient.
+        refuse (int): The number of upcoming messages answered with 451.
+        connections (int): The number of connections accepted so far.
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self) -> None:
+        super().__init__(('127.0.0.1', 0), SmtpSinkHandler)
+        self.messages: List[Dict[str, object]] = []
+        self.received: Dict[str, float] = {}
+        self.refuse = 0
+        self.connections = 0
+        self.lock = threading.Lock()
+
+    def delivered(self, address: str) -> Optional[float]:
+        with self.lock:
+            return self.received.get(address)
+
+
+class SmtpSinkHandler(socketserver.StreamRequestHandler):
+    def reply(self, line: str) -> None:
+        self.wfile.write(f'{line}\r\n'.encode())
+
+    def handle(self) -> None:
+        with self.server.lock:
+            self.server.connections += 1
+        self.reply('220 sink ready')
+        recipients: List[str] = []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors='replace').strip()
+            verb = command.split(' ', 1)[0].upper()
+            if verb == 'EHLO':
+                self.reply('250-sink')
+                self.reply('250 AUTH PLAIN')
+            elif verb == 'AUTH':
+                self.reply('235 accepted')
+            elif verb == 'MAIL':
+                recipients = []
+                self.reply('250 OK')
+            elif verb == 'RCPT':
+                recipients.append(command.split(':', 1)[1].strip().strip('<>'))
+                self.reply('250 OK')
+            elif verb == 'DATA':
+                self.reply('354 end with .')
+                body = []
+                while (data := self.rfile.readline()) not in (b'.\r\n', b''):
+                    body.append(data)
+                with self.server.lock:
+                    if self.server.refuse:
+                        self.server.refuse -= 1
+                        self.reply('451 try again later')
+                        continue
+                    self.server.messages.append({'to': recipients, 'body': b''.join(body)})
+                    for recipient in recipients:
+                        self.server.received[recipient] = time.perf_counter()
+                self.reply('250 OK')
+            elif verb == 'QUIT':
+                self.reply('221 bye')
+                return
+            else:
+                self.reply('250 OK')
@@ -0,0 +1,127 @@
+"""
+Measures the cold start of a worker process: imports, create_app and the first responses.
+
+Every sample runs in a fresh interpreter, so nothing is shared with the previous one.
+
+Usage:
+    python -m benchmarks.startup [--samples 5] [--output startup.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from typing import Any, Dict, List
+
+PROBE = r'''
+import json, sys, time
+started = time.perf_counter()
+
+
+def rss():
+    with open('/proc/self/status') as file:
+        for line in file:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) * 1024
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+from mysite.app import create_app
+from mysite.config import TestConfig
+from mysite.processor import create_database_structure
+imported = time.perf_counter()
+
+
+class Config(TestConfig):
+    KEY = 'benchmark'
+
+
+app = create_app(Config)
+create_database_structure(app)
+created = time.perf_counter()
+client = app.test_client()
+client.get('/')
+first = time.perf_counter()
+rss_first = rss()
+pandas_loaded = 'pandas' in sys.modules
+
+client.post('/second_step', data={'creator': 'Boss', 'firm_name': 'Firm', 'number': '3'})
+client.post('/third_step', data={
+    'names[]': ['Ann', 'Bob', 'Cid'], 'days[]': ['8', '8', '8'], 'personal[]': ['1', '2', '3']
+})
+client.post('/fourth_step', data={day: '1' for day in (
+    'monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday'
+)})
+schedule = time.perf_counter()
+
+print(json.dumps({
+    'import_seconds': imported - started,
+    'create_app_seconds': created - imported,
+    'first_response_seconds': first - created,
+    'ready_seconds': first - started,
+    'first_schedule_seconds': schedule - first,
+    'rss_after_first_response': rss_first,
+    'rss_after_first_schedule': rss(),
+    'pandas_loaded_at_first_response': pandas_loaded
+}))
+'''
+
+
+def sample() -> Dict[str, Any]:
+    """
+    Starts a fresh interpreter running the probe and returns its measurements.
+
+    The probe runs in a temporary folder, so the exported schedules do not end up in the project.
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [root, os.environ.get('PYTHONPATH')])))
+    with tempfile.TemporaryDirectory() as folder:
+        output = subprocess.run(
+            [sys.executable, '-c', PROBE], capture_output=True, text=True, check=True,
+            cwd=folder, env=env
+        ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def summarize(
+        samples: List[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """
+    Returns the median of every numeric measurement.
+    """
+    return {
+        key: statistics.median(record[key] for record in samples)
+        if not isinstance(samples[0][key], bool) else samples[0][key]
+        for key in samples[0]
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--samples', type=int, default=5)
+    parser.add_argument('--output', help='a JSON file to save the samples to')
+    args = parser.parse_args()
+
+    samples = [sample() for _ in range(args.samples)]
+    median = summarize(samples)
+    for key, value in median.items():
+        if key.startswith('rss'):
+            print(f"{key:>34} {value / 2 ** 20:>10.1f} MiB")
+        elif key.endswith('seconds'):
+            print(f"{key:>34} {value * 1000:>10.1f} ms")
+        else:
+            print(f"{key:>34} {value!s:>10}")
+
+    if args.output:
+        from benchmarks.pipeline import metadata
+
+        with open(args.output, 'w') as file:
+            json.dump({'meta': metadata(), 'median': median, 'samples': samples}, file, indent=2)
+        print(f"\nsaved {len(samples)} samples to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,329 @@
+import calendar
+import time
+from datetime import MAXYEAR, MINYEAR
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from flask import Blueprint, Response, jsonify, request
+
+from .config import ScheduleConfig
+from .drafts import Draft, draft_from_json
+from .engine import LABELS, OFF, UNCOVERED, WORK
+from .feasibility import check_draft
+from .locations import Location, export_locations, solve_locations
+from .processor import (EXPORT_TYPES, SOLVERS, SolveResult,
+                        generate_calendar_labels, next_month, solve_months)
+from .replan import (Delta, PersonalChanged, WeekdayChanged, WorkerAdded,
+                     WorkerRemoved, replan)
+
+api = Blueprint('api', __name__, url_prefix='/api')
+
+
+class ApiError(Exception):
+    """
+    A client error answered with a JSON message and a 400 status code.
+    """
+
+
+@api.errorhandler(ApiError)
+def api_error(error: ApiError):
+    return jsonify({'error': str(error)}), 400
+
+
+def _optional_int(
+        payload: Dict[str, Any],
+        key: str,
+        low: Optional[int] = None,
+        high: Optional[int] = None
+) -> Optional[int]:
+    value = payload.get(key)
+    if value is None:
+        return None
+    # JSON true and false arrive as bools, which are ints in Python.
+    if not isinstance(value, int) or isinstance(value, bool):
+        raise ApiError(f'{key} must be an integer')
+    if (low is not None and value < low) or (high is not None and value > high):
+        limit = f'at least {low}' if high is None else f'between {low} and {high}'
+        raise ApiError(f'{key} must be {limit}')
+    return value
+
+
+def parse_job(
+        payload: Any
+) -> Tuple[Draft, int, int, Optional[int]]:
+    """
+    Reads a schedule request: the draft plus the optional year, month and seed.
+
+    Args:
+        payload (Any): The decoded JSON object of one schedule.
+
+    Returns:
+        Tuple[Draft, int, int, Optional[int]]: The draft, the year, the month and the seed.
+    """
+    try:
+        draft = draft_from_json(payload, ScheduleConfig.API_MAX_WORKERS)
+    except ValueError as error:
+        raise ApiError(str(error)) from None
+
+    year, month = next_month()
+    given_year = _optional_int(payload, 'year', MINYEAR, MAXYEAR)
+    given_month = _optional_int(payload, 'month', 1, 12)
+    year = given_year if given_year is not None else year
+    month = given_month if given_month is not None else month
+    return draft, year, month, _optional_int(payload, 'seed', 0)
+
+
+def parse_options(
+        payload: Dict[str, Any]
+) -> Tuple[Optional[str], Optional[int]]:
+    """
+    Reads the engine and the number of restarts shared by the schedules of a request.
+    """
+    engine = payload.get('engine')
+    if engine is not None and engine not in SOLVERS:
+        raise ApiError(f"engine must be one of {', '.join(sorted(SOLVERS))}")
+    restarts = _optional_int(payload, 'restarts', 1, 32)
+    return engine, restarts
+
+
+def parse_matrix(
+        payload: Dict[str, Any],
+        draft: Draft,
+        days_in_month: int
+) -> np.ndarray:
+    """
+    Reads the "schedule" list of a previous /api/schedule response back into a matrix.
+    """
+    rows = payload.get('schedule')
+    if not isinstance(rows, list) or len(rows) != len(draft.workers):
+        raise ApiError('schedule must hold one row per worker')
+    matrix = np.full((len(rows), days_in_month), OFF, dtype=np.int8)
+    for index, (row, name) in enumerate(zip(rows, draft.names)):
+        if not isinstance(row, dict):
+            raise ApiError(f'schedule[{index}] must be {name} with {days_in_month} cells')
+        cells = row.get('cells')
+        valid = isinstance(cells, list) and all(isinstance(cell, str) for cell in cells)
+        if row.get('name') != name or not valid or len(cells) != days_in_month:
+            raise ApiError(f'schedule[{index}] must be {name} with {days_in_month} cells')
+        values = np.asarray(cells, dtype=object)
+        matrix[index, values == LABELS[WORK]] = WORK
+        matrix[index, values == LABELS[UNCOVERED]] = UNCOVERED
+    return matrix
+
+
+def parse_delta(
+        payload: Any,
+        draft: Draft
+) -> Delta:
+    """
+    Reads a change to a schedule: add_worker, remove_worker, personal or weekday.
+    """
+    if not isinstance(payload, dict):
+        raise ApiError('delta must be an object')
+    kind = payload.get('type')
+    if kind in ('remove_worker', 'personal'):
+        if payload.get('name') not in draft.names:
+            raise ApiError('delta.name must be one of the workers')
+        index = draft.names.index(payload['name'])
+        if kind == 'remove_worker':
+            return WorkerRemoved(index)
+        probe = {**payload, 'days': draft.workers[index].days}
+    elif kind == 'add_worker':
+        probe = payload.get('worker')
+    elif kind == 'weekday':
+        weekday = _optional_int(payload, 'weekday')
+        count = _optional_int(payload, 'count')
+        if weekday is None or not 0 <= weekday <= 6 or count is None or count < 0:
+            raise ApiError('delta needs a weekday from 0 to 6 and a non-negative count')
+        return WeekdayChanged(weekday, count)
+    else:
+        raise ApiError('delta.type must be add_worker, remove_worker, personal or weekday')
+
+    try:
+        worker, = draft_from_json(
+            {'creator': draft.creator, 'week': list(draft.week), 'workers': [probe]}
+        ).workers
+    except ValueError as error:
+        raise ApiError(f'delta.{error}') from None
+    if kind == 'add_worker' and worker.name in draft.names:
+        raise ApiError(f'delta.worker: the name {worker.name} is already used')
+    if kind == 'personal':
+        return PersonalChanged(index, worker.personal)
+    return WorkerAdded(worker)
+
+
+def schedule_json(
+        job: Tuple[Draft, int, int, Optional[int]],
+        result: SolveResult
+) -> Dict[str, Any]:
+    """
+    Serializes a solved schedule, one list of cell labels per worker.
+    """
+    draft, year, month, _ = job
+    start_weekday, days_in_month = calendar.monthrange(year, month)
+    cells = np.asarray(LABELS, dtype=object)[result.matrix]
+    return {
+        'creator': draft.creator,
+        'firm_name': draft.firm_name,
+        'year': year,
+        'month': month,
+        'days': generate_calendar_labels(days_in_month, start_weekday),
+        'schedule': [
+            {'name': name, 'cells': row.tolist()} for name, row in zip(draft.names, cells)
+        ],
+        'uncovered': int((result.matrix == UNCOVERED).sum()),
+        'diagnostics': result.feasibility.messages(),
+        'objective': result.objective,
+        'solve_time': result.solve_time
+    }
+
+
+def _json_body() -> Dict[str, Any]:
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        raise ApiError('the body must be a JSON object')
+    return payload
+
+
+def _check_total_workers(drafts: List[Draft], kind: str) -> None:
+    total = sum(len(draft.names) for draft in drafts)
+    if total > ScheduleConfig.API_MAX_TOTAL_WORKERS:
+        raise ApiError(
+            f'the {kind} hold {total} workers, at most {ScheduleConfig.API_MAX_TOTAL_WORKERS} are accepted'
+        )
+
+
+@api.route('/schedule', methods=['POST'])
+def schedule():
+    """
+    Generates a schedule from a single JSON body without storing a draft.
+
+    The body holds creator, firm_name, workers and week as read by draft_from_json, and
+    optionally year, month, seed, engine and restarts.
+
+    Returns:
+        Response: The schedule as JSON, or a 400 status code with an error message.
+    """
+    payload = _json_body()
+    job = parse_job(payload)
+    engine, restarts = parse_options(payload)
+    result, = solve_months([job], engine, restarts)
+    return jsonify(schedule_json(job, result))
+
+
+@api.route('/schedules', methods=['POST'])
+def schedules():
+    """
+    Generates many independent schedules in one call on the process pool.
+
+    The body is {"schedules": [...], "engine": ..., "restarts": ...}, every item being a
+    body accepted by /api/schedule; engine and restarts apply to the whole batch.
+
+    Returns:
+        Response: {"schedules": [...]} in the order of the request, or a 400 status code with an error message.
+    """
+    payload = _json_body()
+    items: List[Any] = payload.get('schedules')
+    if not isinstance(items, list) or not items:
+        raise ApiError('schedules must be a non-empty list')
+    if len(items) > ScheduleConfig.API_MAX_BATCH:
+        raise ApiError(f'at most {ScheduleConfig.API_MAX_BATCH} schedules are accepted')
+
+    jobs = []
+    for index, item in enumerate(items):
+        try:
+            jobs.append(parse_job(item))
+        except ApiError as error:
+            raise ApiError(f'schedules[{index}]: {error}') from None
+    _check_total_workers([job[0] for job in jobs], 'schedules')
+    engine, restarts = parse_options(payload)
+    results = solve_months(jobs, engine, restarts)
+    return jsonify({'schedules': [schedule_json(job, result) for job, result in zip(jobs, results)]})
+
+
+@api.route('/locations', methods=['POST'])
+def locations():
+    """
+    Generates the schedules of several locations of one firm for the same month.
+
+    The body holds creator, firm_name and locations, every location being
+    {"name": ..., "workers": [...], "week": [...]}, and optionally year, month, seed,
+    engine, restarts and format. The locations are solved in parallel on the process
+    pool. format is "json" by default, or "csv" or "xlsx" for one merged file with a
+    section or a sheet per location.
+
+    Returns:
+        Response: {"locations": [...]} in the order of the request or the merged file, or a 400 status code with an error message.
+    """
+    payload = _json_body()
+    items: List[Any] = payload.get('locations')
+    if not isinstance(items, list) or not items:
+        raise ApiError('locations must be a non-empty list')
+    if len(items) > ScheduleConfig.API_MAX_BATCH:
+        raise ApiError(f'at most {ScheduleConfig.API_MAX_BATCH} locations are accepted')
+    file_type = payload.get('format', 'json')
+    if file_type != 'json' and file_type not in EXPORT_TYPES:
+        raise ApiError(f"format must be one of json, {', '.join(EXPORT_TYPES)}")
+
+    jobs = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict) or not isinstance(item.get('name'), str) or not item['name']:
+            raise ApiError(f'locations[{index}] must be an object with a name')
+        if any(item['name'] == job[0].name for job in jobs):
+            raise ApiError(f'locations[{index}]: the name {item["name"]} is used twice')
+        try:
+            job = parse_job({**payload, 'workers': item.get('workers'), 'week': item.get('week')})
+        except ApiError as error:
+            raise ApiError(f'locations[{index}]: {error}') from None
+        jobs.append((Location(item['name'], job[0]), job))
+    _check_total_workers([location.draft for location, _ in jobs], 'locations')
+
+    _, year, month, seed = jobs[0][1]
+    engine, restarts = parse_options(payload)
+    schedules = solve_locations(
+        [location for location, _ in jobs], year, month, engine, seed, restarts
+    )
+
+    if file_type in EXPORT_TYPES:
+        mimetype = 'text/csv' if file_type == 'csv' else \
+            'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        response = Response(export_locations(schedules, year, month, file_type), mimetype=mimetype)
+        response.headers['Content-Disposition'] = f'attachment; filename="schedule.{file_type}"'
+        return response
+    return jsonify({'locations': [
+        {'location': schedule.name, **schedule_json(job, schedule.result)}
+        for (_, job), schedule in zip(jobs, schedules)
+    ]})
+
+
+@api.route('/replan', methods=['POST'])
+def replan_schedule():
+    """
+    Updates a schedule after a single change, keeping everyone else's days where possible.
+
+    The body is a previous /api/schedule response together with the draft it was made
+    from, i.e. creator, firm_name, workers, week, year, month and schedule, plus a delta
+    such as {"type": "personal", "name": "Bob", "personal": [3, 14, 20]},
+    {"type": "add_worker", "worker": {...}}, {"type": "remove_worker", "name": "Bob"} or
+    {"type": "weekday", "weekday": 4, "count": 3}.
+
+    Returns:
+        Response: The new schedule as JSON with the number of changed cells, or a 400 status code with an error message.
+    """
+    payload = _json_body()
+    draft, year, month, seed = parse_job(payload)
+    if 'year' not in payload or 'month' not in payload:
+        raise ApiError('year and month of the schedule are required')
+    _, days_in_month = calendar.monthrange(year, month)
+    matrix = parse_matrix(payload, draft, days_in_month)
+    delta = parse_delta(payload.get('delta'), draft)
+
+    started = time.perf_counter()
+    result = replan(draft, matrix, year, month, delta, np.random.default_rng(seed))
+    solved = SolveResult(
+        result.matrix, 0, time.perf_counter() - started, check_draft(result.draft, year, month)
+    )
+    response = schedule_json((result.draft, year, month, seed), solved)
+    del response['objective']
+    response['changed'] = int(result.changed.sum())
+    return jsonify(response)
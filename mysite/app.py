@@ -1,8 +1,12 @@
 from flask import Flask
 
+from .api import api
 from .config import DefaultConfig
+from .metrics import instrument_app
 from .models import db
+from .processor import create_database_structure
 from .routes import admin
+from .sweeper import start_sweeper
 
 
 def create_app(config) -> Flask:
@@ -10,12 +14,15 @@ def create_app(config) -> Flask:
     app.config.from_object(config)
     app.secret_key = config.KEY
     app.register_blueprint(admin)
+    app.register_blueprint(api)
     app.config['SQLALCHEMY_DATABASE_URI'] = config.DATA_BASE
     db.init_app(app)
+    instrument_app(app, lambda: db.engine)
+    start_sweeper(app)
     return app
 
 
 def run_app() -> any:
     app = create_app(DefaultConfig)
-    # create_database_structure(app)
+    create_database_structure(app)
     return app.run()
@@ -0,0 +1,414 @@
+import calendar
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import date
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .bitset import CompactSchedule, pack_days, popcount
+from .config import ArchiveConfig
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+COLUMNS = {
+    'firm': np.int32,
+    'month': np.int32,
+    'worker': np.int32,
+    'work': np.uint32,
+    'weekend': np.uint32,
+    'days': np.uint8
+}
+SEGMENT = re.compile(r'segment-(\d{6})$')
+DICTIONARY = 'dictionary.json'
+LOCK = '.lock'
+
+# Bit widths of the (firm, month, worker) key that picks the latest row of a worker-month.
+_MONTH_BITS = 20
+_WORKER_BITS = 24
+
+
+def month_index(
+        year: int,
+        month: int
+) -> int:
+    """
+    Numbers the months consecutively, so month ranges are integer ranges.
+    """
+    return year * 12 + month - 1
+
+
+def months_back(
+        count: int,
+        today: Optional[date] = None
+) -> Tuple[int, int]:
+    """
+    Returns the year and month starting the last count months, the current month included.
+
+    Args:
+        count (int): The number of months.
+        today (Optional[date]): The current date. Defaults to today.
+
+    Returns:
+        Tuple[int, int]: The year and the month of the first month.
+    """
+    today = today or date.today()
+    year, month = divmod(month_index(today.year, today.month) - count + 1, 12)
+    return year, month + 1
+
+
+def weekend_mask(
+        year: int,
+        month: int
+) -> np.uint32:
+    """
+    Returns the day mask of the Saturdays and Sundays of a month.
+    """
+    start_weekday, days_in_month = calendar.monthrange(year, month)
+    weekend = (start_weekday + np.arange(days_in_month)) % 7 >= 5
+    return pack_days(weekend[np.newaxis, :])[0]
+
+
+class ScheduleArchive:
+    """
+    An append-only columnar archive of generated schedules, one row per worker and month.
+
+    Every append writes a new immutable segment: a folder with one .npy file per column,
+    see COLUMNS. The working days and the weekend days of a row are day masks as in
+    CompactSchedule, firms and workers are ids into a shared dictionary. Queries memory-map
+    only the columns they read and aggregate them with vectorized operations. Workers are
+    identified by name; when the same firm, month and worker were archived more than once,
+    the latest row counts.
+
+    Once there are more than max_segments segments, they are merged into one and the
+    superseded rows are dropped.
+
+    Several processes may share the folder. Appends and merges hold an exclusive lock on
+    the folder's lock file and queries a shared one; both reload the dictionary when
+    another process has changed it.
+    """
+
+    def __init__(
+            self,
+            folder: str,
+            max_segments: int = ArchiveConfig.MAX_SEGMENTS
+    ) -> None:
+        self.folder = folder
+        self.max_segments = max_segments
+        self._lock = threading.Lock()
+        self._dictionary: Optional[Dict[str, List[str]]] = None
+        self._dictionary_stamp: Optional[Tuple[int, int, int]] = None
+        self._ids: Dict[str, Dict[str, int]] = {}
+        self._columns: Dict[Tuple[str, str], np.ndarray] = {}
+
+    def _segments(self) -> List[str]:
+        if not os.path.isdir(self.folder):
+            return []
+        return sorted(name for name in os.listdir(self.folder) if SEGMENT.match(name))
+
+    @contextmanager
+    def _locked(
+            self,
+            shared: bool = False
+    ) -> Iterator[None]:
+        """
+        Holds the thread lock and the inter-process lock of the folder.
+        """
+        with self._lock:
+            if fcntl is None or not os.path.isdir(self.folder):
+                yield
+                return
+            with open(os.path.join(self.folder, LOCK), 'a') as file:
+                fcntl.flock(file, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(file, fcntl.LOCK_UN)
+
+    def _load_dictionary(self) -> Dict[str, List[str]]:
+        """
+        Returns the dictionary, read again if the file changed since it was last read.
+        """
+        path = os.path.join(self.folder, DICTIONARY)
+        try:
+            stat = os.stat(path)
+            stamp = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            stamp = None
+        if self._dictionary is None or stamp != self._dictionary_stamp:
+            if stamp is not None:
+                with open(path, encoding='utf-8') as file:
+                    self._dictionary = json.load(file)
+            else:
+                self._dictionary = {'firms': [], 'workers': []}
+            self._dictionary_stamp = stamp
+            self._ids = {
+                kind: {name: index for index, name in enumerate(names)}
+                for kind, names in self._dictionary.items()
+            }
+        return self._dictionary
+
+    def _save_dictionary(self) -> None:
+        handle, path = tempfile.mkstemp(dir=self.folder, suffix='.json')
+        with os.fdopen(handle, 'w', encoding='utf-8') as file:
+            json.dump(self._dictionary, file)
+        target = os.path.join(self.folder, DICTIONARY)
+        os.replace(path, target)
+        stat = os.stat(target)
+        self._dictionary_stamp = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def _intern(
+            self,
+            kind: str,
+            names: Sequence[str]
+    ) -> Tuple[np.ndarray, bool]:
+        dictionary = self._load_dictionary()[kind]
+        ids = self._ids[kind]
+        added = False
+        for name in names:
+            if name not in ids:
+                ids[name] = len(dictionary)
+                dictionary.append(name)
+                added = True
+        return np.array([ids[name] for name in names], dtype=np.int32), added
+
+    def _write_segment(
+            self,
+            columns: Dict[str, np.ndarray]
+    ) -> str:
+        segments = self._segments()
+        number = int(SEGMENT.match(segments[-1]).group(1)) + 1 if segments else 0
+        name = f'segment-{number:06d}'
+        staging = tempfile.mkdtemp(dir=self.folder, prefix='.staging-')
+        for column, dtype in COLUMNS.items():
+            np.save(os.path.join(staging, f'{column}.npy'), np.asarray(columns[column], dtype=dtype))
+        os.rename(staging, os.path.join(self.folder, name))
+        return name
+
+    def append(
+            self,
+            compact: CompactSchedule,
+            year: int,
+            month: int
+    ) -> int:
+        """
+        Archives a schedule as one row per worker, the last one of a repeated name.
+
+        Args:
+            compact (CompactSchedule): The schedule.
+            year (int): The year of the schedule.
+            month (int): The month of the schedule.
+
+        Returns:
+            int: The number of archived rows.
+        """
+        if not len(compact):
+            return 0
+        os.makedirs(self.folder, exist_ok=True)
+        with self._locked():
+            firm, new_firm = self._intern('firms', [compact.firm_name or ''])
+            workers, new_workers = self._intern('workers', list(compact.names))
+            if new_firm or new_workers:
+                self._save_dictionary()
+
+            # A segment never repeats a worker-month, so a single segment needs no deduplication.
+            _, last = np.unique(workers[::-1], return_index=True)
+            keep = np.sort(len(workers) - 1 - last)
+            rows = len(keep)
+            self._write_segment({
+                'firm': np.repeat(firm, rows),
+                'month': np.full(rows, month_index(year, month)),
+                'worker': workers[keep],
+                'work': compact.work[keep],
+                'weekend': np.full(rows, weekend_mask(year, month)),
+                'days': np.full(rows, compact.days_in_month)
+            })
+            if len(self._segments()) > self.max_segments:
+                self._merge()
+        return rows
+
+    def _column(
+            self,
+            segment: str,
+            column: str
+    ) -> np.ndarray:
+        key = (segment, column)
+        if key not in self._columns:
+            self._columns[key] = np.load(
+                os.path.join(self.folder, segment, f'{column}.npy'), mmap_mode='r'
+            )
+        return self._columns[key]
+
+    def _forget(
+            self,
+            segments: Sequence[str]
+    ) -> None:
+        """
+        Drops the mapped columns of segments that are gone, e.g. merged by another process.
+        """
+        present = set(segments)
+        for key in [key for key in self._columns if key[0] not in present]:
+            del self._columns[key]
+
+    def _merge(self) -> None:
+        segments = self._segments()
+        columns = {
+            column: np.concatenate([self._column(segment, column) for segment in segments])
+            for column in COLUMNS
+        }
+        keep = _latest_rows(columns['firm'], columns['month'], columns['worker'])
+        self._write_segment({column: values[keep] for column, values in columns.items()})
+        for segment in segments:
+            for column in COLUMNS:
+                self._columns.pop((segment, column), None)
+            shutil.rmtree(os.path.join(self.folder, segment))
+
+    def compact(self) -> None:
+        """
+        Merges all segments into one and drops the superseded rows.
+        """
+        with self._locked():
+            if len(self._segments()) > 1:
+                self._merge()
+
+    def scan(
+            self,
+            columns: Sequence[str],
+            firm: Optional[str] = None,
+            since: Optional[Tuple[int, int]] = None,
+            until: Optional[Tuple[int, int]] = None
+    ) -> Dict[str, np.ndarray]:
+        """
+        Reads the given columns of the latest row of every firm, month and worker in a range.
+
+        Only the requested columns and the key columns are mapped.
+
+        Args:
+            columns (Sequence[str]): The columns to return, see COLUMNS.
+            firm (Optional[str]): The company to read. Defaults to every company.
+            since (Optional[Tuple[int, int]]): The year and month of the first month, included.
+            until (Optional[Tuple[int, int]]): The year and month of the last month, included.
+
+        Returns:
+            Dict[str, np.ndarray]: The requested columns and the key columns of the matching rows.
+        """
+        needed = dict.fromkeys(['firm', 'month', 'worker', *columns])
+        with self._locked(shared=True):
+            dictionary = self._load_dictionary()
+            firm_id = self._ids['firms'].get(firm) if firm is not None else None
+            segments = self._segments()
+            self._forget(segments)
+            mapped = [
+                {column: self._column(segment, column) for column in needed}
+                for segment in segments
+            ]
+        if firm is not None and firm_id is None:
+            mapped = []
+
+        first = month_index(*since) if since else None
+        last = month_index(*until) if until else None
+        parts = {column: [] for column in needed}
+        for segment in mapped:
+            selected = np.ones(len(segment['month']), dtype=bool)
+            if first is not None:
+                selected &= segment['month'] >= first
+            if last is not None:
+                selected &= segment['month'] <= last
+            if firm_id is not None:
+                selected &= segment['firm'] == firm_id
+            for column in needed:
+                parts[column].append(segment[column][selected])
+
+        result = {
+            column: np.concatenate(values) if values else np.empty(0, dtype=COLUMNS[column])
+            for column, values in parts.items()
+        }
+        if len(mapped) > 1:
+            keep = _latest_rows(result['firm'], result['month'], result['worker'])
+            result = {column: values[keep] for column, values in result.items()}
+        result['names'] = dictionary['workers']
+        return result
+
+    def _per_worker(
+            self,
+            rows: Dict[str, np.ndarray],
+            counts: np.ndarray
+    ) -> Dict[str, int]:
+        names = rows['names']
+        totals = np.bincount(rows['worker'], weights=counts, minlength=len(names))
+        present = np.bincount(rows['worker'], minlength=len(names)) > 0
+        return {names[index]: int(totals[index]) for index in np.flatnonzero(present)}
+
+    def days_worked(
+            self,
+            firm: Optional[str] = None,
+            since: Optional[Tuple[int, int]] = None,
+            until: Optional[Tuple[int, int]] = None
+    ) -> Dict[str, int]:
+        """
+        Returns the working days of every worker, e.g. over the last 12 months with
+        since=months_back(12). Workers with the same name in different firms are summed
+        unless a firm is given.
+
+        Args:
+            firm (Optional[str]): The company to read. Defaults to every company.
+            since (Optional[Tuple[int, int]]): The year and month of the first month, included.
+            until (Optional[Tuple[int, int]]): The year and month of the last month, included.
+
+        Returns:
+            Dict[str, int]: The number of working days by worker name.
+        """
+        rows = self.scan(['work'], firm, since, until)
+        return self._per_worker(rows, popcount(rows['work']))
+
+    def weekend_load(
+            self,
+            firm: Optional[str] = None,
+            since: Optional[Tuple[int, int]] = None,
+            until: Optional[Tuple[int, int]] = None
+    ) -> Dict[str, int]:
+        """
+        Returns the Saturdays and Sundays worked by every worker, see days_worked.
+        """
+        rows = self.scan(['work', 'weekend'], firm, since, until)
+        return self._per_worker(rows, popcount(rows['work'] & rows['weekend']))
+
+    def worker_days(self) -> int:
+        """
+        Returns the number of worker-days in the archive, superseded rows included.
+        """
+        with self._locked(shared=True):
+            segments = self._segments()
+            self._forget(segments)
+            return sum(
+                int(self._column(segment, 'days').sum(dtype=np.int64))
+                for segment in segments
+            )
+
+
+def _latest_rows(
+        firm: np.ndarray,
+        month: np.ndarray,
+        worker: np.ndarray
+) -> np.ndarray:
+    """
+    Returns the sorted positions of the last row of every firm, month and worker.
+    """
+    key = (
+        (firm.astype(np.int64) << (_MONTH_BITS + _WORKER_BITS))
+        | (month.astype(np.int64) << _WORKER_BITS)
+        | worker.astype(np.int64)
+    )
+    _, last = np.unique(key[::-1], return_index=True)
+    return np.sort(len(key) - 1 - last)
+
+
+schedule_archive = ScheduleArchive(ArchiveConfig.PATH)
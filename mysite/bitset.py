@@ -0,0 +1,324 @@
+from typing import TYPE_CHECKING, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .engine import LABELS, OFF, UNCOVERED, WORK, off_day_mask
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+MAX_DAYS = 32
+
+_POPCOUNT = np.array([bin(value).count('1') for value in range(256)], dtype=np.uint8)
+
+
+def popcount(
+        masks: np.ndarray
+) -> np.ndarray:
+    """
+    Counts the set bits of every uint32 mask.
+
+    Args:
+        masks (np.ndarray): The day masks.
+
+    Returns:
+        np.ndarray: The number of set days in every mask.
+    """
+    masks = np.ascontiguousarray(masks, dtype=np.uint32)
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(masks).astype(np.int32)
+    return _POPCOUNT[masks.view(np.uint8)].reshape(masks.shape + (4,)).sum(axis=-1, dtype=np.int32)
+
+
+def pack_days(
+        cells: np.ndarray
+) -> np.ndarray:
+    """
+    Packs a boolean workers x days matrix into one uint32 mask per worker, bit d for day d + 1.
+
+    Args:
+        cells (np.ndarray): The boolean workers x days matrix, at most 32 days.
+
+    Returns:
+        np.ndarray: The day masks.
+    """
+    workers, days = cells.shape
+    if days > MAX_DAYS:
+        raise ValueError(f"A mask holds at most {MAX_DAYS} days, got {days}")
+    padded = np.zeros((workers, MAX_DAYS), dtype=bool)
+    padded[:, :days] = cells
+    packed = np.packbits(padded, axis=1, bitorder='little')
+    return packed.view('<u4').reshape(workers).astype(np.uint32)
+
+
+def unpack_days(
+        masks: np.ndarray,
+        days: int
+) -> np.ndarray:
+    """
+    Unpacks uint32 day masks into a boolean workers x days matrix.
+
+    Args:
+        masks (np.ndarray): The day masks.
+        days (int): The number of days to unpack.
+
+    Returns:
+        np.ndarray: The boolean workers x days matrix.
+    """
+    packed = np.ascontiguousarray(masks, dtype='<u4').view(np.uint8).reshape(-1, 4)
+    return np.unpackbits(packed, axis=1, count=days, bitorder='little').astype(bool)
+
+
+def longest_runs(
+        masks: np.ndarray
+) -> np.ndarray:
+    """
+    Returns the longest run of consecutive set days in every mask.
+
+    Every step drops the last day of each run, so the loop runs as many times as the longest run.
+
+    Args:
+        masks (np.ndarray): The day masks.
+
+    Returns:
+        np.ndarray: The longest run length of every mask.
+    """
+    runs = np.zeros(masks.shape, dtype=np.int32)
+    remaining = masks.astype(np.uint32)
+    while remaining.any():
+        runs += remaining != 0
+        remaining = remaining & (remaining << np.uint32(1))
+    return runs
+
+
+class CompactSchedule:
+    """
+    A monthly schedule held as three uint32 masks per worker instead of a grid of strings.
+
+    Bit d of a mask stands for day d + 1 of the month. A worker and a day are at most one
+    of working or uncovered; every other cell is a day off.
+
+    Attributes:
+        work (np.ndarray): The working days of every worker.
+        off_requests (np.ndarray): The personal days off every worker asked for.
+        uncovered (np.ndarray): The "?" cells of every worker.
+        names (Tuple[str, ...]): The worker names.
+        columns (Tuple[str, ...]): The calendar labels.
+        creator (Optional[str]): The creator shown in the 'Data' row, no row if None.
+        firm_name (Optional[str]): The company shown in the 'Data' row.
+    """
+    __slots__ = ('work', 'off_requests', 'uncovered', 'names', 'columns', 'creator', 'firm_name')
+
+    def __init__(
+            self,
+            work: np.ndarray,
+            off_requests: np.ndarray,
+            uncovered: np.ndarray,
+            names: Sequence[str],
+            columns: Sequence[str],
+            creator: Optional[str] = None,
+            firm_name: Optional[str] = None
+    ) -> None:
+        self.work = np.asarray(work, dtype=np.uint32)
+        self.off_requests = np.asarray(off_requests, dtype=np.uint32)
+        self.uncovered = np.asarray(uncovered, dtype=np.uint32)
+        self.names = tuple(names)
+        self.columns = tuple(columns)
+        self.creator = creator
+        self.firm_name = firm_name
+
+    @property
+    def days_in_month(self) -> int:
+        return len(self.columns)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        The size of the masks in bytes.
+        """
+        return self.work.nbytes + self.off_requests.nbytes + self.uncovered.nbytes
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @classmethod
+    def from_matrix(
+            cls,
+            matrix: np.ndarray,
+            names: Sequence[str],
+            columns: Sequence[str],
+            off_days: Optional[List[List[int]]] = None,
+            creator: Optional[str] = None,
+            firm_name: Optional[str] = None
+    ) -> 'CompactSchedule':
+        """
+        Packs a workers x days schedule matrix.
+
+        Args:
+            matrix (np.ndarray): The workers x days schedule matrix.
+            names (Sequence[str]): The worker names.
+            columns (Sequence[str]): The calendar labels.
+            off_days (Optional[List[List[int]]]): The personal days off of every worker, none if omitted.
+            creator (Optional[str]): The creator of the schedule.
+            firm_name (Optional[str]): The company of the schedule.
+
+        Returns:
+            CompactSchedule: The packed schedule.
+        """
+        off_mask = off_day_mask(off_days or [[] for _ in names], matrix.shape[1])
+        return cls(
+            pack_days(matrix == WORK), pack_days(off_mask), pack_days(matrix == UNCOVERED),
+            names, columns, creator, firm_name
+        )
+
+    @classmethod
+    def from_frame(
+            cls,
+            df: 'pd.DataFrame',
+            off_days: Optional[List[List[int]]] = None
+    ) -> 'CompactSchedule':
+        """
+        Packs a labelled schedule grid, reading the creator and the company from its 'Data' row.
+
+        Args:
+            df (pd.DataFrame): The schedule grid with "X", "" and "?" cells.
+            off_days (Optional[List[List[int]]]): The personal days off of every worker, none if omitted.
+
+        Returns:
+            CompactSchedule: The packed schedule.
+        """
+        creator = firm_name = None
+        if 'Data' in df.index:
+            data = df.loc['Data']
+            creator = str(data.iloc[0]).removeprefix('Creator: ')
+            firm_name = str(data.iloc[1]).removeprefix('Company: ')
+            df = df.drop(index='Data')
+
+        values = df.to_numpy()
+        matrix = np.full(values.shape, OFF, dtype=np.int8)
+        matrix[values == LABELS[WORK]] = WORK
+        matrix[values == LABELS[UNCOVERED]] = UNCOVERED
+        return cls.from_matrix(
+            matrix, [str(name) for name in df.index], [str(column) for column in df.columns],
+            off_days, creator, firm_name
+        )
+
+    def to_matrix(self) -> np.ndarray:
+        """
+        Unpacks the schedule into a workers x days schedule matrix.
+        """
+        days = self.days_in_month
+        matrix = np.full((len(self), days), OFF, dtype=np.int8)
+        matrix[unpack_days(self.work, days)] = WORK
+        matrix[unpack_days(self.uncovered, days)] = UNCOVERED
+        return matrix
+
+    def rows(self, start: int = 0, stop: Optional[int] = None) -> 'CompactSchedule':
+        """
+        Returns the schedule of a range of workers, without the 'Data' row.
+        """
+        window = slice(start, stop)
+        return CompactSchedule(
+            self.work[window], self.off_requests[window], self.uncovered[window],
+            self.names[window], self.columns
+        )
+
+    def creator_row(self) -> 'pd.DataFrame':
+        """
+        Returns the 'Data' row with the creator and the company, empty if there is no creator.
+        """
+        import pandas as pd
+
+        if self.creator is None:
+            return pd.DataFrame(columns=list(self.columns))
+        row = [f'Creator: {self.creator}', f'Company: {self.firm_name}']
+        row += [''] * (self.days_in_month - 2)
+        return pd.DataFrame([row], index=['Data'], columns=list(self.columns))
+
+    def to_frame(self) -> 'pd.DataFrame':
+        """
+        Unpacks the schedule into the labelled grid written by the exports.
+
+        Returns:
+            pd.DataFrame: The schedule grid with "X", "" and "?" cells and the 'Data' row.
+        """
+        import pandas as pd
+
+        df = pd.DataFrame(
+            LABELS[self.to_matrix()], index=list(self.names), columns=list(self.columns)
+        )
+        if self.creator is None:
+            return df
+        return pd.concat([df, self.creator_row()])
+
+    def days_worked(self) -> np.ndarray:
+        """
+        Returns the number of working days of every worker.
+        """
+        return popcount(self.work)
+
+    def days_off(self) -> np.ndarray:
+        """
+        Returns the number of non-working days of every worker, "?" cells included.
+        """
+        return self.days_in_month - popcount(self.work)
+
+    def longest_streaks(self) -> np.ndarray:
+        """
+        Returns the longest run of consecutive working days of every worker.
+        """
+        return longest_runs(self.work)
+
+    def exceeds_streak(self, max_consecutive: int) -> np.ndarray:
+        """
+        Returns the mask of workers with more than max_consecutive working days in a row.
+
+        Args:
+            max_consecutive (int): The maximum number of consecutive working days.
+
+        Returns:
+            np.ndarray: True for every worker breaking the limit.
+        """
+        window = self.work.copy()
+        for shift in range(1, max_consecutive + 1):
+            window &= self.work >> np.uint32(shift)
+        return window != 0
+
+    def ignored_requests(self) -> np.ndarray:
+        """
+        Returns the number of requested personal days off every worker has to work.
+        """
+        return popcount(self.work & self.off_requests)
+
+    def coverage(self) -> np.ndarray:
+        """
+        Returns the number of working workers on every day.
+        """
+        return unpack_days(self.work, self.days_in_month).sum(axis=0, dtype=np.int32)
+
+    def uncovered_days(self) -> np.ndarray:
+        """
+        Returns the days of the month, starting from 1, with "?" cells.
+        """
+        days = np.bitwise_or.reduce(self.uncovered) if len(self) else np.uint32(0)
+        return np.flatnonzero(unpack_days(np.atleast_1d(days), self.days_in_month)[0]) + 1
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, CompactSchedule):
+            return NotImplemented
+        return (
+            self.names == other.names and self.columns == other.columns
+            and self.creator == other.creator and self.firm_name == other.firm_name
+            and np.array_equal(self.work, other.work)
+            and np.array_equal(self.off_requests, other.off_requests)
+            and np.array_equal(self.uncovered, other.uncovered)
+        )
+
+    def __repr__(self) -> str:
+        return f'CompactSchedule({len(self)} workers, {self.days_in_month} days)'
+
+    def summary(self) -> Tuple[int, int]:
+        """
+        Returns the number of "?" cells and of days without full coverage.
+        """
+        return int(popcount(self.uncovered).sum()), int(self.uncovered_days().size)
@@ -0,0 +1,101 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+from .drafts import Draft
+
+
+def cache_key(
+        draft: Draft,
+        **params: Any
+) -> str:
+    """
+    Hashes the normalized schedule input into a content address.
+
+    A draft holds no database or session ids, so the same roster, days and weekly plan
+    give the same key whoever submits them.
+
+    Args:
+        draft (Draft): The creator, the workers and the weekly plan.
+        **params (Any): Further generation parameters such as the target month and the seed.
+
+    Returns:
+        str: The hex digest of the normalized input.
+    """
+    payload = json.dumps(
+        {'draft': draft, 'params': params}, sort_keys=True, default=str
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ScheduleCache:
+    """
+    Thread-safe LRU cache of generated schedules with a size cap.
+    """
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Returns the cached value and marks it as recently used, or None on a miss.
+        """
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """
+        Stores a value, evicting the least recently used entries above the size cap.
+        """
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def peek(self, key: Hashable) -> Optional[Any]:
+        """
+        Returns the cached value without counting a hit or a miss or changing the LRU order.
+        """
+        with self._lock:
+            return self._entries.get(key)
+
+    def discard(self, key: Hashable) -> None:
+        """
+        Removes an entry if present.
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """
+        Removes every entry, the counters are kept.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns the hit, miss and eviction counts and the current size for monitoring.
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self._entries),
+                'max_entries': self.max_entries
+            }
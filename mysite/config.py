@@ -13,6 +13,34 @@ class WeekConfig:
     }
 
 
+class ScheduleConfig:
+    ENGINE = env.get('SCHEDULE_ENGINE', 'fair')
+    RESTARTS = int(env.get('SCHEDULE_RESTARTS', 1))
+    TIME_BUDGET = float(env.get('SCHEDULE_TIME_BUDGET', 1.0))
+    MAX_CONSECUTIVE_DAYS = int(env.get('SCHEDULE_MAX_CONSECUTIVE_DAYS', 5))
+    MIN_REST_DAYS = int(env.get('SCHEDULE_MIN_REST_DAYS', 1))
+    CACHE_SIZE = int(env.get('SCHEDULE_CACHE_SIZE', 128))
+    ROSTER_BATCH_SIZE = int(env.get('ROSTER_BATCH_SIZE', 1000))
+    CSV_CHUNK_ROWS = int(env.get('SCHEDULE_CSV_CHUNK_ROWS', 500))
+    PREVIEW_PAGE_ROWS = int(env.get('SCHEDULE_PREVIEW_PAGE_ROWS', 50))
+    API_MAX_BATCH = int(env.get('SCHEDULE_API_MAX_BATCH', 100))
+    API_MAX_WORKERS = int(env.get('SCHEDULE_API_MAX_WORKERS', 10000))
+    API_MAX_TOTAL_WORKERS = int(env.get('SCHEDULE_API_MAX_TOTAL_WORKERS', 20000))
+    MAX_WORKERS = int(env['SCHEDULE_WORKERS']) if 'SCHEDULE_WORKERS' in env else None
+
+
+class ArchiveConfig:
+    ENABLED = env.get('SCHEDULE_ARCHIVE', '1') == '1'
+    PATH = env.get('SCHEDULE_ARCHIVE_PATH', 'archive')
+    MAX_SEGMENTS = int(env.get('SCHEDULE_ARCHIVE_MAX_SEGMENTS', 64))
+
+
+class SweeperConfig:
+    DRAFT_TTL_HOURS = float(env.get('DRAFT_TTL_HOURS', 24))
+    INTERVAL = float(env.get('SWEEP_INTERVAL', 1800))
+    BATCH_SIZE = int(env.get('SWEEP_BATCH_SIZE', 500))
+
+
 class TestConfig:
     TESTING = True
     PATH_FILE = 'test_data'
@@ -22,6 +50,8 @@ class TestConfig:
 class DefaultConfig:
     DEBUG = True
     DATA_BASE = env.get('DATA_BASE', 'sqlite:///database.db')
+    METRICS_ENABLED = env.get('METRICS_ENABLED', '1') == '1'
+    SWEEPER_ENABLED = env.get('SWEEPER_ENABLED', '1') == '1'
     KEY = '0b0894ef8eb159c8c29d59e4c0a72e4d7b9e9dd2af8de6ec'
 
 
@@ -30,3 +60,9 @@ class Email:
     PASSWORD = 'lvoq yetp osor zhmr'
     DATA_SUBJECT = 'Your schedule'
     DATA_BODY = 'From your Schedule Creator'
+    HOST = env.get('SMTP_HOST', 'smtp.gmail.com')
+    PORT = int(env.get('SMTP_PORT', 465))
+    USE_SSL = env.get('SMTP_SSL', '1') == '1'
+    BATCH_SIZE = int(env.get('SMTP_BATCH_SIZE', 20))
+    MAX_RETRIES = int(env.get('SMTP_MAX_RETRIES', 3))
+    RETRY_BACKOFF = float(env.get('SMTP_RETRY_BACKOFF', 1.0))
@@ -0,0 +1,251 @@
+from ast import literal_eval
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple, Union
+
+from sqlalchemy import literal, null, select, union_all
+
+from .config import WeekConfig
+from .models import First, Second, Third, db
+
+KIND_CREATOR = 0
+KIND_WORKER = 1
+KIND_WEEK = 2
+
+
+class Worker(NamedTuple):
+    name: str
+    days: int
+    personal: Tuple[int, ...]
+
+
+class Draft(NamedTuple):
+    """
+    Everything the scheduler needs from a user's wizard draft.
+    """
+    creator: str
+    firm_name: str
+    workers: Tuple[Worker, ...]
+    week: Tuple[int, ...]
+
+    @property
+    def names(self) -> List[str]:
+        return [worker.name for worker in self.workers]
+
+    @property
+    def dict_days(self) -> List[int]:
+        return [worker.days for worker in self.workers]
+
+    @property
+    def off_days(self) -> List[List[int]]:
+        return [list(worker.personal) for worker in self.workers]
+
+    @property
+    def weekly_plan(self) -> Dict[str, int]:
+        return dict(zip(WeekConfig.WEEKDAYS.values(), self.week))
+
+
+def parse_personal(
+        value: Optional[str]
+) -> Tuple[int, ...]:
+    """
+    Parses a comma separated list of personal days off.
+
+    Args:
+        value (Optional[str]): The personal days off, e.g. '3,14'.
+
+    Returns:
+        Tuple[int, ...]: The days off, empty if none were given.
+    """
+    if not value:
+        return ()
+    return tuple(int(day) for day in value.split(',') if day.strip())
+
+
+def parse_week(
+        value: Optional[str]
+) -> Tuple[int, ...]:
+    """
+    Parses the stored weekly plan, a list literal with the headcount from Monday to Sunday.
+
+    Args:
+        value (Optional[str]): The stored weekly plan, e.g. "['2', '2', '2', '2', '3', '4', '4']".
+
+    Returns:
+        Tuple[int, ...]: The required number of workers for each weekday.
+    """
+    if not value:
+        return (0,) * 7
+    return tuple(int(count or 0) for count in literal_eval(value))
+
+
+def load_draft(
+        user_id: str
+) -> Optional[Draft]:
+    """
+    Loads a user's draft from the three wizard tables in a single query.
+
+    Only the needed columns are selected, no ORM objects are created. The first creator
+    record, the workers in insertion order and the latest weekly plan are used.
+
+    Args:
+        user_id (str): The user ID of the draft.
+
+    Returns:
+        Optional[Draft]: The draft, or None if the user has no creator record.
+    """
+    statement = union_all(
+        select(
+            literal(KIND_CREATOR).label('kind'), First.id.label('id'),
+            First.creator.label('name'), First.firm_name.label('text'),
+            First.number.label('number')
+        ).where(First.user_id == user_id),
+        select(
+            literal(KIND_WORKER), Second.id, Second.name, Second.personal, Second.days
+        ).where(Second.user_id == user_id),
+        select(
+            literal(KIND_WEEK), Third.id, null(), Third.week, null()
+        ).where(Third.user_id == user_id)
+    ).order_by('kind', 'id')
+
+    creator = None
+    workers = []
+    week = None
+    for kind, _, name, text, number in db.session.execute(statement):
+        if kind == KIND_CREATOR:
+            creator = creator or (name, text)
+        elif kind == KIND_WORKER:
+            workers.append(Worker(name, int(number or 0), parse_personal(text)))
+        else:
+            week = text
+
+    if creator is None:
+        return None
+    return Draft(creator[0], creator[1], tuple(workers), parse_week(week))
+
+
+def draft_from_records(
+        data: List[Dict[str, Any]]
+) -> Draft:
+    """
+    Builds a draft from the rows of the first, second and third tables as dictionaries.
+
+    The records are told apart by their keys, not by their position: the creator record
+    has 'creator', the worker records have 'name' and the weekly plan record has 'week'.
+
+    Args:
+        data (List[Dict[str, Any]]): The creator record, the worker records and the weekly plan record, in any order.
+
+    Returns:
+        Draft: The draft.
+
+    Raises:
+        ValueError: If the creator record or the weekly plan record is missing.
+    """
+    creator = next((record for record in data if 'creator' in record), None)
+    week = next((record['week'] for record in data if 'week' in record), None)
+    if creator is None or week is None:
+        raise ValueError('the records need a creator record and a weekly plan record')
+    workers = tuple(
+        Worker(
+            record['name'],
+            int(record.get('days') or 0),
+            parse_personal(record.get('personal'))
+        )
+        for record in data if 'name' in record
+    )
+    return Draft(creator['creator'], creator.get('firm_name'), workers, parse_week(week))
+
+
+def _personal_from_json(
+        value: Any
+) -> Tuple[int, ...]:
+    message = 'personal must be a list of days or a comma separated string'
+    if value is None:
+        return ()
+    if isinstance(value, str):
+        try:
+            return parse_personal(value)
+        except ValueError:
+            raise ValueError(message) from None
+    if isinstance(value, list) and all(isinstance(day, int) for day in value):
+        return tuple(value)
+    raise ValueError(message)
+
+
+def draft_from_json(
+        payload: Any,
+        max_workers: Optional[int] = None
+) -> Draft:
+    """
+    Builds a draft from an API request body.
+
+    The body holds the creator, the firm name, the workers with their days off and
+    personal days off, and the headcount for every weekday from Monday to Sunday, e.g.
+    {"creator": "Ann", "firm_name": "Shop", "week": [2, 2, 2, 2, 3, 4, 4],
+    "workers": [{"name": "Bob", "days": 8, "personal": [3, 14]}]}.
+
+    Args:
+        payload (Any): The decoded JSON body.
+        max_workers (Optional[int]): The largest accepted roster, unlimited if omitted.
+
+    Returns:
+        Draft: The draft.
+
+    Raises:
+        ValueError: If the body is malformed, with a message for the client.
+    """
+    if not isinstance(payload, dict):
+        raise ValueError('the body must be a JSON object')
+    creator = payload.get('creator')
+    if not isinstance(creator, str) or not creator:
+        raise ValueError('creator must be a non-empty string')
+    firm_name = payload.get('firm_name') or ''
+    if not isinstance(firm_name, str):
+        raise ValueError('firm_name must be a string')
+
+    week = payload.get('week')
+    if (not isinstance(week, list) or len(week) != 7
+            or not all(isinstance(count, int) and count >= 0 for count in week)):
+        raise ValueError('week must be a list of 7 non-negative integers, Monday first')
+
+    records = payload.get('workers')
+    if not isinstance(records, list) or not records:
+        raise ValueError('workers must be a non-empty list')
+    if max_workers is not None and len(records) > max_workers:
+        raise ValueError(f'at most {max_workers} workers are accepted')
+
+    workers = []
+    names = set()
+    for index, record in enumerate(records):
+        if not isinstance(record, dict) or not isinstance(record.get('name'), str):
+            raise ValueError(f'workers[{index}] must be an object with a name')
+        # The replan deltas find workers by name, so every name must be unique.
+        if record['name'] in names:
+            raise ValueError(f"workers[{index}]: the name {record['name']} is used twice")
+        names.add(record['name'])
+        days = record.get('days', 0)
+        if not isinstance(days, int) or days < 0:
+            raise ValueError(f'workers[{index}].days must be a non-negative integer')
+        try:
+            personal = _personal_from_json(record.get('personal'))
+        except ValueError as error:
+            raise ValueError(f'workers[{index}].{error}') from None
+        workers.append(Worker(record['name'], days, personal))
+
+    return Draft(creator, firm_name, tuple(workers), tuple(week))
+
+
+def as_draft(
+        data: Union[Draft, List[Dict[str, Any]]]
+) -> Draft:
+    """
+    Returns the input as a draft, converting table records if needed, see draft_from_records.
+
+    Args:
+        data (Union[Draft, List[Dict[str, Any]]]): A draft or table records.
+
+    Returns:
+        Draft: The draft.
+    """
+    if isinstance(data, Draft):
+        return data
+    return draft_from_records(data)
@@ -0,0 +1,375 @@
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .config import ScheduleConfig, WeekConfig
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+OFF = 0
+WORK = 1
+UNCOVERED = 2
+
+LABELS = np.array(['', 'X', '?'], dtype=object)
+
+
+class WorkerState:
+    """
+    Running per-worker counters updated as each day is assigned.
+
+    Attributes:
+        streak (np.ndarray): The current number of consecutive working days.
+        rest (np.ndarray): The number of rest days still required before working again.
+        days_off (np.ndarray): The number of days off assigned so far.
+    """
+    __slots__ = ('streak', 'rest', 'days_off')
+
+    def __init__(self, workers: int) -> None:
+        self.streak = np.zeros(workers, dtype=np.int32)
+        self.rest = np.zeros(workers, dtype=np.int32)
+        self.days_off = np.zeros(workers, dtype=np.int32)
+
+    def available(self, max_consecutive: int) -> np.ndarray:
+        """
+        Returns the mask of workers allowed to work the next day under the rest rules.
+        """
+        return (self.rest == 0) & (self.streak < max_consecutive)
+
+    def advance(self, working: np.ndarray, max_consecutive: int, min_rest: int) -> None:
+        """
+        Updates the counters with the assignment of one day.
+        """
+        self.streak = np.where(working, self.streak + 1, 0)
+        self.rest = np.where(
+            working,
+            np.where(self.streak >= max_consecutive, min_rest, self.rest),
+            np.maximum(self.rest - 1, 0)
+        )
+        self.days_off += ~working
+
+    def copy(self) -> 'WorkerState':
+        """
+        Returns an independent copy of the counters.
+        """
+        state = WorkerState(0)
+        state.streak = self.streak.copy()
+        state.rest = self.rest.copy()
+        state.days_off = self.days_off.copy()
+        return state
+
+    def roll_over(self, matrix: np.ndarray, max_consecutive: int, min_rest: int) -> 'WorkerState':
+        """
+        Returns the counters at the start of the period following the given schedule.
+
+        The streak and the required rest carry over, the days-off count starts again from zero.
+        """
+        state = self.copy()
+        for day in range(matrix.shape[1]):
+            state.advance(matrix[:, day] == WORK, max_consecutive, min_rest)
+        state.days_off[:] = 0
+        return state
+
+
+def row_excess(
+        row: Sequence[bool],
+        max_consecutive: int,
+        min_rest: int,
+        run: int = 0,
+        rest: int = 0
+) -> int:
+    """
+    Counts the working days that break the rest rules in a worker's row.
+
+    Args:
+        row (Sequence[bool]): The working days of a worker.
+        max_consecutive (int): The maximum number of consecutive working days.
+        min_rest (int): The number of days off required after a maximal working streak.
+        run (int): The working streak carried over from the previous period.
+        rest (int): The required rest carried over from the previous period.
+
+    Returns:
+        int: The number of working days beyond the consecutive-days limit or inside a required rest period.
+    """
+    excess = 0
+    for working in row:
+        if not working:
+            run = 0
+            rest = max(0, rest - 1)
+            continue
+        run += 1
+        if run > max_consecutive or rest > 0:
+            excess += 1
+        if run >= max_consecutive:
+            rest = min_rest
+    return excess
+
+
+def weekly_demand(
+        weekly_plan: Dict[str, int],
+        start_weekday: int,
+        days_in_month: int
+) -> np.ndarray:
+    """
+    Expands the weekly plan into the number of required workers for every day of the month.
+
+    Args:
+        weekly_plan (Dict[str, int]): A dictionary mapping weekdays to the required number of workers.
+        start_weekday (int): The starting day of the week (0 = Monday, 6 = Sunday).
+        days_in_month (int): The number of days in the month.
+
+    Returns:
+        np.ndarray: An integer array with the required headcount for each day.
+    """
+    per_weekday = np.array(
+        [weekly_plan[WeekConfig.WEEKDAYS[index]] for index in range(7)],
+        dtype=np.int32
+    )
+    weekdays = (np.arange(days_in_month) + start_weekday) % 7
+    return per_weekday[weekdays]
+
+
+def off_day_mask(
+        off_days: List[List[int]],
+        days_in_month: int
+) -> np.ndarray:
+    """
+    Builds a boolean workers x days mask of the requested personal days off.
+
+    Args:
+        off_days (List[List[int]]): A list of lists where each sublist contains the specific days a worker is unavailable.
+        days_in_month (int): The number of days in the month.
+
+    Returns:
+        np.ndarray: A boolean mask where True marks a day the worker is unavailable.
+    """
+    mask = np.zeros((len(off_days), days_in_month), dtype=bool)
+    rows = [index for index, days in enumerate(off_days) for _ in days]
+    cols = [day - 1 for days in off_days for day in days]
+    if rows:
+        rows = np.asarray(rows)
+        cols = np.asarray(cols)
+        inside = (cols >= 0) & (cols < days_in_month)
+        mask[rows[inside], cols[inside]] = True
+    return mask
+
+
+def assign_days(
+        off_mask: np.ndarray,
+        demand: np.ndarray,
+        rng: np.random.Generator,
+        state: Optional[WorkerState] = None,
+        max_consecutive: int = ScheduleConfig.MAX_CONSECUTIVE_DAYS,
+        min_rest: int = ScheduleConfig.MIN_REST_DAYS
+) -> np.ndarray:
+    """
+    Fills the schedule day by day, picking a random subset of the available workers.
+
+    A worker is available when the day is not one of their personal days off, they have
+    not reached the consecutive-days limit and they are not in a required rest period.
+
+    Args:
+        off_mask (np.ndarray): The boolean workers x days mask of personal days off.
+        demand (np.ndarray): The required headcount for each day.
+        rng (np.random.Generator): The random generator used for the staffing selection.
+        state (Optional[WorkerState]): The running counters, updated in place. Fresh counters are used if omitted.
+        max_consecutive (int): The maximum number of consecutive working days.
+        min_rest (int): The number of days off required after a maximal working streak.
+
+    Returns:
+        np.ndarray: The workers x days schedule matrix.
+    """
+    workers, days = off_mask.shape
+    state = state if state is not None else WorkerState(workers)
+    matrix = np.zeros((workers, days), dtype=np.int8)
+
+    for day in range(days):
+        candidates = np.flatnonzero(~off_mask[:, day] & state.available(max_consecutive))
+        required = min(int(demand[day]), candidates.size)
+        if required > 0:
+            chosen = rng.choice(candidates, size=required, replace=False)
+            matrix[chosen, day] = WORK
+        state.advance(matrix[:, day] == WORK, max_consecutive, min_rest)
+
+    return matrix
+
+
+def _pick_per_row(
+        eligible: np.ndarray,
+        counts: np.ndarray,
+        rng: np.random.Generator
+) -> np.ndarray:
+    """
+    Randomly picks up to counts[row] eligible cells in every row.
+
+    Args:
+        eligible (np.ndarray): A boolean workers x days mask of the cells that may be picked.
+        counts (np.ndarray): The number of cells to pick in each row.
+        rng (np.random.Generator): The random generator used for the selection.
+
+    Returns:
+        np.ndarray: A boolean mask of the picked cells.
+    """
+    keys = rng.random(eligible.shape)
+    keys[~eligible] = 2.0
+    order = np.argsort(keys, axis=1)
+    ranks = np.empty_like(order)
+    np.put_along_axis(
+        ranks, order, np.broadcast_to(np.arange(eligible.shape[1]), order.shape), axis=1
+    )
+    return eligible & (ranks < counts[:, None])
+
+
+def balance_days_off(
+        matrix: np.ndarray,
+        dict_days: List[int],
+        off_mask: np.ndarray,
+        rng: np.random.Generator,
+        days_off: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Adds or removes days off so that every worker gets their total number of days off.
+
+    Personal days off are never turned into working days.
+
+    Args:
+        matrix (np.ndarray): The workers x days schedule matrix.
+        dict_days (List[int]): A list where each element represents the total number of days off for a worker.
+        off_mask (np.ndarray): The boolean workers x days mask of personal days off.
+        rng (np.random.Generator): The random generator used for the selection.
+        days_off (Optional[np.ndarray]): The running days-off counts, updated in place. Counted from the matrix if omitted.
+
+    Returns:
+        np.ndarray: The balanced schedule matrix.
+    """
+    target = np.asarray(dict_days, dtype=np.int32)
+    current = days_off if days_off is not None else (matrix == OFF).sum(axis=1)
+
+    to_off = np.clip(target - current, 0, None)
+    to_work = np.clip(current - target, 0, None)
+
+    rested = _pick_per_row(matrix == WORK, to_off, rng)
+    matrix[rested] = OFF
+    called_in = _pick_per_row((matrix == OFF) & ~off_mask & ~rested, to_work, rng)
+    matrix[called_in] = WORK
+
+    if days_off is not None:
+        days_off += rested.sum(axis=1) - called_in.sum(axis=1)
+    return matrix
+
+
+def mark_uncovered(
+        matrix: np.ndarray,
+        demand: np.ndarray
+) -> np.ndarray:
+    """
+    Marks every non-working cell of an understaffed day as uncovered.
+
+    Args:
+        matrix (np.ndarray): The workers x days schedule matrix.
+        demand (np.ndarray): The required headcount for each day.
+
+    Returns:
+        np.ndarray: The validated schedule matrix.
+    """
+    understaffed = (matrix == WORK).sum(axis=0) < demand
+    matrix[(matrix != WORK) & understaffed[None, :]] = UNCOVERED
+    return matrix
+
+
+def build_schedule(
+        dict_days: List[int],
+        off_days: List[List[int]],
+        start_weekday: int,
+        weekly_plan: Dict[str, int],
+        days_in_month: int,
+        rng: Optional[np.random.Generator] = None,
+        state: Optional[WorkerState] = None,
+        max_consecutive: int = ScheduleConfig.MAX_CONSECUTIVE_DAYS,
+        min_rest: int = ScheduleConfig.MIN_REST_DAYS
+) -> np.ndarray:
+    """
+    Generates a validated schedule matrix with the same rules as look_column.
+
+    Args:
+        dict_days (List[int]): A list where each element represents the total number of days off for a worker.
+        off_days (List[List[int]]): A list of lists where each sublist contains the specific days a worker is unavailable.
+        start_weekday (int): The starting day of the week (0 = Monday, 6 = Sunday).
+        weekly_plan (Dict[str, int]): A dictionary mapping weekdays to the required number of workers.
+        days_in_month (int): The number of days in the month.
+        rng (Optional[np.random.Generator]): The random generator, a fresh one is used if omitted.
+        state (Optional[WorkerState]): The counters carried over from the previous period, updated in place.
+        max_consecutive (int): The maximum number of consecutive working days.
+        min_rest (int): The number of days off required after a maximal working streak.
+
+    Returns:
+        np.ndarray: The workers x days schedule matrix.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    demand = weekly_demand(weekly_plan, start_weekday, days_in_month)
+    off_mask = off_day_mask(off_days, days_in_month)
+    state = state if state is not None else WorkerState(len(off_days))
+
+    matrix = assign_days(off_mask, demand, rng, state, max_consecutive, min_rest)
+    matrix = balance_days_off(matrix, dict_days, off_mask, rng, state.days_off)
+    return mark_uncovered(matrix, demand)
+
+
+def matrix_to_frame(
+        matrix: np.ndarray,
+        index_names: List[str],
+        column_names: List[str]
+) -> 'pd.DataFrame':
+    """
+    Converts a schedule matrix into the labelled schedule grid.
+
+    Args:
+        matrix (np.ndarray): The workers x days schedule matrix.
+        index_names (List[str]): The worker names.
+        column_names (List[str]): The calendar labels.
+
+    Returns:
+        pd.DataFrame: The schedule grid with "X", "" and "?" cells.
+    """
+    import pandas as pd
+
+    return pd.DataFrame(LABELS[matrix], index=index_names, columns=column_names)
+
+
+def frame_to_matrix(
+        data_f: 'pd.DataFrame'
+) -> np.ndarray:
+    """
+    Converts a labelled schedule grid back into a schedule matrix.
+
+    Args:
+        data_f (pd.DataFrame): The schedule grid with "X", "" and "?" cells.
+
+    Returns:
+        np.ndarray: The workers x days schedule matrix, empty or missing cells are days off.
+    """
+    values = data_f.to_numpy()
+    matrix = np.zeros(values.shape, dtype=np.int8)
+    matrix[values == 'X'] = WORK
+    matrix[values == '?'] = UNCOVERED
+    return matrix
+
+
+def schedule_score(
+        matrix: np.ndarray,
+        dict_days: List[int]
+) -> Tuple[int, int]:
+    """
+    Scores a validated schedule, lower is better.
+
+    Args:
+        matrix (np.ndarray): The workers x days schedule matrix.
+        dict_days (List[int]): A list where each element represents the total number of days off for a worker.
+
+    Returns:
+        Tuple[int, int]: The number of "?" cells and the total deviation from the requested days off.
+    """
+    uncovered = int((matrix == UNCOVERED).sum())
+    days_off = (matrix != WORK).sum(axis=1)
+    deviation = int(np.abs(days_off - np.asarray(dict_days, dtype=np.int32)).sum())
+    return uncovered, deviation
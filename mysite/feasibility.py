@@ -0,0 +1,165 @@
+import calendar
+from typing import Dict, List, NamedTuple, Tuple
+
+import numpy as np
+
+from .config import ScheduleConfig
+from .drafts import Draft
+from .engine import weekly_demand
+
+
+class Shortage(NamedTuple):
+    day: int
+    weekday: int
+    required: int
+    available: int
+
+
+class Feasibility(NamedTuple):
+    """
+    What a roster can cover in a month, computed before any schedule is generated.
+
+    Attributes:
+        shortages (Tuple[Shortage, ...]): The days needing more workers than are not on a personal day off.
+        required (int): The working shifts the weekly plan asks for in the month.
+        requested_capacity (int): The working shifts left by the requested days off.
+        rule_capacity (int): The most shifts the roster can work under the personal days off and the rest rules.
+    """
+    shortages: Tuple[Shortage, ...]
+    required: int
+    requested_capacity: int
+    rule_capacity: int
+
+    @property
+    def feasible(self) -> bool:
+        """
+        Whether every day can be staffed at all; the requested days off may still be missed.
+        """
+        return not self.shortages and self.rule_capacity >= self.required
+
+    def messages(self) -> List[str]:
+        """
+        Describes every problem in a sentence, e.g. "Saturday the 14th needs 5, only 3 available".
+        """
+        messages = [
+            f"{calendar.day_name[shortage.weekday]} the {_ordinal(shortage.day)} needs "
+            f"{shortage.required}, only {shortage.available} available"
+            for shortage in self.shortages
+        ]
+        if self.rule_capacity < self.required:
+            messages.append(
+                f"The month needs {self.required} shifts, the rest rules allow at most "
+                f"{self.rule_capacity}"
+            )
+        if self.requested_capacity < self.required:
+            messages.append(
+                f"The month needs {self.required} shifts, the requested days off leave "
+                f"{self.requested_capacity}"
+            )
+        return messages
+
+
+def _ordinal(
+        day: int
+) -> str:
+    suffix = 'th' if 10 <= day % 100 <= 20 else {1: 'st', 2: 'nd', 3: 'rd'}.get(day % 10, 'th')
+    return f'{day}{suffix}'
+
+
+def max_working_days(
+        days_in_month: int,
+        max_consecutive: int,
+        min_rest: int
+) -> int:
+    """
+    Returns the most days a worker can work in a month under the rest rules.
+
+    Args:
+        days_in_month (int): The number of days in the month.
+        max_consecutive (int): The maximum number of consecutive working days.
+        min_rest (int): The number of days off required after a maximal working streak.
+
+    Returns:
+        int: The working days of the densest allowed pattern.
+    """
+    cycle = max_consecutive + min_rest
+    full, rest = divmod(days_in_month, cycle)
+    return full * max_consecutive + min(rest, max_consecutive)
+
+
+def check_feasibility(
+        dict_days: List[int],
+        off_days: List[List[int]],
+        start_weekday: int,
+        weekly_plan: Dict[str, int],
+        days_in_month: int,
+        max_consecutive: int = ScheduleConfig.MAX_CONSECUTIVE_DAYS,
+        min_rest: int = ScheduleConfig.MIN_REST_DAYS
+) -> Feasibility:
+    """
+    Checks in O(workers + days) whether the weekly plan can be staffed at all.
+
+    Every day's headcount is compared with the workers not on a personal day off, and
+    the month's shifts with what the requested days off and the rest rules leave.
+
+    Args:
+        dict_days (List[int]): A list where each element represents the total number of days off for a worker.
+        off_days (List[List[int]]): A list of lists where each sublist contains the specific days a worker is unavailable.
+        start_weekday (int): The starting day of the week (0 = Monday, 6 = Sunday).
+        weekly_plan (Dict[str, int]): A dictionary mapping weekdays to the required number of workers.
+        days_in_month (int): The number of days in the month.
+        max_consecutive (int): The maximum number of consecutive working days.
+        min_rest (int): The number of days off required after a maximal working streak.
+
+    Returns:
+        Feasibility: The shortages and the capacities of the month.
+    """
+    workers = len(dict_days)
+    demand = weekly_demand(weekly_plan, start_weekday, days_in_month)
+
+    personal = [sorted({day for day in days if 1 <= day <= days_in_month}) for days in off_days]
+    taken = np.bincount(
+        np.fromiter((day - 1 for days in personal for day in days), dtype=np.int64),
+        minlength=days_in_month
+    )
+    available = workers - taken
+
+    short_days = np.flatnonzero(available < demand)
+    shortages = tuple(
+        Shortage(int(day) + 1, (start_weekday + int(day)) % 7, int(demand[day]), int(available[day]))
+        for day in short_days
+    )
+
+    free_days = np.fromiter((len(days) for days in personal), dtype=np.int64, count=workers)
+    requested = np.clip(days_in_month - np.asarray(dict_days, dtype=np.int64), 0, None)
+    by_rules = np.minimum(
+        days_in_month - free_days, max_working_days(days_in_month, max_consecutive, min_rest)
+    )
+    return Feasibility(
+        shortages,
+        int(demand.sum()),
+        int(np.minimum(requested, days_in_month - free_days).sum()),
+        int(by_rules.sum())
+    )
+
+
+def check_draft(
+        draft: Draft,
+        year: int,
+        month: int
+) -> Feasibility:
+    """
+    Runs check_feasibility on a draft for the given month.
+
+    Args:
+        draft (Draft): The creator, the workers and the weekly plan.
+        year (int): The year of the month.
+        month (int): The month to schedule.
+
+    Returns:
+        Feasibility: The shortages and the capacities of the month.
+    """
+    start_weekday, days_in_month = calendar.monthrange(year, month)
+    return check_feasibility(
+        draft.dict_days, draft.off_days, start_weekday, draft.weekly_plan, days_in_month
+    )
@@ -0,0 +1,246 @@
+import calendar
+import csv
+import io
+import os
+import re
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, List, NamedTuple, Optional, Tuple, Union
+
+import numpy as np
+
+from .bitset import CompactSchedule
+from .config import ScheduleConfig
+from .drafts import Draft
+from .metrics import STAGE_SECONDS
+from .processor import (SolveResult, best_attempt, count_schedule, generate_attempt,
+                        generate_calendar_labels, plan_attempts, pool_map)
+
+MAX_SHEET_NAME = 31
+
+
+class Location(NamedTuple):
+    name: str
+    draft: Draft
+
+
+class LocationSchedule(NamedTuple):
+    """
+    The solved schedule of one location.
+
+    Attributes:
+        name (str): The location name.
+        draft (Draft): The roster and the weekly plan of the location.
+        result (SolveResult): The best attempt, its matrix copied out of the shared buffer.
+    """
+    name: str
+    draft: Draft
+    result: SolveResult
+
+
+def solve_into(
+        buffer_name: str,
+        offset: int,
+        engine: str,
+        dict_days: List[int],
+        off_days: List[List[int]],
+        start_weekday: int,
+        weekly_plan: Dict[str, int],
+        days_in_month: int,
+        seed: np.random.SeedSequence,
+        time_budget: float
+) -> Tuple[int, float]:
+    """
+    Runs one scheduling attempt and writes its matrix into a shared buffer.
+
+    Only the objective and the solve time travel back through the pool, the matrix is
+    written in place at the given offset.
+
+    Args:
+        buffer_name (str): The name of the shared buffer.
+        offset (int): The byte offset of this attempt's workers x days int8 slot.
+        engine (str): The name of a registered solver.
+        dict_days (List[int]): A list where each element represents the total number of days off for a worker.
+        off_days (List[List[int]]): A list of lists where each sublist contains the specific days a worker is unavailable.
+        start_weekday (int): The starting day of the week (0 = Monday, 6 = Sunday).
+        weekly_plan (Dict[str, int]): A dictionary mapping weekdays to the required number of workers.
+        days_in_month (int): The number of days in the month.
+        seed (np.random.SeedSequence): The seed of this attempt.
+        time_budget (float): The time limit in seconds for optimizing solvers.
+
+    Returns:
+        Tuple[int, float]: The objective value and the solve time in seconds.
+    """
+    result = generate_attempt(
+        engine, dict_days, off_days, start_weekday, weekly_plan, days_in_month, seed, time_budget
+    )
+    # The pool workers share the parent's resource tracker, which unlinks the buffer if the parent dies.
+    buffer = SharedMemory(name=buffer_name)
+    try:
+        _write_slot(buffer, offset, result.matrix)
+    finally:
+        buffer.close()
+    return result.objective, result.solve_time
+
+
+def _write_slot(
+        buffer: SharedMemory,
+        offset: int,
+        matrix: np.ndarray
+) -> None:
+    slot = np.ndarray(matrix.shape, dtype=np.int8, buffer=buffer.buf, offset=offset)
+    slot[:] = matrix
+    del slot
+
+
+def solve_locations(
+        locations: List[Location],
+        year: int,
+        month: int,
+        engine: Optional[str] = None,
+        seed: Optional[int] = None,
+        restarts: Optional[int] = None,
+        time_budget: float = ScheduleConfig.TIME_BUDGET
+) -> List[LocationSchedule]:
+    """
+    Solves the independent rosters of several locations for the same month on the process pool.
+
+    Every attempt of every location gets a slot in one shared int8 buffer and the pool
+    workers write their matrices straight into it, so no schedule is pickled on the way
+    back. The best attempt of each location is copied out before the buffer is released.
+    Locations failing the feasibility check get a single attempt, see plan_attempts.
+
+    Args:
+        locations (List[Location]): The name and the draft of every location.
+        year (int): The year of the month.
+        month (int): The month to schedule.
+        engine (Optional[str]): The name of a registered solver. Defaults to ScheduleConfig.ENGINE.
+        seed (Optional[int]): The seed of the generation, the same seed gives the same schedules.
+        restarts (Optional[int]): The number of attempts per location. Defaults to ScheduleConfig.RESTARTS.
+        time_budget (float): The time limit in seconds of every attempt for optimizing solvers.
+
+    Returns:
+        List[LocationSchedule]: The schedule of every location, in the order of the locations.
+    """
+    engine = engine or ScheduleConfig.ENGINE
+    restarts = max(1, restarts or ScheduleConfig.RESTARTS)
+    start_weekday, days_in_month = calendar.monthrange(year, month)
+
+    attempts = []
+    slots = []
+    spans = []
+    plans = []
+    offset = 0
+    for location, child in zip(locations, np.random.SeedSequence(seed).spawn(len(locations))):
+        draft = location.draft
+        args = (draft.dict_days, draft.off_days, start_weekday, draft.weekly_plan, days_in_month)
+        plan = plan_attempts(*args, child, restarts, time_budget)
+        plans.append(plan)
+        shape = (len(draft.workers), days_in_month)
+        spans.append((len(attempts), len(attempts) + len(plan.seeds)))
+        for attempt_seed in plan.seeds:
+            attempts.append((offset, engine) + args + (attempt_seed, plan.time_budget))
+            slots.append((offset, shape))
+            offset += shape[0] * shape[1]
+
+    buffer = SharedMemory(create=True, size=max(offset, 1))
+    try:
+        with STAGE_SECONDS.time(stage='solve'):
+            if len(attempts) == 1:
+                offset, *args = attempts[0]
+                result = generate_attempt(*args)
+                _write_slot(buffer, offset, result.matrix)
+                solved = [(result.objective, result.solve_time)]
+            else:
+                names = [buffer.name] * len(attempts)
+                chunksize = max(1, len(attempts) // (4 * (os.cpu_count() or 1)))
+                solved = pool_map(solve_into, names, *zip(*attempts), chunksize=chunksize)
+
+        schedules = []
+        for location, (start, stop), plan in zip(locations, spans, plans):
+            views = [
+                np.ndarray(shape, dtype=np.int8, buffer=buffer.buf, offset=slot)
+                for slot, shape in slots[start:stop]
+            ]
+            best = best_attempt(views, location.draft.dict_days)
+            objective, solve_time = solved[start + best]
+            matrix = views[best].copy()
+            del views
+            count_schedule(matrix)
+            schedules.append(LocationSchedule(
+                location.name, location.draft,
+                SolveResult(matrix, objective, solve_time, plan.feasibility)
+            ))
+    finally:
+        buffer.close()
+        buffer.unlink()
+    return schedules
+
+
+def _sheet_names(
+        names: List[str]
+) -> List[str]:
+    """
+    Turns location names into distinct valid XLSX sheet names.
+    """
+    sheets = []
+    for name in names:
+        base = re.sub(r'[\[\]:*?/\\]', ' ', name).strip()[:MAX_SHEET_NAME] or 'Location'
+        sheet, number = base, 1
+        while sheet.lower() in (taken.lower() for taken in sheets):
+            number += 1
+            suffix = f' ({number})'
+            sheet = base[:MAX_SHEET_NAME - len(suffix)] + suffix
+        sheets.append(sheet)
+    return sheets
+
+
+def export_locations(
+        schedules: List[LocationSchedule],
+        year: int,
+        month: int,
+        file_type: str
+) -> Union[str, bytes]:
+    """
+    Merges the schedules of all locations into one export.
+
+    XLSX gets a sheet per location; CSV gets a section per location, each a 'Location'
+    line followed by the schedule grid as write_export writes it, separated by an empty line.
+
+    Args:
+        schedules (List[LocationSchedule]): The solved locations.
+        year (int): The year of the month.
+        month (int): The scheduled month.
+        file_type (str): The type of file, 'csv' or 'xlsx'.
+
+    Returns:
+        Union[str, bytes]: The CSV text or the XLSX workbook.
+    """
+    start_weekday, days_in_month = calendar.monthrange(year, month)
+    columns = generate_calendar_labels(days_in_month, start_weekday)
+    frames = [
+        CompactSchedule.from_matrix(
+            schedule.result.matrix, schedule.draft.names, columns, schedule.draft.off_days,
+            schedule.draft.creator, schedule.draft.firm_name
+        ).to_frame()
+        for schedule in schedules
+    ]
+
+    if file_type == 'csv':
+        with STAGE_SECONDS.time(stage='to_csv'):
+            sections = []
+            for schedule, df in zip(schedules, frames):
+                title = io.StringIO()
+                csv.writer(title, lineterminator='\n').writerow(['Location', schedule.name])
+                sections.append(title.getvalue() + df.to_csv(index=True))
+        return '\n'.join(sections)
+    if file_type == 'xlsx':
+        import pandas as pd
+
+        output = io.BytesIO()
+        with STAGE_SECONDS.time(stage='to_excel'):
+            with pd.ExcelWriter(output, engine='openpyxl') as writer:
+                sheets = _sheet_names([schedule.name for schedule in schedules])
+                for sheet, df in zip(sheets, frames):
+                    df.to_excel(writer, sheet_name=sheet)
+        return output.getvalue()
+    raise ValueError(f"Unknown file type: {file_type}")
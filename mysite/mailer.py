@@ -0,0 +1,343 @@
+import heapq
+import itertools
+import queue
+import smtplib
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from email import encoders
+from email.mime.base import MIMEBase
+from email.mime.multipart import MIMEMultipart
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from .config import Email
+from .metrics import EMAILS, metrics
+
+Attachment = Union[str, Callable[[], str]]
+
+SEND_SECONDS = metrics.histogram('schedule_email_send_seconds', 'Latency of SMTP sends.')
+
+
+def build_message(
+        sender: str,
+        email: str,
+        data: str
+) -> MIMEMultipart:
+    """
+    Builds the email with the schedule file attached.
+
+    Args:
+        sender (str): The sender's email address.
+        email (str): The recipient's email address.
+        data (str): The path to the file to be attached.
+
+    Returns:
+        MIMEMultipart: The message ready to be sent.
+    """
+    msg = MIMEMultipart()
+    msg['From'] = sender
+    msg['To'] = email
+    msg['Subject'] = Email.DATA_SUBJECT
+
+    attachment = MIMEBase('application', 'octet-stream')
+    with open(data, 'rb') as file:
+        attachment.set_payload(file.read())
+    encoders.encode_base64(attachment)
+    attachment.add_header(
+        'Content-Disposition', f'attachment; filename="{Path(data).name}"'
+    )
+    msg.attach(attachment)
+    return msg
+
+
+class MailJob:
+    """
+    A queued email and its delivery status.
+    """
+    __slots__ = ('id', 'email', 'attachment', 'status', 'attempts', 'error',
+                 'queued_at', 'not_before')
+
+    def __init__(self, email: str, attachment: Attachment) -> None:
+        self.id = str(uuid.uuid4())
+        self.email = email
+        self.attachment = attachment
+        self.status = 'queued'
+        self.attempts = 0
+        self.error: Optional[str] = None
+        self.queued_at = time.monotonic()
+        self.not_before = 0.0
+
+    def as_dict(self) -> Dict[str, Union[str, int, None]]:
+        return {
+            'id': self.id,
+            'status': self.status,
+            'attempts': self.attempts,
+            'error': self.error
+        }
+
+
+class MailQueue:
+    """
+    Background email delivery over a reused, authenticated SMTP connection.
+
+    Jobs are sent in batches by a single worker thread. Failed sends reconnect and are
+    retried with exponential backoff, the jobs waiting for a retry are kept in a heap
+    ordered by the time they are due. The connection is closed after being idle.
+    """
+
+    def __init__(
+            self,
+            host: str,
+            port: int,
+            login: Optional[str] = None,
+            password: Optional[str] = None,
+            use_ssl: bool = True,
+            batch_size: int = 20,
+            max_retries: int = 3,
+            backoff: float = 1.0,
+            idle_timeout: float = 30.0,
+            history: int = 1000
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.login = login
+        self.password = password
+        self.use_ssl = use_ssl
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.idle_timeout = idle_timeout
+        self.history = history
+
+        self._queue: queue.Queue = queue.Queue()
+        self._jobs: OrderedDict = OrderedDict()
+        self._deferred: List[Tuple[float, int, MailJob]] = []
+        self._order = itertools.count()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self._connection: Optional[smtplib.SMTP] = None
+        self._last_used = 0.0
+
+        self.sent = 0
+        self.failed = 0
+        self.retries = 0
+        self.send_time = 0.0
+        self.delivery_time = 0.0
+
+    def submit(self, email: str, attachment: Attachment) -> str:
+        """
+        Queues an email and returns its job id immediately.
+
+        Args:
+            email (str): The recipient's email address.
+            attachment (Attachment): The path to the file to attach, or a callable returning it
+                when the job is sent.
+
+        Returns:
+            str: The job id.
+        """
+        job = MailJob(email, attachment)
+        with self._lock:
+            self._jobs[job.id] = job
+            while len(self._jobs) > self.history:
+                self._jobs.popitem(last=False)
+        self._ensure_worker()
+        self._queue.put(job)
+        return job.id
+
+    def status(self, job_id: str) -> Optional[Dict[str, Union[str, int, None]]]:
+        """
+        Returns the delivery status of a job, or None if it is unknown.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job.as_dict() if job is not None else None
+
+    def stats(self) -> Dict[str, Union[int, float]]:
+        """
+        Returns the queue depth, the delivery counters and the average latencies in seconds.
+        """
+        with self._lock:
+            return {
+                'queue_depth': self._queue.qsize() + len(self._deferred),
+                'sent': self.sent,
+                'failed': self.failed,
+                'retries': self.retries,
+                'avg_send_latency': self.send_time / self.sent if self.sent else 0.0,
+                'avg_delivery_latency': self.delivery_time / self.sent if self.sent else 0.0
+            }
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """
+        Waits until every queued job is sent or failed.
+
+        Returns:
+            bool: True if the queue was drained before the timeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Stops the worker thread after the current batch and closes the connection.
+        """
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._thread = None
+        self._stopping.clear()
+
+    def _ensure_worker(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name='mail-queue', daemon=True
+                )
+                self._thread.start()
+
+    def _connect(self) -> smtplib.SMTP:
+        if self._connection is not None:
+            try:
+                self._connection.noop()
+                return self._connection
+            except (smtplib.SMTPException, OSError):
+                self._disconnect()
+
+        if self.use_ssl:
+            connection = smtplib.SMTP_SSL(self.host, self.port, timeout=30)
+        else:
+            connection = smtplib.SMTP(self.host, self.port, timeout=30)
+        if self.login:
+            connection.login(self.login, self.password)
+        self._connection = connection
+        return connection
+
+    def _disconnect(self) -> None:
+        if self._connection is None:
+            return
+        try:
+            self._connection.quit()
+        except (smtplib.SMTPException, OSError):
+            self._connection.close()
+        self._connection = None
+
+    def _due_jobs(self) -> List[MailJob]:
+        now = time.monotonic()
+        due = []
+        while self._deferred and self._deferred[0][0] <= now and len(due) < self.batch_size:
+            due.append(heapq.heappop(self._deferred)[-1])
+        return due
+
+    def _wait_timeout(self) -> float:
+        now = time.monotonic()
+        wake = now + self.idle_timeout
+        if self._connection is not None:
+            wake = self._last_used + self.idle_timeout
+        if self._deferred:
+            wake = min(wake, self._deferred[0][0])
+        return max(0.0, wake - now)
+
+    def _next_batch(self) -> List[MailJob]:
+        batch = self._due_jobs()
+        if not batch:
+            try:
+                batch = [self._queue.get(timeout=self._wait_timeout())]
+            except queue.Empty:
+                if self._connection is not None and \
+                        time.monotonic() >= self._last_used + self.idle_timeout:
+                    self._disconnect()
+                return self._due_jobs()
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            batch = self._next_batch()
+            for job in batch:
+                deferred = False
+                try:
+                    deferred = self._deliver(job)
+                except Exception as error:
+                    # An unexpected error fails the job, never the only worker thread.
+                    self._fail(job, error)
+                finally:
+                    if deferred:
+                        # Stays an unfinished task of the queue until it is sent or failed.
+                        heapq.heappush(self._deferred, (job.not_before, next(self._order), job))
+                    else:
+                        self._queue.task_done()
+        self._disconnect()
+
+    def _fail(self, job: MailJob, error: Exception) -> None:
+        with self._lock:
+            job.status = 'failed'
+            job.error = str(error) or type(error).__name__
+            self.failed += 1
+        EMAILS.inc(status='failed')
+
+    def _deliver(self, job: MailJob) -> bool:
+        """
+        Sends a job once.
+
+        Returns:
+            bool: True if the send failed and the job is to be retried after job.not_before.
+        """
+        job.attempts += 1
+        started = time.monotonic()
+        sender = self.login or Email.LOGIN
+        try:
+            path = job.attachment() if callable(job.attachment) else job.attachment
+            message = build_message(sender, job.email, path).as_string()
+        except Exception as error:
+            # A missing file or a failed export does not get better with retries and
+            # says nothing about the SMTP connection.
+            self._fail(job, error)
+            return False
+
+        try:
+            self._connect().sendmail(sender, job.email, message)
+        except (smtplib.SMTPException, OSError) as error:
+            self._disconnect()
+            if job.attempts > self.max_retries:
+                self._fail(job, error)
+                return False
+            with self._lock:
+                job.error = str(error)
+                job.not_before = time.monotonic() + self.backoff * 2 ** (job.attempts - 1)
+                self.retries += 1
+            return True
+
+        finished = time.monotonic()
+        self._last_used = finished
+        with self._lock:
+            job.status = 'sent'
+            job.error = None
+            self.sent += 1
+            self.send_time += finished - started
+            self.delivery_time += finished - job.queued_at
+        EMAILS.inc(status='sent')
+        SEND_SECONDS.observe(finished - started)
+        return False
+
+
+mail_queue = MailQueue(
+    Email.HOST,
+    Email.PORT,
+    login=Email.LOGIN,
+    password=Email.PASSWORD,
+    use_ssl=Email.USE_SSL,
+    batch_size=Email.BATCH_SIZE,
+    max_retries=Email.MAX_RETRIES,
+    backoff=Email.RETRY_BACKOFF
+)
@@ -0,0 +1,247 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from flask import Flask, Response, g, has_request_context, request
+from sqlalchemy import event
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(
+        names: Sequence[str],
+        values: Sequence[str],
+        extra: str = ''
+) -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    """
+    A monotonically increasing value per label combination.
+    """
+
+    def __init__(self, registry: 'Registry', name: str, documentation: str,
+                 labels: Sequence[str] = ()) -> None:
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        if not self.registry.enabled:
+            return
+        key = tuple(str(labels[name]) for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_format_labels(self.labels, key)} {value}')
+        return lines
+
+
+class Histogram:
+    """
+    Observations counted into cumulative buckets per label combination.
+    """
+
+    def __init__(self, registry: 'Registry', name: str, documentation: str,
+                 labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._values: Dict[LabelValues, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        if not self.registry.enabled:
+            return
+        key = tuple(str(labels[name]) for name in self.labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.setdefault(key, [0.0] * (len(self.buckets) + 3))
+            series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def time(self, **labels: str):
+        """
+        Returns a context manager observing the duration of its block in seconds.
+        """
+        if not self.registry.enabled:
+            return nullcontext()
+        return self._timer(labels)
+
+    @contextmanager
+    def _timer(self, labels: Dict[str, str]) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for key, series in sorted(self._values.items()):
+                cumulative = 0.0
+                for bound, count in zip(self.buckets + (float('inf'),), series):
+                    cumulative += count
+                    le = 'le="{}"'.format('+Inf' if bound == float('inf') else repr(bound))
+                    lines.append(
+                        f'{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}'
+                    )
+                lines.append(f'{self.name}_sum{_format_labels(self.labels, key)} {series[-2]}')
+                lines.append(f'{self.name}_count{_format_labels(self.labels, key)} {series[-1]}')
+        return lines
+
+
+class Gauge:
+    """
+    A value read from a callback when the metrics are rendered.
+    """
+
+    def __init__(self, name: str, documentation: str, read: Callable[[], float],
+                 kind: str = 'gauge') -> None:
+        self.name = name
+        self.documentation = documentation
+        self.read = read
+        self.kind = kind
+
+    def render(self) -> List[str]:
+        return [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} {self.kind}',
+            f'{self.name} {self.read()}'
+        ]
+
+
+class Registry:
+    """
+    Holds the application metrics. Collection is off until enabled, recording is then a no-op.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self._metrics: Dict[str, object] = {}
+
+    def counter(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Counter:
+        return self._metrics.setdefault(name, Counter(self, name, documentation, labels))
+
+    def histogram(self, name: str, documentation: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._metrics.setdefault(
+            name, Histogram(self, name, documentation, labels, buckets)
+        )
+
+    def gauge(self, name: str, documentation: str, read: Callable[[], float],
+              kind: str = 'gauge') -> Gauge:
+        return self._metrics.setdefault(name, Gauge(name, documentation, read, kind))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Registry()
+
+REQUEST_SECONDS = metrics.histogram(
+    'schedule_request_seconds', 'Latency of HTTP requests.', ('endpoint', 'method', 'status')
+)
+STAGE_SECONDS = metrics.histogram(
+    'schedule_stage_seconds', 'Latency of the schedule generation stages.', ('stage',)
+)
+DB_QUERIES = metrics.histogram(
+    'schedule_db_queries_per_request', 'Database queries per HTTP request.', ('endpoint',),
+    buckets=COUNT_BUCKETS
+)
+SCHEDULES_GENERATED = metrics.counter(
+    'schedule_generated_total', 'Generated schedules, cache hits excluded.'
+)
+QUESTION_MARKS = metrics.counter(
+    'schedule_question_marks_total', 'Uncovered "?" cells in generated schedules.'
+)
+EMAILS = metrics.counter(
+    'schedule_emails_total', 'Emails handled by the delivery queue.', ('status',)
+)
+
+
+def _count_query(*_) -> None:
+    if metrics.enabled and has_request_context():
+        g.db_queries = g.get('db_queries', 0) + 1
+
+
+def _start_request() -> None:
+    g.request_started = time.perf_counter()
+    g.db_queries = 0
+
+
+def _finish_request(response: Response) -> Response:
+    started: Optional[float] = g.get('request_started')
+    if started is not None:
+        endpoint = request.endpoint or 'unknown'
+        REQUEST_SECONDS.observe(
+            time.perf_counter() - started,
+            endpoint=endpoint, method=request.method, status=response.status_code
+        )
+        DB_QUERIES.observe(g.get('db_queries', 0), endpoint=endpoint)
+    return response
+
+
+def metrics_view() -> Response:
+    """
+    Returns the collected metrics in the Prometheus text format.
+    """
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
+def instrument_app(
+        app: Flask,
+        engine_provider: Callable[[], object]
+) -> None:
+    """
+    Registers the /metrics endpoint and, when collection is enabled, the request timing hooks
+    and the database query counter.
+
+    The registry is shared by the process, so an app only ever turns collection on: an app
+    created later with METRICS_ENABLED off keeps its own hooks off without stopping the
+    collection of an instrumented one. The app's own setting is kept in app.extensions.
+
+    Args:
+        app (Flask): The Flask application instance.
+        engine_provider (Callable[[], object]): Returns the SQLAlchemy engine, called inside an app context.
+
+    Returns:
+        None
+    """
+    enabled = bool(app.config.get('METRICS_ENABLED', False))
+    app.extensions['metrics'] = enabled
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
+    if not enabled:
+        return
+
+    metrics.enabled = True
+
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    with app.app_context():
+        engine = engine_provider()
+        if not event.contains(engine, 'before_cursor_execute', _count_query):
+            event.listen(engine, 'before_cursor_execute', _count_query)
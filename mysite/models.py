@@ -1,3 +1,5 @@
+from datetime import datetime
+
 from flask_sqlalchemy import SQLAlchemy
 
 db = SQLAlchemy()
@@ -7,12 +9,13 @@ class BaseModel(db.Model):
     __abstract__ = True
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.String(36), nullable=False, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
 
 
 class First(BaseModel):
     __table_name__ = 'first'
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.String(36))
+    user_id = db.Column(db.String(36), index=True)
     creator = db.Column(db.String, nullable=False, unique=True)
     firm_name = db.Column(db.String)
     number = db.Column(db.Integer)
@@ -21,7 +24,7 @@ class First(BaseModel):
 class Second(BaseModel):
     __table_name__ = 'second'
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.String(36))
+    user_id = db.Column(db.String(36), index=True)
     name = db.Column(db.String)
     days = db.Column(db.Integer)
     personal = db.Column(db.String)
@@ -30,5 +33,5 @@ class Second(BaseModel):
 class Third(BaseModel):
     __table_name__ = 'third'
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.String(36))
+    user_id = db.Column(db.String(36), index=True)
     week = db.Column(db.String)
@@ -0,0 +1,190 @@
+import math
+import random
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .config import ScheduleConfig
+from .engine import (WORK, WorkerState, assign_days, balance_days_off,
+                     mark_uncovered, off_day_mask, row_excess, weekly_demand)
+
+SHORTAGE_WEIGHT = 10
+STREAK_WEIGHT = 100
+DEVIATION_WEIGHT = 1
+
+
+def schedule_objective(
+        matrix: np.ndarray,
+        dict_days: List[int],
+        demand: np.ndarray,
+        state: Optional[WorkerState] = None,
+        max_consecutive: int = ScheduleConfig.MAX_CONSECUTIVE_DAYS,
+        min_rest: int = ScheduleConfig.MIN_REST_DAYS
+) -> int:
+    """
+    Computes the weighted objective of a schedule, lower is better and 0 is a perfect schedule.
+
+    Args:
+        matrix (np.ndarray): The workers x days schedule matrix.
+        dict_days (List[int]): A list where each element represents the total number of days off for a worker.
+        demand (np.ndarray): The required headcount for each day.
+        state (Optional[WorkerState]): The counters carried over from the previous period.
+        max_consecutive (int): The maximum number of consecutive working days.
+        min_rest (int): The number of days off required after a maximal working streak.
+
+    Returns:
+        int: The missing staff slots, the days-off deviation and the consecutive-days
+        and rest violations combined with their weights.
+    """
+    work = matrix == WORK
+    shortage = int(np.clip(demand - work.sum(axis=0), 0, None).sum())
+    deviation = int(np.abs(
+        (~work).sum(axis=1) - np.asarray(dict_days, dtype=np.int32)
+    ).sum())
+    state = state if state is not None else WorkerState(len(work))
+    excess = sum(
+        row_excess(row, max_consecutive, min_rest, run, rest)
+        for row, run, rest in zip(work.tolist(), state.streak.tolist(), state.rest.tolist())
+    )
+    return (
+        SHORTAGE_WEIGHT * shortage
+        + DEVIATION_WEIGHT * deviation
+        + STREAK_WEIGHT * excess
+    )
+
+
+def optimize_schedule(
+        dict_days: List[int],
+        off_days: List[List[int]],
+        start_weekday: int,
+        weekly_plan: Dict[str, int],
+        days_in_month: int,
+        rng: np.random.Generator,
+        time_budget: float,
+        state: Optional[WorkerState] = None,
+        max_consecutive: int = ScheduleConfig.MAX_CONSECUTIVE_DAYS,
+        min_rest: int = ScheduleConfig.MIN_REST_DAYS
+) -> np.ndarray:
+    """
+    Improves the greedy schedule with simulated annealing until the time budget runs out.
+
+    Coverage of the weekly plan, the requested days off and the rest rules are
+    optimized together. Personal days off are never assigned. The best schedule
+    found so far is returned when the budget is spent or a perfect schedule is reached.
+
+    Args:
+        dict_days (List[int]): A list where each element represents the total number of days off for a worker.
+        off_days (List[List[int]]): A list of lists where each sublist contains the specific days a worker is unavailable.
+        start_weekday (int): The starting day of the week (0 = Monday, 6 = Sunday).
+        weekly_plan (Dict[str, int]): A dictionary mapping weekdays to the required number of workers.
+        days_in_month (int): The number of days in the month.
+        rng (np.random.Generator): The random generator used for the search.
+        time_budget (float): The search time limit in seconds.
+        state (Optional[WorkerState]): The counters carried over from the previous period.
+        max_consecutive (int): The maximum number of consecutive working days.
+        min_rest (int): The number of days off required after a maximal working streak.
+
+    Returns:
+        np.ndarray: The best validated workers x days schedule matrix found.
+    """
+    deadline = time.perf_counter() + time_budget
+    demand = weekly_demand(weekly_plan, start_weekday, days_in_month)
+    off_mask = off_day_mask(off_days, days_in_month)
+    state = state if state is not None else WorkerState(len(off_days))
+    carried_run = state.streak.tolist()
+    carried_rest = state.rest.tolist()
+    start = balance_days_off(
+        assign_days(off_mask, demand, rng, state.copy(), max_consecutive, min_rest),
+        dict_days, off_mask, rng
+    )
+
+    work = (start == WORK).tolist()
+    blocked = off_mask.tolist()
+    needed = demand.tolist()
+    coverage = (start == WORK).sum(axis=0).tolist()
+    target = [int(days) for days in dict_days]
+    worked = [sum(row) for row in work]
+    excess = [
+        row_excess(row, max_consecutive, min_rest, carried_run[worker], carried_rest[worker])
+        for worker, row in enumerate(work)
+    ]
+    workers = len(work)
+    days = days_in_month
+
+    def row_cost(worker: int) -> int:
+        return (
+            DEVIATION_WEIGHT * abs(days - worked[worker] - target[worker])
+            + STREAK_WEIGHT * excess[worker]
+        )
+
+    objective = (
+        SHORTAGE_WEIGHT * sum(max(0, needed[day] - coverage[day]) for day in range(days))
+        + sum(row_cost(worker) for worker in range(workers))
+    )
+    best_objective = objective
+    best_work = [row[:] for row in work]
+
+    py_rng = random.Random(int(rng.integers(2 ** 63)))
+    temperature = 2.0
+    iterations = 0
+
+    def toggle(worker: int, day: int) -> int:
+        row = work[worker]
+        before = SHORTAGE_WEIGHT * max(0, needed[day] - coverage[day])
+        row[day] = not row[day]
+        step = 1 if row[day] else -1
+        coverage[day] += step
+        worked[worker] += step
+        return SHORTAGE_WEIGHT * max(0, needed[day] - coverage[day]) - before
+
+    while workers and objective > 0:
+        if iterations % 256 == 0:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            temperature = 0.05 + 2.0 * remaining / time_budget
+        iterations += 1
+
+        worker = py_rng.randrange(workers)
+        row = work[worker]
+        first = py_rng.randrange(days)
+        if not row[first]:
+            if blocked[worker][first]:
+                continue
+            if coverage[first] >= needed[first] and py_rng.random() < 0.5:
+                day = py_rng.randrange(days)
+                if needed[day] > coverage[day]:
+                    first = day
+                    if row[first] or blocked[worker][first]:
+                        continue
+        moves = [first]
+        if py_rng.random() < 0.7:
+            second = py_rng.randrange(days)
+            if row[second] != row[first] and not blocked[worker][second]:
+                moves.append(second)
+
+        before = row_cost(worker)
+        delta = -before
+        for day in moves:
+            delta += toggle(worker, day)
+        old_excess = excess[worker]
+        excess[worker] = row_excess(
+            row, max_consecutive, min_rest, carried_run[worker], carried_rest[worker]
+        )
+        delta += row_cost(worker)
+
+        if delta <= 0 or py_rng.random() < math.exp(-delta / temperature):
+            objective += delta
+            if objective < best_objective:
+                best_objective = objective
+                best_work = [row[:] for row in work]
+        else:
+            for day in moves:
+                toggle(worker, day)
+            excess[worker] = old_excess
+
+    matrix = np.zeros((workers, days), dtype=np.int8)
+    if workers:
+        matrix[np.asarray(best_work, dtype=bool)] = WORK
+    return mark_uncovered(matrix, demand)
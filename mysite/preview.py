@@ -0,0 +1,116 @@
+from typing import Any, Dict, List, NamedTuple, Tuple
+
+from .bitset import CompactSchedule
+from .config import ScheduleConfig
+from .engine import LABELS
+
+
+class PreviewRow(NamedTuple):
+    name: str
+    cells: List[str]
+    days_worked: int
+
+
+class PreviewPage(NamedTuple):
+    """
+    One page of workers of a schedule preview.
+
+    Attributes:
+        page (int): The page number, starting from 1.
+        pages (int): The number of pages, at least 1.
+        per_page (int): The number of workers on a full page.
+        total (int): The number of workers in the schedule.
+        rows (List[PreviewRow]): The workers of the page with their cells.
+    """
+    page: int
+    pages: int
+    per_page: int
+    total: int
+    rows: List[PreviewRow]
+
+    @property
+    def first(self) -> int:
+        """
+        The position of the page's first worker, starting from 1.
+        """
+        return min((self.page - 1) * self.per_page + 1, self.total)
+
+    @property
+    def last(self) -> int:
+        return (self.page - 1) * self.per_page + len(self.rows)
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            'page': self.page,
+            'pages': self.pages,
+            'per_page': self.per_page,
+            'total': self.total,
+            'rows': [row._asdict() for row in self.rows]
+        }
+
+
+class PreviewSummary(NamedTuple):
+    """
+    The figures shown above and below the preview, computed from the whole schedule.
+
+    Attributes:
+        columns (Tuple[str, ...]): The calendar labels.
+        coverage (List[int]): The number of working workers on every day.
+        uncovered_cells (int): The number of "?" cells.
+        uncovered_days (List[int]): The days of the month, starting from 1, with "?" cells.
+    """
+    columns: Tuple[str, ...]
+    coverage: List[int]
+    uncovered_cells: int
+    uncovered_days: List[int]
+
+
+def summarize(
+        compact: CompactSchedule
+) -> PreviewSummary:
+    """
+    Computes the coverage and the "?" figures of a schedule from its bitsets.
+
+    Args:
+        compact (CompactSchedule): The schedule.
+
+    Returns:
+        PreviewSummary: The calendar labels, the daily coverage and the uncovered days.
+    """
+    uncovered_cells, _ = compact.summary()
+    return PreviewSummary(
+        compact.columns,
+        compact.coverage().tolist(),
+        uncovered_cells,
+        compact.uncovered_days().tolist()
+    )
+
+
+def preview_page(
+        compact: CompactSchedule,
+        page: int = 1,
+        per_page: int = ScheduleConfig.PREVIEW_PAGE_ROWS
+) -> PreviewPage:
+    """
+    Unpacks the labelled cells of one page of workers, the rest of the schedule stays packed.
+
+    Args:
+        compact (CompactSchedule): The schedule.
+        page (int): The page number, clamped to the existing pages.
+        per_page (int): The number of workers on a page.
+
+    Returns:
+        PreviewPage: The workers of the page with their cells.
+    """
+    per_page = max(per_page, 1)
+    pages = max(-(-len(compact) // per_page), 1)
+    page = min(max(page, 1), pages)
+    start = (page - 1) * per_page
+    window = compact.rows(start, start + per_page)
+
+    cells = LABELS[window.to_matrix()].tolist()
+    rows = [
+        PreviewRow(name, row, int(worked))
+        for name, row, worked in zip(window.names, cells, window.days_worked())
+    ]
+    return PreviewPage(page, pages, per_page, len(compact), rows)
@@ -1,107 +1,160 @@
 import calendar
+import logging
+import multiprocessing
 import os
 import random
-import smtplib
-from datetime import datetime
-from email import encoders
-from email.mime.base import MIMEBase
-from email.mime.multipart import MIMEMultipart
-from pathlib import Path
-from typing import Any, Dict, List
-
-import pandas as pd
+import time
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date, datetime
+from multiprocessing import resource_tracker
+from typing import (TYPE_CHECKING, Any, Callable, Dict, Iterator, List, NamedTuple,
+                    Optional, Sequence, Tuple, Union)
+
+import numpy as np
 from flask import Flask
-
-from .config import Email, WeekConfig
-from .models import db
+from sqlalchemy import insert, inspect, text
+
+from .archive import schedule_archive
+from .bitset import CompactSchedule
+from .cache import ScheduleCache, cache_key
+from .config import ArchiveConfig, ScheduleConfig, WeekConfig
+from .drafts import Draft, as_draft
+from .engine import (UNCOVERED, WORK, WorkerState, build_schedule, frame_to_matrix,
+                     matrix_to_frame, schedule_score, weekly_demand)
+from .feasibility import Feasibility, check_draft, check_feasibility
+from .mailer import mail_queue
+from .metrics import (QUESTION_MARKS, SCHEDULES_GENERATED, STAGE_SECONDS,
+                      metrics)
+from .models import Second, db
+from .optimizer import optimize_schedule, schedule_objective
+from .rotation import build_fair_schedule
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+schedule_cache = ScheduleCache(ScheduleConfig.CACHE_SIZE)
+user_schedules = ScheduleCache(ScheduleConfig.CACHE_SIZE)
+
+
+EXPORT_TYPES = ('csv', 'xlsx')
+_export_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='schedule-export')
+_exports: Dict[Tuple[str, str], Future] = {}
+_exports_lock = threading.Lock()
+
+metrics.gauge(
+    'schedule_cache_hits_total', 'Schedule cache hits.',
+    lambda: schedule_cache.hits, kind='counter'
+)
+metrics.gauge(
+    'schedule_cache_misses_total', 'Schedule cache misses.',
+    lambda: schedule_cache.misses, kind='counter'
+)
+metrics.gauge(
+    'schedule_cache_evictions_total', 'Schedule cache evictions.',
+    lambda: schedule_cache.evictions, kind='counter'
+)
+metrics.gauge(
+    'schedule_mail_queue_depth', 'Emails waiting for delivery.',
+    lambda: mail_queue.stats()['queue_depth']
+)
 
 
 def look_column(
-        data_f: pd.DataFrame,
+        data_f: 'pd.DataFrame',
         dict_days: List[int],
         off_days: List[List[int]],
         start_weekday: int,
-        weekly_plan: Dict[str, int]
-) -> pd.DataFrame:
+        weekly_plan: Dict[str, int],
+        rng: Optional[random.Random] = None,
+        state: Optional[WorkerState] = None,
+        max_consecutive: int = ScheduleConfig.MAX_CONSECUTIVE_DAYS,
+        min_rest: int = ScheduleConfig.MIN_REST_DAYS
+) -> 'pd.DataFrame':
     """
     Adjusts the schedule based on worker availability, weekly plans, and required workers.
 
+    The current working streak, the remaining rest days and the working and free days of
+    every worker are kept as running state and updated as each day is assigned.
+
     Args:
         data_f (pd.DataFrame): A DataFrame representing the schedule grid.
         dict_days (List[int]): A list where each element represents the total number of days off for a worker.
         off_days (List[List[int]]): A list of lists where each sublist contains the specific days a worker is unavailable.
         start_weekday (int): The starting day of the week (0 = Monday, 6 = Sunday).
         weekly_plan (Dict[str, int]): A dictionary mapping weekdays to the required number of workers.
+        rng (Optional[random.Random]): The random generator, a fresh one is used if omitted.
+        state (Optional[WorkerState]): The streak and rest counters carried over from the previous period.
+        max_consecutive (int): The maximum number of consecutive working days.
+        min_rest (int): The number of days off required after a maximal working streak.
 
     Returns:
         pd.DataFrame: The modified schedule grid.
     """
+    rng = rng if rng is not None else random.Random()
+    workers_count = data_f.shape[0]
+    personal = [set(days) for days in off_days]
+    state = state if state is not None else WorkerState(workers_count)
+    streak = state.streak.tolist()
+    rest = state.rest.tolist()
+    working_days: List[List[int]] = [[] for _ in range(workers_count)]
+    free_days: List[List[int]] = [[] for _ in range(workers_count)]
+
     for day in range(data_f.shape[1]):
         weekday_index = (day + start_weekday) % 7
         weekday_key = WeekConfig.WEEKDAYS[weekday_index]
         required_workers = weekly_plan[weekday_key]
 
-        workers = list(range(data_f.shape[0]))
-        random.shuffle(workers)
-
-        for worker_index in range(data_f.shape[0]):
-            if day + 1 in off_days[worker_index]:
-                data_f.iloc[worker_index, day] = ""
-                if worker_index in workers:
-                    workers.remove(worker_index)
+        workers = list(range(workers_count))
+        rng.shuffle(workers)
 
-        for worker_index in workers[:]:
-            prev_days = data_f.iloc[worker_index, max(0, day - 5):day]
-            if prev_days.tolist().count("X") >= 5:
+        available = []
+        for worker_index in workers:
+            if day + 1 in personal[worker_index] or rest[worker_index] > 0 \
+                    or streak[worker_index] >= max_consecutive:
                 data_f.iloc[worker_index, day] = ""
-                workers.remove(worker_index)
+                free_days[worker_index].append(day)
+            else:
+                available.append(worker_index)
 
         if required_workers > 0:
-            available_workers = workers[:required_workers]
-            for worker_index in available_workers:
+            for worker_index in available[:required_workers]:
                 data_f.iloc[worker_index, day] = "X"
+                working_days[worker_index].append(day)
 
-            for worker_index in workers[required_workers:]:
+            for worker_index in available[required_workers:]:
                 data_f.iloc[worker_index, day] = ""
-
-        workers_working = [
-            i for i in range(data_f.shape[0]) if data_f.iloc[i, day] == "X"
-        ]
-        if len(workers_working) < required_workers:
-            additional_workers_needed = required_workers - len(workers_working)
-            available_workers = [
-                i for i in workers if i not in workers_working
-            ]
-            random.shuffle(available_workers)
-            for i in available_workers[:additional_workers_needed]:
-                data_f.iloc[i, day] = "X"
-
-    for worker_index in range(data_f.shape[0]):
+                free_days[worker_index].append(day)
+
+        for worker_index in range(workers_count):
+            if working_days[worker_index] and working_days[worker_index][-1] == day:
+                streak[worker_index] += 1
+                if streak[worker_index] >= max_consecutive:
+                    rest[worker_index] = min_rest
+            else:
+                streak[worker_index] = 0
+                rest[worker_index] = max(0, rest[worker_index] - 1)
+
+    for worker_index in range(workers_count):
         total_days_off = dict_days[worker_index]
-        current_days_off = data_f.iloc[
-            worker_index
-        ].apply(lambda x: x == "").sum()
+        current_days_off = len(free_days[worker_index])
 
         if current_days_off < total_days_off:
             days_to_off = total_days_off - current_days_off
-            working_days = [
-                day for day in range(
-                    data_f.shape[1]
-                ) if data_f.iloc[worker_index, day] == "X"
-            ]
-            random.shuffle(working_days)
-            for day in working_days[:days_to_off]:
+            rng.shuffle(working_days[worker_index])
+            for day in working_days[worker_index][:days_to_off]:
                 data_f.iloc[worker_index, day] = ""
 
         elif current_days_off > total_days_off:
             excess_days_off = current_days_off - total_days_off
-            off_days_list = [
-                day for day in range(
-                    data_f.shape[1]
-                ) if data_f.iloc[worker_index, day] == ""
-            ]
-            random.shuffle(off_days_list)
-            for day in off_days_list[:excess_days_off]:
+            rng.shuffle(free_days[worker_index])
+            for day in free_days[worker_index][:excess_days_off]:
                 data_f.iloc[worker_index, day] = "X"
 
     return data_f
@@ -130,129 +183,494 @@ def generate_calendar_labels(
     return labels
 
 
-def extract_off_days(
-        data: List[Dict[str, Any]]
-) -> List[List[int]]:
+def validate_schedule_with_question_marks(
+        data_f: 'pd.DataFrame',
+        weekly_plan: Dict[str, int],
+        start_weekday: int
+) -> 'pd.DataFrame':
     """
-    Extracts the list of days off for each worker.
+    Validates the schedule and fills missing worker slots with question marks.
 
     Args:
-        data (List[Dict[str, Any]]): A list of worker data dictionaries.
+        data_f (pd.DataFrame): The schedule grid.
+        weekly_plan (Dict[str, int]): The weekly plan with required workers per day.
+        start_weekday (int): The starting weekday of the schedule.
 
     Returns:
-        List[List[int]]: A list of lists where each sublist contains the days off for a worker.
+        pd.DataFrame: The validated schedule grid.
     """
-    off_days = []
-    for worker in data[1:-1]:
-        personal_days = list(
-            map(int, worker['personal'].split(','))
-        ) if 'personal' in worker else []
-        off_days.append(personal_days)
-    return off_days
+    for day in range(data_f.shape[1]):
+        weekday_index = (day + start_weekday) % 7
+        weekday_key = WeekConfig.WEEKDAYS[weekday_index]
+        required_workers = weekly_plan[weekday_key]
 
+        workers_present = data_f.iloc[:, day].apply(lambda x: x == "X").sum()
 
-def extract_dict_days(
-        data: List[Dict[str, Any]]
-) -> List[int]:
+        if workers_present < required_workers:
+            for worker_index in range(data_f.shape[0]):
+                if data_f.iloc[worker_index, day] != "X":
+                    data_f.iloc[worker_index, day] = "?"
+
+    return data_f
+
+
+class SolveResult(NamedTuple):
+    """
+    A solved schedule.
+
+    Attributes:
+        matrix (np.ndarray): The workers x days schedule matrix.
+        objective (int): The objective value, see optimizer.schedule_objective.
+        solve_time (float): The solve time in seconds.
+        feasibility (Optional[Feasibility]): The feasibility check of the input, set on the best attempt.
     """
-    Extracts the total number of days off for each worker.
+    matrix: np.ndarray
+    objective: int
+    solve_time: float
+    feasibility: Optional[Feasibility] = None
+
+
+Solver = Callable[
+    [List[int], List[List[int]], int, Dict[str, int], int, np.random.SeedSequence, float, WorkerState],
+    np.ndarray
+]
+
+SOLVERS: Dict[str, Solver] = {}
+
+
+def register_solver(
+        name: str
+) -> Callable[[Solver], Solver]:
+    """
+    Registers a scheduling backend under the given name.
+
+    A solver receives the days off per worker, the personal days off, the starting
+    weekday, the weekly plan, the number of days in the month, a seed, a time budget
+    in seconds and the counters carried over from the previous period, and returns a
+    validated workers x days schedule matrix.
 
     Args:
-        data (List[Dict[str, Any]]): A list of worker data dictionaries.
+        name (str): The name used to select the solver, e.g. in ScheduleConfig.ENGINE.
 
     Returns:
-        List[int]: A list of total days off for each worker.
+        Callable[[Solver], Solver]: A decorator registering the solver.
     """
-    return [worker['days'] for worker in data[1:-1] if 'days' in worker]
+    def decorator(solver: Solver) -> Solver:
+        SOLVERS[name] = solver
+        return solver
+    return decorator
 
 
-def extract_weekly_plan(
-        data: List[Dict[str, Any]]
-) -> Dict[str, int]:
+@register_solver('numpy')
+def numpy_solver(
+        dict_days: List[int],
+        off_days: List[List[int]],
+        start_weekday: int,
+        weekly_plan: Dict[str, int],
+        days_in_month: int,
+        seed: np.random.SeedSequence,
+        time_budget: float,
+        state: WorkerState
+) -> np.ndarray:
+    """
+    Greedy vectorized solver, see engine.build_schedule.
+    """
+    return build_schedule(
+        dict_days, off_days, start_weekday, weekly_plan, days_in_month,
+        rng=np.random.default_rng(seed),
+        state=state
+    )
+
+
+@register_solver('pandas')
+def pandas_solver(
+        dict_days: List[int],
+        off_days: List[List[int]],
+        start_weekday: int,
+        weekly_plan: Dict[str, int],
+        days_in_month: int,
+        seed: np.random.SeedSequence,
+        time_budget: float,
+        state: WorkerState
+) -> np.ndarray:
+    """
+    Greedy cell-by-cell solver, see look_column.
+    """
+    import pandas as pd
+
+    rng = random.Random(int(seed.generate_state(1)[0]))
+    df = pd.DataFrame(index=range(len(dict_days)), columns=range(days_in_month))
+    df = look_column(
+        df, dict_days, off_days, start_weekday, weekly_plan, rng=rng, state=state
+    )
+    df = validate_schedule_with_question_marks(df, weekly_plan, start_weekday)
+    return frame_to_matrix(df)
+
+
+@register_solver('local_search')
+def local_search_solver(
+        dict_days: List[int],
+        off_days: List[List[int]],
+        start_weekday: int,
+        weekly_plan: Dict[str, int],
+        days_in_month: int,
+        seed: np.random.SeedSequence,
+        time_budget: float,
+        state: WorkerState
+) -> np.ndarray:
+    """
+    Optimizing solver, see optimizer.optimize_schedule.
     """
-    Extracts the weekly plan from the data.
+    return optimize_schedule(
+        dict_days, off_days, start_weekday, weekly_plan, days_in_month,
+        rng=np.random.default_rng(seed),
+        time_budget=time_budget,
+        state=state
+    )
+
+
+@register_solver('fair')
+def fair_solver(
+        dict_days: List[int],
+        off_days: List[List[int]],
+        start_weekday: int,
+        weekly_plan: Dict[str, int],
+        days_in_month: int,
+        seed: np.random.SeedSequence,
+        time_budget: float,
+        state: WorkerState
+) -> np.ndarray:
+    """
+    Priority-queue solver balancing days off and weekends, see rotation.build_fair_schedule.
+    """
+    return build_fair_schedule(
+        dict_days, off_days, start_weekday, weekly_plan, days_in_month,
+        rng=np.random.default_rng(seed),
+        state=state
+    )
+
+
+def generate_attempt(
+        engine: str,
+        dict_days: List[int],
+        off_days: List[List[int]],
+        start_weekday: int,
+        weekly_plan: Dict[str, int],
+        days_in_month: int,
+        seed: np.random.SeedSequence,
+        time_budget: float,
+        state: Optional[WorkerState] = None
+) -> SolveResult:
+    """
+    Runs a single randomized scheduling attempt with the selected solver.
 
     Args:
-        data (List[Dict[str, Any]]): A list of worker data dictionaries.
+        engine (str): The name of a registered solver.
+        dict_days (List[int]): A list where each element represents the total number of days off for a worker.
+        off_days (List[List[int]]): A list of lists where each sublist contains the specific days a worker is unavailable.
+        start_weekday (int): The starting day of the week (0 = Monday, 6 = Sunday).
+        weekly_plan (Dict[str, int]): A dictionary mapping weekdays to the required number of workers.
+        days_in_month (int): The number of days in the month.
+        seed (np.random.SeedSequence): The seed of this attempt.
+        time_budget (float): The time limit in seconds for optimizing solvers.
+        state (Optional[WorkerState]): The counters carried over from the previous period, left unchanged.
 
     Returns:
-        Dict[str, int]: A dictionary mapping weekdays to the required number of workers.
+        SolveResult: The validated schedule matrix, its objective value and the solve time in seconds.
     """
-    week_string = data[-1]['week']
-    week_values = list(map(int, eval(week_string)))
-    weekdays_keys = list(WeekConfig.WEEKDAYS.values())
-    return dict(zip(weekdays_keys, week_values))
+    if engine not in SOLVERS:
+        raise ValueError(f"Unknown scheduling engine: {engine}")
+    state = state.copy() if state is not None else WorkerState(len(dict_days))
+
+    started = time.perf_counter()
+    matrix = SOLVERS[engine](
+        dict_days, off_days, start_weekday, weekly_plan, days_in_month,
+        seed, time_budget, state.copy()
+    )
+    solve_time = time.perf_counter() - started
 
+    demand = weekly_demand(weekly_plan, start_weekday, days_in_month)
+    objective = schedule_objective(matrix, dict_days, demand, state)
+    return SolveResult(matrix, objective, solve_time)
 
-def validate_schedule_with_question_marks(
-        data_f: pd.DataFrame,
+
+def _get_pool() -> ProcessPoolExecutor:
+    """
+    Returns the process pool shared by the multi-restart generation, creating it on first use.
+
+    The workers are started from a fork server, or spawned where there is none, and never
+    forked from the web process: by then the mail queue, the sweeper and the export
+    threads are running, and a fork can copy a lock one of them holds.
+
+    Returns:
+        ProcessPoolExecutor: The process pool.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # The workers share the parent's resource tracker only if it runs before they start.
+            resource_tracker.ensure_running()
+            method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+            _pool = ProcessPoolExecutor(
+                max_workers=ScheduleConfig.MAX_WORKERS,
+                mp_context=multiprocessing.get_context(method)
+            )
+        return _pool
+
+
+def _discard_pool(
+        pool: ProcessPoolExecutor
+) -> None:
+    """
+    Drops a broken pool, so the next _get_pool creates a new one.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def pool_map(
+        fn: Callable,
+        *iterables: Sequence,
+        chunksize: int = 1
+) -> List[Any]:
+    """
+    Maps a function over the process pool and returns the results in order.
+
+    When a worker dies, e.g. killed for running out of memory, the pool is broken for
+    good. It is then replaced and the map is run once more on the new pool.
+
+    Args:
+        fn (Callable): A picklable module-level function.
+        *iterables (Sequence): The arguments, one sequence per parameter.
+        chunksize (int): The number of calls sent to a worker at a time.
+
+    Returns:
+        List[Any]: The results.
+    """
+    pool = _get_pool()
+    try:
+        return list(pool.map(fn, *iterables, chunksize=chunksize))
+    except BrokenProcessPool:
+        logger.warning('The process pool broke, retrying on a new pool')
+        _discard_pool(pool)
+    return list(_get_pool().map(fn, *iterables, chunksize=chunksize))
+
+
+class AttemptPlan(NamedTuple):
+    """
+    The attempts to run for one month.
+
+    Attributes:
+        seeds (List[np.random.SeedSequence]): The seed of every attempt.
+        time_budget (float): The time limit in seconds of every attempt for optimizing solvers.
+        feasibility (Feasibility): The feasibility check of the month.
+    """
+    seeds: List[np.random.SeedSequence]
+    time_budget: float
+    feasibility: Feasibility
+
+
+def plan_attempts(
+        dict_days: List[int],
+        off_days: List[List[int]],
+        start_weekday: int,
         weekly_plan: Dict[str, int],
-        start_weekday: int
-) -> pd.DataFrame:
+        days_in_month: int,
+        seed: np.random.SeedSequence,
+        restarts: int,
+        time_budget: float
+) -> AttemptPlan:
     """
-    Validates the schedule and fills missing worker slots with question marks.
+    Checks the feasibility of a month and picks the seeds and the time budget of its attempts.
+
+    When the plan cannot be staffed, no search can remove the "?" cells, so a single
+    attempt is made without a time budget, i.e. optimizing solvers skip their refinement.
 
     Args:
-        data_f (pd.DataFrame): The schedule grid.
-        weekly_plan (Dict[str, int]): The weekly plan with required workers per day.
-        start_weekday (int): The starting weekday of the schedule.
+        dict_days (List[int]): A list where each element represents the total number of days off for a worker.
+        off_days (List[List[int]]): A list of lists where each sublist contains the specific days a worker is unavailable.
+        start_weekday (int): The starting day of the week (0 = Monday, 6 = Sunday).
+        weekly_plan (Dict[str, int]): A dictionary mapping weekdays to the required number of workers.
+        days_in_month (int): The number of days in the month.
+        seed (np.random.SeedSequence): The seed the attempt seeds are spawned from.
+        restarts (int): The number of independent attempts.
+        time_budget (float): The time limit in seconds of every attempt for optimizing solvers.
 
     Returns:
-        pd.DataFrame: The validated schedule grid.
+        AttemptPlan: The seeds, the time budget and the feasibility check.
     """
-    for day in range(data_f.shape[1]):
-        weekday_index = (day + start_weekday) % 7
-        weekday_key = WeekConfig.WEEKDAYS[weekday_index]
-        required_workers = weekly_plan[weekday_key]
+    with STAGE_SECONDS.time(stage='feasibility'):
+        feasibility = check_feasibility(
+            dict_days, off_days, start_weekday, weekly_plan, days_in_month
+        )
+    seeds = seed.spawn(max(1, restarts))
+    if not feasibility.feasible:
+        return AttemptPlan(seeds[:1], 0.0, feasibility)
+    return AttemptPlan(seeds, time_budget, feasibility)
 
-        workers_present = data_f.iloc[:, day].apply(lambda x: x == "X").sum()
 
-        if workers_present < required_workers:
-            for worker_index in range(data_f.shape[0]):
-                if data_f.iloc[worker_index, day] != "X":
-                    data_f.iloc[worker_index, day] = "?"
+def best_attempt(
+        matrices: Sequence[np.ndarray],
+        dict_days: List[int]
+) -> int:
+    """
+    Returns the index of the matrix with the fewest "?" cells and the smallest days-off deviation.
+    """
+    return min(range(len(matrices)), key=lambda index: schedule_score(matrices[index], dict_days))
 
-    return data_f
 
+def count_schedule(
+        matrix: np.ndarray
+) -> None:
+    """
+    Counts a generated schedule and its "?" cells in the metrics.
+    """
+    SCHEDULES_GENERATED.inc()
+    QUESTION_MARKS.inc(int((matrix == UNCOVERED).sum()))
 
-def process_data(
-        data: List[Dict[str, Any]],
-        user_id: str
-) -> pd.DataFrame:
+
+def generate_best_schedule(
+        engine: str,
+        dict_days: List[int],
+        off_days: List[List[int]],
+        start_weekday: int,
+        weekly_plan: Dict[str, int],
+        days_in_month: int,
+        seed: Optional[int] = None,
+        restarts: int = 1,
+        time_budget: float = ScheduleConfig.TIME_BUDGET,
+        state: Optional[WorkerState] = None
+) -> SolveResult:
     """
-    Processes the input data and generates a schedule.
+    Runs several independent attempts and keeps the schedule with the best score.
+
+    The attempts are seeded from a single seed, so the same seed always gives the same
+    schedule. With more than one restart the attempts run on a process pool. Months
+    that cannot be staffed get a single attempt, see plan_attempts.
 
     Args:
-        data (List[Dict[str, Any]]): Input data containing worker information and scheduling rules.
-        user_id (str): The user ID for whom the schedule is generated.
+        engine (str): The name of a registered solver.
+        dict_days (List[int]): A list where each element represents the total number of days off for a worker.
+        off_days (List[List[int]]): A list of lists where each sublist contains the specific days a worker is unavailable.
+        start_weekday (int): The starting day of the week (0 = Monday, 6 = Sunday).
+        weekly_plan (Dict[str, int]): A dictionary mapping weekdays to the required number of workers.
+        days_in_month (int): The number of days in the month.
+        seed (Optional[int]): The seed of the generation, fresh entropy is used if omitted.
+        restarts (int): The number of independent attempts.
+        time_budget (float): The time limit in seconds of every attempt for optimizing solvers.
+        state (Optional[WorkerState]): The counters carried over from the previous period.
 
     Returns:
-        pd.DataFrame: The final schedule as a DataFrame.
+        SolveResult: The attempt with the fewest "?" cells and the smallest days-off deviation, with the feasibility check.
     """
-    now = datetime.now()
-    current_year = now.year
-    current_month = now.month + 1 if now.month < 12 else 1
-    if current_month == 1:
-        current_year += 1
-    days_in_month = calendar.monthrange(current_year, current_month)[1]
-    start_weekday = calendar.monthrange(current_year, current_month)[0]
+    month = (dict_days, off_days, start_weekday, weekly_plan, days_in_month)
+    plan = plan_attempts(*month, np.random.SeedSequence(seed), restarts, time_budget)
+    args = (engine,) + month
+
+    if len(plan.seeds) == 1:
+        attempts = [generate_attempt(*args, plan.seeds[0], plan.time_budget, state)]
+    else:
+        attempts = pool_map(
+            generate_attempt,
+            *zip(*[args + (child, plan.time_budget, state) for child in plan.seeds])
+        )
 
-    column_names = generate_calendar_labels(days_in_month, start_weekday)
+    best = best_attempt([result.matrix for result in attempts], dict_days)
+    return attempts[best]._replace(feasibility=plan.feasibility)
 
-    index_names = [worker['name'] for worker in data[1:-1] if 'name' in worker]
 
-    df = pd.DataFrame(index=index_names, columns=column_names)
+def solve_months(
+        jobs: List[Tuple[Draft, int, int, Optional[int]]],
+        engine: Optional[str] = None,
+        restarts: Optional[int] = None,
+        time_budget: float = ScheduleConfig.TIME_BUDGET
+) -> List[SolveResult]:
+    """
+    Solves many independent monthly schedules at once.
 
-    dict_days = extract_dict_days(data)
-    off_days = extract_off_days(data)
-    weekly_plan = extract_weekly_plan(data)
+    The attempts of every job are flattened into a single map over the process pool, so
+    a batch of small rosters keeps every worker busy instead of solving them one by one.
+    Jobs failing the feasibility check get a single attempt, see plan_attempts.
 
-    df = look_column(df, dict_days, off_days, start_weekday, weekly_plan)
-    df = validate_schedule_with_question_marks(df, weekly_plan, start_weekday)
+    Args:
+        jobs (List[Tuple[Draft, int, int, Optional[int]]]): The draft, the year, the month and the seed of every schedule.
+        engine (Optional[str]): The name of a registered solver. Defaults to ScheduleConfig.ENGINE.
+        restarts (Optional[int]): The number of attempts per schedule. Defaults to ScheduleConfig.RESTARTS.
+        time_budget (float): The time limit in seconds of every attempt for optimizing solvers.
+
+    Returns:
+        List[SolveResult]: The best attempt of every job with its feasibility check, in the order of the jobs.
+    """
+    engine = engine or ScheduleConfig.ENGINE
+    restarts = max(1, restarts or ScheduleConfig.RESTARTS)
+
+    attempts = []
+    spans = []
+    plans = []
+    for draft, year, month, seed in jobs:
+        start_weekday, days_in_month = calendar.monthrange(year, month)
+        args = (draft.dict_days, draft.off_days, start_weekday, draft.weekly_plan, days_in_month)
+        plan = plan_attempts(*args, np.random.SeedSequence(seed), restarts, time_budget)
+        plans.append(plan)
+        spans.append((len(attempts), len(attempts) + len(plan.seeds)))
+        attempts.extend((engine,) + args + (child, plan.time_budget, None) for child in plan.seeds)
+
+    with STAGE_SECONDS.time(stage='solve'):
+        if len(attempts) == 1:
+            solved = [generate_attempt(*attempts[0])]
+        else:
+            chunksize = max(1, len(attempts) // (4 * (os.cpu_count() or 1)))
+            solved = pool_map(generate_attempt, *zip(*attempts), chunksize=chunksize)
+
+    results = []
+    for (draft, _, _, _), (start, stop), plan in zip(jobs, spans, plans):
+        best = solved[start + best_attempt(
+            [result.matrix for result in solved[start:stop]], draft.dict_days
+        )]
+        count_schedule(best.matrix)
+        results.append(best._replace(feasibility=plan.feasibility))
+    return results
+
+
+def next_month(
+        today: Optional[date] = None
+) -> Tuple[int, int]:
+    """
+    Returns the month following the given date.
+
+    Args:
+        today (Optional[date]): The reference date, today if omitted.
 
-    creator_info = data[0]
-    creator = creator_info['creator']
-    firm_name = creator_info['firm_name']
+    Returns:
+        Tuple[int, int]: The year and the month.
+    """
+    today = today or datetime.now().date()
+    if today.month == 12:
+        return today.year + 1, 1
+    return today.year, today.month + 1
+
+
+def add_creator_row(
+        df: 'pd.DataFrame',
+        draft: Draft
+) -> 'pd.DataFrame':
+    """
+    Appends the creator and company row to the schedule grid.
+
+    Args:
+        df (pd.DataFrame): The schedule grid.
+        draft (Draft): The draft the schedule was generated from.
+
+    Returns:
+        pd.DataFrame: The schedule grid with the 'Data' row.
+    """
+    import pandas as pd
+
+    creator = draft.creator
+    firm_name = draft.firm_name
     creator_series = pd.Series(
         [
             f'Creator: {creator}', f'Company: {firm_name}'
@@ -260,37 +678,376 @@ def process_data(
         index=df.columns
     )
     creator_df = pd.DataFrame([creator_series], index=['Data'])
-    df = pd.concat([df, creator_df])
+    return pd.concat([df, creator_df])
 
-    os.makedirs('schedule', exist_ok=True)
-    csv_path = os.path.join('schedule', f'{user_id}.csv')
-    df.to_csv(csv_path, index=True)
 
-    excel_path = os.path.join('schedule', f'{user_id}.xlsx')
-    df.to_excel(excel_path)
+def write_export(
+        df: 'pd.DataFrame',
+        name: str,
+        file_type: str
+) -> str:
+    """
+    Writes the schedule grid into the schedule folder in the given format.
 
-    return df
+    Args:
+        df (pd.DataFrame): The schedule grid.
+        name (str): The file name without extension.
+        file_type (str): The type of file, 'csv' or 'xlsx'.
 
+    Returns:
+        str: The path of the written file.
+    """
+    path = search_folder(name, file_type)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if file_type == 'csv':
+        with STAGE_SECONDS.time(stage='to_csv'):
+            df.to_csv(path, index=True)
+    elif file_type == 'xlsx':
+        with STAGE_SECONDS.time(stage='to_excel'):
+            df.to_excel(path)
+    else:
+        raise ValueError(f"Unknown file type: {file_type}")
+    return path
+
+
+def export_schedule(
+        df: 'pd.DataFrame',
+        name: str
+) -> None:
+    """
+    Writes the schedule grid as CSV and XLSX files into the schedule folder.
 
-def data_readable(
-        data_list: List[Any]
-) -> List[Dict[str, Any]]:
+    Args:
+        df (pd.DataFrame): The schedule grid.
+        name (str): The file name without extension.
+
+    Returns:
+        None
+    """
+    for file_type in EXPORT_TYPES:
+        write_export(df, name, file_type)
+
+
+def schedule_export(
+        df: 'pd.DataFrame',
+        name: str
+) -> None:
+    """
+    Queues the CSV and XLSX exports of the schedule grid on the background export thread.
+
+    Args:
+        df (pd.DataFrame): The schedule grid.
+        name (str): The file name without extension.
+
+    Returns:
+        None
+    """
+    with _exports_lock:
+        for file_type in EXPORT_TYPES:
+            _exports[(name, file_type)] = _export_executor.submit(
+                write_export, df, name, file_type
+            )
+
+
+def archive_schedule(
+        compact: CompactSchedule,
+        year: int,
+        month: int
+) -> Future:
+    """
+    Appends a schedule to the archive on the background export thread.
+
+    Args:
+        compact (CompactSchedule): The schedule.
+        year (int): The year of the schedule.
+        month (int): The month of the schedule.
+
+    Returns:
+        Future: Completes when the schedule is archived, a failure is logged, not raised.
+    """
+    def append() -> None:
+        try:
+            schedule_archive.append(compact, year, month)
+        except Exception:
+            logger.exception("Archiving the schedule of %s/%s failed", month, year)
+
+    return _export_executor.submit(append)
+
+
+def ensure_export(
+        name: str,
+        file_type: str
+) -> str:
     """
-    Converts SQLAlchemy objects into readable dictionaries.
+    Returns the path of an exported schedule, waiting for its background export if pending.
 
     Args:
-        data_list (List[Any]): A list of SQLAlchemy objects.
+        name (str): The file name without extension.
+        file_type (str): The type of file, 'csv' or 'xlsx'.
 
     Returns:
-        List[Dict[str, Any]]: A list of dictionaries with SQLAlchemy metadata excluded.
+        str: The path of the exported file.
     """
-    new_list = []
-    for items in data_list:
-        new_list.extend([
-            {key: value for key, value in entry.__dict__.items() if key != '_sa_instance_state'}
-            for entry in items
-        ])
-    return new_list
+    with _exports_lock:
+        future = _exports.pop((name, file_type), None)
+    if future is not None:
+        return future.result()
+    return search_folder(name, file_type)
+
+
+def discard_exports(
+        name: str
+) -> None:
+    """
+    Cancels the pending exports of a schedule and waits for the running ones. The cached
+    grid is no longer offered for download under this name.
+
+    Args:
+        name (str): The file name without extension.
+
+    Returns:
+        None
+    """
+    user_schedules.discard(name)
+    with _exports_lock:
+        futures = [_exports.pop((name, file_type), None) for file_type in EXPORT_TYPES]
+    for future in futures:
+        if future is not None and not future.cancel():
+            future.exception()
+
+
+def is_exported(
+        name: str
+) -> bool:
+    """
+    Checks whether every export of a schedule exists or is being written.
+
+    Args:
+        name (str): The file name without extension.
+
+    Returns:
+        bool: True if no export has to be queued again.
+    """
+    with _exports_lock:
+        return all(
+            (name, file_type) in _exports or os.path.exists(search_folder(name, file_type))
+            for file_type in EXPORT_TYPES
+        )
+
+
+def schedule_month(
+        draft: Draft,
+        year: int,
+        month: int,
+        engine: Optional[str] = None,
+        seed: Optional[int] = None,
+        restarts: Optional[int] = None,
+        dict_days: Optional[List[int]] = None,
+        state: Optional[WorkerState] = None
+) -> Tuple['pd.DataFrame', SolveResult]:
+    """
+    Generates the schedule of a single month.
+
+    Args:
+        draft (Draft): The creator, the workers and the weekly plan.
+        year (int): The year of the month.
+        month (int): The month to schedule.
+        engine (Optional[str]): The name of a registered solver. Defaults to ScheduleConfig.ENGINE.
+        seed (Optional[int]): The seed of the generation, the same seed gives the same schedule.
+        restarts (Optional[int]): The number of attempts to keep the best of. Defaults to ScheduleConfig.RESTARTS.
+        dict_days (Optional[List[int]]): The days off per worker, taken from the draft if omitted.
+        state (Optional[WorkerState]): The counters carried over from the previous month.
+
+    Returns:
+        Tuple[pd.DataFrame, SolveResult]: The schedule grid with the 'Data' row and the solver result.
+    """
+    start_weekday, days_in_month = calendar.monthrange(year, month)
+
+    column_names = generate_calendar_labels(days_in_month, start_weekday)
+
+    dict_days = dict_days if dict_days is not None else draft.dict_days
+
+    with STAGE_SECONDS.time(stage='solve'):
+        result = generate_best_schedule(
+            engine or ScheduleConfig.ENGINE,
+            dict_days,
+            draft.off_days,
+            start_weekday,
+            draft.weekly_plan,
+            days_in_month,
+            seed=seed,
+            restarts=restarts or ScheduleConfig.RESTARTS,
+            state=state
+        )
+    count_schedule(result.matrix)
+
+    with STAGE_SECONDS.time(stage='frame'):
+        df = matrix_to_frame(result.matrix, draft.names, column_names)
+        df = add_creator_row(df, draft)
+    return df, result
+
+
+def process_data(
+        data: Union[Draft, List[Dict[str, Any]]],
+        user_id: str,
+        engine: Optional[str] = None,
+        seed: Optional[int] = None,
+        restarts: Optional[int] = None
+) -> Tuple['pd.DataFrame', Feasibility]:
+    """
+    Processes the input data and generates a schedule.
+
+    Schedules are cached as compact bitsets by the normalized input, the target month and
+    the generation parameters. A repeated submission is served from the cache and is only exported
+    again if the user's files are missing. The CSV and XLSX files are written on a
+    background thread, see ensure_export; every newly generated schedule is also appended
+    to the archive there, see archive_schedule. The user's latest schedule stays
+    reachable through latest_schedule for downloads.
+
+    Args:
+        data (Union[Draft, List[Dict[str, Any]]]): The draft, or table records (see drafts.draft_from_records), with worker information and scheduling rules.
+        user_id (str): The user ID for whom the schedule is generated.
+        engine (Optional[str]): The name of a registered solver. Defaults to ScheduleConfig.ENGINE.
+        seed (Optional[int]): The seed of the generation, the same seed gives the same schedule.
+        restarts (Optional[int]): The number of attempts to keep the best of. Defaults to ScheduleConfig.RESTARTS.
+
+    Returns:
+        Tuple[pd.DataFrame, Feasibility]: The final schedule as a DataFrame and the feasibility check of the input.
+    """
+    draft = as_draft(data)
+    year, month = next_month()
+    engine = engine or ScheduleConfig.ENGINE
+    restarts = restarts or ScheduleConfig.RESTARTS
+    key = cache_key(
+        draft, year=year, month=month, seed=seed, engine=engine, restarts=restarts
+    )
+
+    compact = schedule_cache.get(key)
+    if compact is None:
+        df, result = schedule_month(draft, year, month, engine, seed, restarts)
+        feasibility = result.feasibility
+        logger.info(
+            "Schedule for %s solved in %.3fs, objective %d",
+            user_id, result.solve_time, result.objective
+        )
+        compact = CompactSchedule.from_matrix(
+            result.matrix, draft.names, df.columns, draft.off_days,
+            draft.creator, draft.firm_name
+        )
+        schedule_cache.put(key, compact)
+        if ArchiveConfig.ENABLED:
+            archive_schedule(compact, year, month)
+    else:
+        df = compact.to_frame()
+        feasibility = check_draft(draft, year, month)
+        if is_exported(user_id):
+            user_schedules.put(user_id, key)
+            return df, feasibility
+
+    user_schedules.put(user_id, key)
+
+    schedule_export(df, user_id)
+
+    return df, feasibility
+
+
+def latest_schedule(
+        user_id: str
+) -> Optional[Tuple[str, CompactSchedule]]:
+    """
+    Returns the cache key and the schedule last generated for a user.
+
+    Args:
+        user_id (str): The user ID the schedule was generated for.
+
+    Returns:
+        Optional[Tuple[str, CompactSchedule]]: The key and the schedule, or None if it is no longer cached.
+    """
+    key = user_schedules.peek(user_id)
+    if key is None:
+        return None
+    compact = schedule_cache.peek(key)
+    if compact is None:
+        return None
+    return key, compact
+
+
+def iter_csv(
+        compact: CompactSchedule,
+        chunk_rows: int = ScheduleConfig.CSV_CHUNK_ROWS
+) -> Iterator[str]:
+    """
+    Yields the schedule grid as CSV text a chunk of rows at a time.
+
+    The chunks join into the same text as write_export writes, but only one chunk of the
+    labelled grid exists at a time, so a download stays small whatever the roster size.
+
+    Args:
+        compact (CompactSchedule): The schedule.
+        chunk_rows (int): The number of rows per chunk.
+
+    Yields:
+        str: The header, the rows in chunks, then the 'Data' row.
+    """
+    yield compact.rows(0, 0).to_frame().to_csv(index=True)
+    for start in range(0, len(compact), chunk_rows):
+        yield compact.rows(start, start + chunk_rows).to_frame().to_csv(index=True, header=False)
+    if compact.creator is not None:
+        yield compact.creator_row().to_csv(index=True, header=False)
+
+
+def iter_months(
+        data: Union[Draft, List[Dict[str, Any]]],
+        user_id: str,
+        start: date,
+        months: int,
+        engine: Optional[str] = None,
+        seed: Optional[int] = None,
+        restarts: Optional[int] = None
+) -> Iterator[Tuple[int, int, 'pd.DataFrame']]:
+    """
+    Generates consecutive monthly schedules one month at a time.
+
+    The working streak, the required rest and the days-off balance of every worker carry
+    across month boundaries. Every month is exported as soon as it is generated, so only
+    one month is held in memory whatever the horizon.
+
+    Args:
+        data (Union[Draft, List[Dict[str, Any]]]): The draft, or table records (see drafts.draft_from_records), with worker information and scheduling rules.
+        user_id (str): The user ID for whom the schedules are generated.
+        start (date): Any date of the first month to schedule.
+        months (int): The number of months to schedule.
+        engine (Optional[str]): The name of a registered solver. Defaults to ScheduleConfig.ENGINE.
+        seed (Optional[int]): The seed of the generation, the same seed gives the same schedules.
+        restarts (Optional[int]): The number of attempts per month to keep the best of.
+
+    Yields:
+        Tuple[int, int, pd.DataFrame]: The year, the month and its schedule grid.
+    """
+    draft = as_draft(data)
+    dict_days = np.asarray(draft.dict_days, dtype=np.int32)
+    balance = np.zeros_like(dict_days)
+    state = WorkerState(len(dict_days))
+    year, month = start.year, start.month
+
+    for index in range(months):
+        days_in_month = calendar.monthrange(year, month)[1]
+        target = np.clip(dict_days + balance, 0, days_in_month)
+        month_seed = None if seed is None else seed + index
+
+        df, result = schedule_month(
+            draft, year, month, engine, month_seed, restarts,
+            dict_days=target.tolist(), state=state
+        )
+        export_schedule(df, f'{user_id}_{year}-{month:02d}')
+
+        balance = target - (result.matrix != WORK).sum(axis=1)
+        state = state.roll_over(
+            result.matrix, ScheduleConfig.MAX_CONSECUTIVE_DAYS, ScheduleConfig.MIN_REST_DAYS
+        )
+        yield year, month, df
+
+        year, month = next_month(date(year, month, 1))
 
 
 def search_folder(
@@ -313,40 +1070,38 @@ def search_folder(
     return file_path
 
 
-def send_email(
-        email: str,
-        data: str
-) -> None:
+def save_roster(
+        user_id: str,
+        names: List[str],
+        days: List[str],
+        personal: List[str],
+        batch_size: int = ScheduleConfig.ROSTER_BATCH_SIZE
+) -> int:
     """
-    Sends an email with an attached file.
+    Saves a roster in a single transaction with bulk inserts.
 
     Args:
-        email (str): The recipient's email address.
-        data (str): The path to the file to be attached.
+        user_id (str): The user ID the roster belongs to.
+        names (List[str]): The worker names.
+        days (List[str]): The number of days off of each worker.
+        personal (List[str]): The comma separated personal days off of each worker.
+        batch_size (int): The maximum number of rows per INSERT statement.
 
     Returns:
-        None
+        int: The number of saved workers.
     """
-    gmail_user = Email.LOGIN
-    gmail_password = Email.PASSWORD
-
-    msg = MIMEMultipart()
-    msg['From'] = gmail_user
-    msg['To'] = email
-    msg['Subject'] = Email.DATA_SUBJECT
-
-    attachment = MIMEBase('application', 'octet-stream')
-    with open(data, 'rb') as file:
-        attachment.set_payload(file.read())
-    encoders.encode_base64(attachment)
-    attachment.add_header(
-        'Content-Disposition', f'attachment; filename="{Path(data).name}"'
-    )
-    msg.attach(attachment)
-
-    with smtplib.SMTP_SSL('smtp.gmail.com', 465) as server:
-        server.login(gmail_user, gmail_password)
-        server.sendmail(gmail_user, email, msg.as_string())
+    rows = [
+        {'name': name, 'days': day, 'personal': personal_days, 'user_id': user_id}
+        for name, day, personal_days in zip(names, days, personal)
+    ]
+    try:
+        for start in range(0, len(rows), batch_size):
+            db.session.execute(insert(Second), rows[start:start + batch_size])
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return len(rows)
 
 
 def create_database_structure(
@@ -355,6 +1110,9 @@ def create_database_structure(
     """
     Creates the database tables based on the defined models in the Flask application.
 
+    Tables created by an older version get the columns and indexes added since, so
+    existing databases keep working with the sweeper's created_at and user_id lookups.
+
     Args:
         app (Flask): The Flask application instance.
 
@@ -363,3 +1121,15 @@ def create_database_structure(
     """
     with app.app_context():
         db.create_all()
+        inspector = inspect(db.engine)
+        with db.engine.begin() as connection:
+            for table in db.metadata.sorted_tables:
+                existing = {column['name'] for column in inspector.get_columns(table.name)}
+                for column in table.columns:
+                    if column.name not in existing:
+                        column_type = column.type.compile(dialect=connection.dialect)
+                        connection.execute(text(
+                            f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'
+                        ))
+                for index in table.indexes:
+                    index.create(connection, checkfirst=True)
@@ -0,0 +1,226 @@
+import calendar
+from typing import List, NamedTuple, Optional, Tuple, Union
+
+import numpy as np
+
+from .config import ScheduleConfig
+from .drafts import Draft, Worker
+from .engine import (OFF, WORK, mark_uncovered, off_day_mask, row_excess,
+                     weekly_demand)
+
+
+class WorkerAdded(NamedTuple):
+    worker: Worker
+
+
+class WorkerRemoved(NamedTuple):
+    index: int
+
+
+class PersonalChanged(NamedTuple):
+    index: int
+    personal: Tuple[int, ...]
+
+
+class WeekdayChanged(NamedTuple):
+    weekday: int
+    count: int
+
+
+Delta = Union[WorkerAdded, WorkerRemoved, PersonalChanged, WeekdayChanged]
+
+
+class Replan(NamedTuple):
+    """
+    The outcome of an incremental re-plan.
+
+    Attributes:
+        draft (Draft): The draft with the delta applied.
+        matrix (np.ndarray): The new workers x days schedule matrix.
+        changed (np.ndarray): The boolean workers x days mask of the cells that differ from the old schedule.
+    """
+    draft: Draft
+    matrix: np.ndarray
+    changed: np.ndarray
+
+
+def apply_delta(
+        draft: Draft,
+        delta: Delta
+) -> Draft:
+    """
+    Returns the draft with a single change applied.
+
+    Args:
+        draft (Draft): The draft the schedule was generated from.
+        delta (Delta): The change.
+
+    Returns:
+        Draft: The changed draft.
+    """
+    workers = list(draft.workers)
+    week = list(draft.week)
+    if isinstance(delta, WorkerAdded):
+        workers.append(delta.worker)
+    elif isinstance(delta, WorkerRemoved):
+        del workers[delta.index]
+    elif isinstance(delta, PersonalChanged):
+        workers[delta.index] = workers[delta.index]._replace(personal=tuple(delta.personal))
+    elif isinstance(delta, WeekdayChanged):
+        week[delta.weekday] = delta.count
+    else:
+        raise TypeError(f"Unknown delta: {delta!r}")
+    return draft._replace(workers=tuple(workers), week=tuple(week))
+
+
+class _Planner:
+    """
+    Adds and removes single working days while keeping the rest rules of every touched row.
+    """
+
+    def __init__(
+            self,
+            work: np.ndarray,
+            off_mask: np.ndarray,
+            dict_days: List[int],
+            demand: np.ndarray,
+            rng: np.random.Generator,
+            max_consecutive: int,
+            min_rest: int
+    ) -> None:
+        self.work = work
+        self.off_mask = off_mask
+        self.target_off = np.asarray(dict_days, dtype=np.int32)
+        self.demand = demand
+        self.rng = rng
+        self.max_consecutive = max_consecutive
+        self.min_rest = min_rest
+
+    def _excess(self, row: np.ndarray) -> int:
+        return row_excess(row, self.max_consecutive, self.min_rest)
+
+    def can_work(self, worker: int, day: int) -> bool:
+        """
+        Checks whether a worker may take a day without a personal day off or a rest rule being broken.
+        """
+        if self.work[worker, day] or self.off_mask[worker, day]:
+            return False
+        row = self.work[worker].copy()
+        before = self._excess(row)
+        row[day] = True
+        return self._excess(row) <= before
+
+    def surplus_off(self) -> np.ndarray:
+        """
+        Returns how many days off every worker has beyond their requested total.
+        """
+        return (~self.work).sum(axis=1) - self.target_off
+
+    def fill_day(self, day: int, exclude: Optional[int] = None) -> None:
+        """
+        Staffs a day up to its demand, preferring the workers with the most surplus days off.
+        """
+        missing = int(self.demand[day]) - int(self.work[:, day].sum())
+        if missing <= 0:
+            return
+        surplus = self.surplus_off()
+        order = np.lexsort((self.rng.random(len(surplus)), -surplus))
+        for worker in order:
+            if missing == 0:
+                break
+            if worker != exclude and self.can_work(worker, day):
+                self.work[worker, day] = True
+                missing -= 1
+
+    def top_up_worker(self, worker: int) -> None:
+        """
+        Gives a worker working days until they have their requested days off, understaffed
+        days first, then the days with the fewest workers.
+        """
+        needed = int((~self.work[worker]).sum()) - int(self.target_off[worker])
+        if needed <= 0:
+            return
+        coverage = self.work.sum(axis=0)
+        shortage = self.demand - coverage
+        order = np.lexsort((self.rng.random(len(coverage)), coverage, -shortage))
+        for day in order:
+            if needed == 0:
+                break
+            if self.can_work(worker, day):
+                self.work[worker, day] = True
+                needed -= 1
+
+
+def replan(
+        draft: Draft,
+        matrix: np.ndarray,
+        year: int,
+        month: int,
+        delta: Delta,
+        rng: Optional[np.random.Generator] = None,
+        max_consecutive: int = ScheduleConfig.MAX_CONSECUTIVE_DAYS,
+        min_rest: int = ScheduleConfig.MIN_REST_DAYS
+) -> Replan:
+    """
+    Updates an existing schedule after a single change instead of generating it again.
+
+    Only the affected days and workers are recomputed, every other cell is kept:
+
+    - A removed worker's working days are staffed again by the others.
+    - An added worker gets their working days, on understaffed days first.
+    - New personal days off are freed and staffed by the others, and the worker is given
+      working days elsewhere to keep their days-off total.
+    - A raised weekday headcount is staffed on the days of that weekday, a lowered one
+      leaves the schedule as it is.
+
+    Args:
+        draft (Draft): The draft the schedule was generated from.
+        matrix (np.ndarray): The workers x days schedule matrix of the month.
+        year (int): The year of the month.
+        month (int): The month of the schedule.
+        delta (Delta): The change.
+        rng (Optional[np.random.Generator]): The random generator breaking ties, a fresh one is used if omitted.
+        max_consecutive (int): The maximum number of consecutive working days.
+        min_rest (int): The number of days off required after a maximal working streak.
+
+    Returns:
+        Replan: The changed draft, the new schedule matrix and the mask of changed cells.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    start_weekday, days_in_month = calendar.monthrange(year, month)
+    new_draft = apply_delta(draft, delta)
+
+    work = matrix == WORK
+    old = matrix.copy()
+    if isinstance(delta, WorkerRemoved):
+        freed_days = np.flatnonzero(work[delta.index])
+        work = np.delete(work, delta.index, axis=0)
+        old = np.delete(old, delta.index, axis=0)
+    elif isinstance(delta, WorkerAdded):
+        work = np.vstack([work, np.zeros((1, days_in_month), dtype=bool)])
+        old = np.vstack([old, np.full((1, days_in_month), OFF, dtype=old.dtype)])
+
+    demand = weekly_demand(new_draft.weekly_plan, start_weekday, days_in_month)
+    off_mask = off_day_mask(new_draft.off_days, days_in_month)
+    planner = _Planner(
+        work, off_mask, new_draft.dict_days, demand, rng, max_consecutive, min_rest
+    )
+
+    if isinstance(delta, WorkerRemoved):
+        for day in freed_days:
+            planner.fill_day(day)
+    elif isinstance(delta, WorkerAdded):
+        planner.top_up_worker(len(work) - 1)
+    elif isinstance(delta, PersonalChanged):
+        freed_days = np.flatnonzero(work[delta.index] & off_mask[delta.index])
+        work[delta.index, freed_days] = False
+        for day in freed_days:
+            planner.fill_day(day, exclude=delta.index)
+        planner.top_up_worker(delta.index)
+    else:
+        weekdays = (np.arange(days_in_month) + start_weekday) % 7
+        for day in np.flatnonzero(weekdays == delta.weekday):
+            planner.fill_day(day)
+
+    new_matrix = mark_uncovered(np.where(work, WORK, OFF).astype(np.int8), demand)
+    return Replan(new_draft, new_matrix, new_matrix != old)
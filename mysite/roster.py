@@ -0,0 +1,244 @@
+from typing import IO, TYPE_CHECKING, Iterator, List, NamedTuple, Tuple
+from zipfile import BadZipFile
+
+from sqlalchemy import insert
+
+from .config import ScheduleConfig
+from .models import Second, db
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+ROSTER_COLUMNS = ('name', 'days', 'personal')
+ROSTER_TYPES = ('csv', 'xlsx')
+MAX_DAY = 31
+
+
+class RowError(NamedTuple):
+    line: int
+    message: str
+
+    def __str__(self) -> str:
+        return f'Line {self.line}: {self.message}'
+
+
+class UnreadableRoster(Exception):
+    """
+    Raised when an uploaded roster is empty or not a valid CSV or XLSX file.
+    """
+
+
+class ImportResult(NamedTuple):
+    """
+    The outcome of a roster import, nothing is saved if any row is invalid.
+
+    Attributes:
+        saved (int): The number of saved workers.
+        errors (List[RowError]): The invalid rows, at most the requested number.
+    """
+    saved: int
+    errors: List[RowError]
+
+
+def iter_csv_chunks(
+        stream: IO,
+        chunk_rows: int
+) -> Iterator['pd.DataFrame']:
+    """
+    Reads a CSV roster a chunk of rows at a time, every value as a string.
+
+    The fields beyond the header of a row are joined back into its last column, so
+    unquoted personal days such as "Ed,8,1,2" are read as personal days 1 and 2 and
+    any other overflow is reported as an invalid value on its own line.
+    """
+    import pandas as pd
+
+    header = [
+        str(column).strip().lower()
+        for column in pd.read_csv(stream, nrows=0, skipinitialspace=True).columns
+    ]
+    stream.seek(0)
+    last = len(header) - 1
+    # The header line is read as the first row and dropped, otherwise pandas takes the
+    # first field of a longer first row for an index instead of passing it to on_bad_lines.
+    reader = pd.read_csv(
+        stream, chunksize=chunk_rows, header=None, names=header, dtype=str,
+        keep_default_na=False, skipinitialspace=True, skip_blank_lines=False, engine='python',
+        on_bad_lines=lambda fields: fields[:last] + [','.join(fields[last:])]
+    )
+    for index, chunk in enumerate(reader):
+        yield chunk.iloc[1:] if index == 0 else chunk
+
+
+def iter_xlsx_chunks(
+        stream: IO,
+        chunk_rows: int
+) -> Iterator['pd.DataFrame']:
+    """
+    Reads the first sheet of an XLSX roster a chunk of rows at a time in read-only mode.
+    """
+    import pandas as pd
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(stream, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = [str(column).strip().lower() for column in next(rows, ())]
+        buffer = []
+        for row in rows:
+            buffer.append(['' if value is None else str(value) for value in row])
+            if len(buffer) == chunk_rows:
+                yield pd.DataFrame(buffer, columns=header)
+                buffer = []
+        if buffer:
+            yield pd.DataFrame(buffer, columns=header)
+    finally:
+        workbook.close()
+
+
+def read_chunks(
+        chunks: Iterator['pd.DataFrame']
+) -> Iterator['pd.DataFrame']:
+    """
+    Passes the chunks on, turning the errors of the CSV parser and openpyxl into UnreadableRoster.
+
+    Only reading is guarded, so errors in the processing of a chunk are not mistaken for a bad file.
+    """
+    from openpyxl.utils.exceptions import InvalidFileException
+
+    while True:
+        try:
+            chunk = next(chunks)
+        except StopIteration:
+            return
+        # The parser errors of pandas and the decoding errors are ValueErrors; openpyxl raises
+        # KeyError for a zip without the workbook parts.
+        except (ValueError, KeyError, BadZipFile, InvalidFileException) as error:
+            raise UnreadableRoster(str(error) or type(error).__name__) from error
+        yield chunk
+
+
+def parse_roster_chunk(
+        chunk: 'pd.DataFrame',
+        first_line: int
+) -> Tuple['pd.DataFrame', List[RowError]]:
+    """
+    Validates and normalizes a chunk of roster rows with vectorized string operations.
+
+    Personal days off may be separated by commas, semicolons or spaces and are stored
+    in the comma separated form the wizard uses. Empty rows are skipped.
+
+    Args:
+        chunk (pd.DataFrame): The name, days and personal columns as strings.
+        first_line (int): The line number of the chunk's first row in the file.
+
+    Returns:
+        Tuple[pd.DataFrame, List[RowError]]: The valid rows and the errors of the invalid ones.
+    """
+    import pandas as pd
+
+    lines = pd.Series(range(first_line, first_line + len(chunk)), index=chunk.index)
+    name = chunk['name'].astype(str).str.strip()
+    days_text = chunk['days'].astype(str).str.strip().str.removesuffix('.0')
+    personal = (
+        chunk['personal'].astype(str).str.strip()
+        .str.replace(r'[;\s]+', ',', regex=True).str.strip(',')
+    )
+
+    blank = (name == '') & (days_text == '') & (personal == '')
+
+    problems = pd.Series('', index=chunk.index)
+    problems[~days_text.str.fullmatch(r'\d+')] = 'days off must be a whole number'
+    problems[~personal.str.fullmatch(r'(\d+(,\d+)*)?')] = \
+        'personal days off must be numbers separated by commas'
+    problems[name == ''] = 'the name is empty'
+
+    valid = problems == ''
+    days = pd.to_numeric(days_text.where(valid), errors='coerce')
+    problems[valid & (days > MAX_DAY)] = f'days off must be at most {MAX_DAY}'
+
+    personal_days = pd.to_numeric(
+        personal.where(valid & (personal != '')).str.split(',').explode(), errors='coerce'
+    )
+    out_of_range = ((personal_days < 1) | (personal_days > MAX_DAY)).groupby(level=0).any()
+    problems[out_of_range.reindex(chunk.index, fill_value=False)] = \
+        f'personal days off must be between 1 and {MAX_DAY}'
+
+    valid = (problems == '') & ~blank
+    invalid = (problems != '') & ~blank
+    errors = [
+        RowError(int(line), message)
+        for line, message in zip(lines[invalid], problems[invalid])
+    ]
+    rows = pd.DataFrame({
+        'name': name[valid],
+        'days': days[valid].astype('int64'),
+        'personal': personal[valid]
+    })
+    return rows, errors
+
+
+def import_roster(
+        user_id: str,
+        stream: IO,
+        file_type: str,
+        chunk_rows: int = ScheduleConfig.ROSTER_BATCH_SIZE,
+        max_errors: int = 100
+) -> ImportResult:
+    """
+    Streams an uploaded CSV or XLSX roster into the database.
+
+    The file needs the columns name, days and personal. Only one chunk is parsed and
+    held at a time, and every chunk is bulk-inserted as soon as it is valid. The whole
+    import is one transaction: if any row is invalid it is rolled back and the bad rows
+    are reported with their line numbers. A file that cannot be read is reported as an
+    error of line 1.
+
+    Args:
+        user_id (str): The user ID the roster belongs to.
+        stream (IO): The uploaded file.
+        file_type (str): The type of file, 'csv' or 'xlsx'.
+        chunk_rows (int): The number of rows parsed and inserted at a time.
+        max_errors (int): The number of bad rows reported before the import stops.
+
+    Returns:
+        ImportResult: The number of saved workers and the invalid rows.
+    """
+    if file_type == 'csv':
+        chunks = iter_csv_chunks(stream, chunk_rows)
+    elif file_type == 'xlsx':
+        chunks = iter_xlsx_chunks(stream, chunk_rows)
+    else:
+        raise ValueError(f"Unknown file type: {file_type}")
+
+    saved = 0
+    errors: List[RowError] = []
+    line = 2
+    try:
+        for chunk in read_chunks(chunks):
+            missing = [column for column in ROSTER_COLUMNS if column not in chunk.columns]
+            if missing:
+                errors = [RowError(1, f"missing columns: {', '.join(missing)}")]
+                break
+            rows, chunk_errors = parse_roster_chunk(chunk, line)
+            line += len(chunk)
+            errors.extend(chunk_errors[:max_errors - len(errors)])
+            if len(errors) >= max_errors:
+                break
+            if errors or rows.empty:
+                continue
+            rows['user_id'] = user_id
+            db.session.execute(insert(Second), rows.to_dict('records'))
+            saved += len(rows)
+    except UnreadableRoster as error:
+        db.session.rollback()
+        return ImportResult(0, [RowError(1, f'cannot read file: {error}')])
+    except Exception:
+        db.session.rollback()
+        raise
+
+    if errors:
+        db.session.rollback()
+        return ImportResult(0, errors)
+    db.session.commit()
+    return ImportResult(saved, errors)
@@ -0,0 +1,162 @@
+import heapq
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .config import ScheduleConfig
+from .engine import WORK, WorkerState, mark_uncovered, off_day_mask, weekly_demand
+
+WEEKEND_WEIGHT = 2
+
+
+def fair_rotation(
+        off_mask: np.ndarray,
+        demand: np.ndarray,
+        weekend: np.ndarray,
+        dict_days: List[int],
+        rng: np.random.Generator,
+        state: Optional[WorkerState] = None,
+        max_consecutive: int = ScheduleConfig.MAX_CONSECUTIVE_DAYS,
+        min_rest: int = ScheduleConfig.MIN_REST_DAYS,
+        weekend_weight: int = WEEKEND_WEIGHT
+) -> np.ndarray:
+    """
+    Staffs every day with the workers who can least afford another day off.
+
+    A worker's budget is the number of days off they may still take: their requested
+    total minus the days off so far and their personal days still to come. Every day
+    that a worker does not work lowers the budget by one, so ordering by budget equals
+    ordering by a priority that only changes for the workers who work or have a personal
+    day off. The priorities live in two heaps, one for weekdays and one for weekends,
+    where every worked weekend day counts weekend_weight times against a worker. Ties
+    go to the shorter current streak, then to a random order.
+
+    Changed workers are pushed again with a new version and outdated entries are dropped
+    when they surface, so a day costs O(k log n) for k workers, plus the unavailable
+    workers met on the way. Days off come out right on the first pass, there is no
+    balancing pass afterwards.
+
+    Args:
+        off_mask (np.ndarray): The boolean workers x days mask of personal days off.
+        demand (np.ndarray): The required headcount for each day.
+        weekend (np.ndarray): The boolean mask of the weekend days.
+        dict_days (List[int]): A list where each element represents the total number of days off for a worker.
+        rng (np.random.Generator): The random generator used to break ties.
+        state (Optional[WorkerState]): The running counters, updated in place. Fresh counters are used if omitted.
+        max_consecutive (int): The maximum number of consecutive working days.
+        min_rest (int): The number of days off required after a maximal working streak.
+        weekend_weight (int): How many days of budget a worked weekend day weighs on weekends.
+
+    Returns:
+        np.ndarray: The workers x days schedule matrix.
+    """
+    workers, days = off_mask.shape
+    state = state if state is not None else WorkerState(workers)
+    matrix = np.zeros((workers, days), dtype=np.int8)
+
+    priority = (
+        np.asarray(dict_days, dtype=np.int64) - state.days_off - off_mask.sum(axis=1)
+    ).tolist()
+    weekends = [0] * workers
+    version = [0] * workers
+    ties = rng.random(workers).tolist()
+    weekday_heap = [(priority[i], int(state.streak[i]), ties[i], 0, i) for i in range(workers)]
+    weekend_heap = list(weekday_heap)
+    heapq.heapify(weekday_heap)
+    heapq.heapify(weekend_heap)
+
+    previous: List[int] = []
+    for day in range(days):
+        heap = weekend_heap if weekend[day] else weekday_heap
+        available = (~off_mask[:, day] & state.available(max_consecutive)).tolist()
+        chosen: List[int] = []
+        skipped = []
+        while len(chosen) < demand[day] and heap:
+            entry = heapq.heappop(heap)
+            worker = entry[-1]
+            if entry[-2] != version[worker]:
+                continue
+            if available[worker]:
+                chosen.append(worker)
+            else:
+                skipped.append(entry)
+        for entry in skipped:
+            heapq.heappush(heap, entry)
+
+        # Workers whose budget only covers the rest days still to come work even on a fully
+        # staffed day, as the balancing pass would have them. The threshold is the same for
+        # everybody, so they are the top of the weekday heap.
+        reserve = (days - day) * min_rest // (max_consecutive + min_rest)
+        taken = set(chosen)
+        skipped = []
+        while weekday_heap and weekday_heap[0][0] - day <= reserve:
+            entry = heapq.heappop(weekday_heap)
+            worker = entry[-1]
+            if entry[-2] != version[worker] or worker in taken:
+                continue
+            if available[worker]:
+                chosen.append(worker)
+            else:
+                skipped.append(entry)
+        for entry in skipped:
+            heapq.heappush(weekday_heap, entry)
+
+        matrix[chosen, day] = WORK
+        state.advance(matrix[:, day] == WORK, max_consecutive, min_rest)
+
+        changed = set(chosen)
+        changed.update(worker for worker in previous if worker not in changed)
+        for worker in chosen:
+            priority[worker] += 1
+            weekends[worker] += int(weekend[day])
+        for worker in np.flatnonzero(off_mask[:, day]).tolist():
+            priority[worker] += 1
+            changed.add(worker)
+        streaks = state.streak.tolist()
+        for worker, tie in zip(changed, rng.random(len(changed)).tolist()):
+            version[worker] += 1
+            key = (streaks[worker], tie, version[worker], worker)
+            heapq.heappush(weekday_heap, (priority[worker],) + key)
+            heapq.heappush(weekend_heap, (priority[worker] + weekend_weight * weekends[worker],) + key)
+        previous = chosen
+
+    return matrix
+
+
+def build_fair_schedule(
+        dict_days: List[int],
+        off_days: List[List[int]],
+        start_weekday: int,
+        weekly_plan: Dict[str, int],
+        days_in_month: int,
+        rng: Optional[np.random.Generator] = None,
+        state: Optional[WorkerState] = None,
+        max_consecutive: int = ScheduleConfig.MAX_CONSECUTIVE_DAYS,
+        min_rest: int = ScheduleConfig.MIN_REST_DAYS
+) -> np.ndarray:
+    """
+    Generates a validated schedule matrix with fair_rotation.
+
+    Args:
+        dict_days (List[int]): A list where each element represents the total number of days off for a worker.
+        off_days (List[List[int]]): A list of lists where each sublist contains the specific days a worker is unavailable.
+        start_weekday (int): The starting day of the week (0 = Monday, 6 = Sunday).
+        weekly_plan (Dict[str, int]): A dictionary mapping weekdays to the required number of workers.
+        days_in_month (int): The number of days in the month.
+        rng (Optional[np.random.Generator]): The random generator, a fresh one is used if omitted.
+        state (Optional[WorkerState]): The counters carried over from the previous period, updated in place.
+        max_consecutive (int): The maximum number of consecutive working days.
+        min_rest (int): The number of days off required after a maximal working streak.
+
+    Returns:
+        np.ndarray: The workers x days schedule matrix.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    demand = weekly_demand(weekly_plan, start_weekday, days_in_month)
+    off_mask = off_day_mask(off_days, days_in_month)
+    weekend = (start_weekday + np.arange(days_in_month)) % 7 >= 5
+
+    matrix = fair_rotation(
+        off_mask, demand, weekend, dict_days, rng, state, max_consecutive, min_rest
+    )
+    return mark_uncovered(matrix, demand)
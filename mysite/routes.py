@@ -1,11 +1,20 @@
 import os
 import uuid
+from functools import partial
+from typing import List, Optional
 
-import pandas as pd
-from flask import Blueprint, render_template, request, session
+from flask import (Blueprint, Response, jsonify, render_template, request,
+                   send_file, session)
 
+from .bitset import CompactSchedule
+from .drafts import load_draft
+from .mailer import mail_queue
+from .metrics import STAGE_SECONDS
 from .models import First, Second, Third, db
-from .processor import data_readable, process_data, search_folder, send_email
+from .preview import preview_page, summarize
+from .processor import (EXPORT_TYPES, discard_exports, ensure_export, iter_csv,
+                        latest_schedule, process_data, save_roster)
+from .roster import ROSTER_TYPES, import_roster
 
 admin = Blueprint('admin', __name__)
 
@@ -82,7 +91,7 @@ def second_step() -> str:
 def third_step() -> str:
     """
     Handles the third step where a list of names, days, and personal days is collected.
-    On POST request, it saves the data to the database.
+    On POST request, it saves the data to the database in a single transaction.
 
     Returns:
         str: The rendered HTML template for the third step.
@@ -95,29 +104,51 @@ def third_step() -> str:
         if not user_id:
             return render_template('main_page.html')
 
-        for name, day, personal in zip(names, days, personal):
-            new_entry = Second(
-                name=name,
-                days=day,
-                personal=personal,
-                user_id=user_id
-            )
-            db.session.add(new_entry)
-            db.session.commit()
+        save_roster(user_id, names, days, personal)
 
         return render_template('third_step.html')
 
     return render_template('third_step.html')
 
 
+@admin.route('/upload_roster', methods=['POST'])
+def upload_roster() -> str:
+    """
+    Handles the third step with an uploaded CSV or XLSX roster instead of the form rows.
+    The file is parsed and saved in chunks, the rows with errors are shown with their line numbers.
+
+    Returns:
+        str: The rendered HTML template for the third step, or the second step with the errors.
+    """
+    user_id = session.get('user_id')
+    if not user_id:
+        return render_template('main_page.html')
+
+    upload = request.files.get('roster')
+    file_type = os.path.splitext(upload.filename)[1].lstrip('.').lower() if upload else ''
+    if file_type not in ROSTER_TYPES:
+        errors = ['Upload a .csv or .xlsx file with the columns name, days and personal']
+    else:
+        errors = [str(error) for error in import_roster(user_id, upload.stream, file_type).errors]
+
+    if errors:
+        return render_template(
+            'second_step.html',
+            number=request.form.get('number', 0, type=int),
+            upload_errors=errors
+        )
+    return render_template('third_step.html')
+
+
 @admin.route('/fourth_step', methods=['GET', 'POST'])
 def fourth_step() -> str:
     """
     Handles the fourth step where the weekly schedule is saved, and the schedule is processed.
-    On POST request, the schedule is generated and displayed as an HTML table.
+    On POST request, the schedule is generated and its first page of workers is displayed.
+    On GET request, the page given by the 'page' query argument of the latest schedule is displayed.
 
     Returns:
-        str: The rendered HTML template for the fourth step with the schedule table.
+        str: The rendered HTML template for the fourth step with the schedule preview.
     """
     if request.method == 'POST':
         monday = request.form.get('monday')
@@ -146,29 +177,68 @@ def fourth_step() -> str:
         db.session.add(new_entry)
         db.session.commit()
 
-        first_data = First.query.filter_by(user_id=user_id).all()
-        second_data = Second.query.filter_by(user_id=user_id).all()
-        third_data = Third.query.filter_by(user_id=user_id).all()
+        with STAGE_SECONDS.time(stage='load_draft'):
+            draft = load_draft(user_id)
+        if draft is None:
+            return render_template('main_page.html')
+        df, feasibility = process_data(draft, user_id)
 
-        data = data_readable([first_data, second_data, third_data])
-        process_data(data, user_id)
-        df = pd.read_csv(search_folder(user_id, 'csv'))
+        latest = latest_schedule(user_id)
+        compact = latest[1] if latest else CompactSchedule.from_frame(df, draft.off_days)
+        return render_preview(compact, 1, feasibility.messages())
 
-        table_html = df.to_html(classes='table table-striped table-bordered')
+    latest = latest_schedule(session.get('user_id'))
+    if latest is None:
+        return render_template('fourth_step.html')
+    return render_preview(latest[1], request.args.get('page', 1, type=int))
 
-        return render_template(
-            'fourth_step.html',
-            table_html=table_html
-        )
 
-    return render_template('fourth_step.html')
+def render_preview(
+        compact: CompactSchedule,
+        page: int,
+        diagnostics: Optional[List[str]] = None
+) -> str:
+    """
+    Renders the fourth step with one page of the schedule and the summary of all of it.
+
+    Args:
+        compact (CompactSchedule): The schedule.
+        page (int): The page of workers to display.
+        diagnostics (Optional[List[str]]): The staffing problems of the draft.
+
+    Returns:
+        str: The rendered HTML template for the fourth step.
+    """
+    with STAGE_SECONDS.time(stage='preview'):
+        preview = preview_page(compact, page)
+        summary = summarize(compact)
+    return render_template(
+        'fourth_step.html',
+        preview=preview,
+        summary=summary,
+        diagnostics=diagnostics
+    )
+
+
+@admin.route('/preview', methods=['GET'])
+def preview_rows() -> Response:
+    """
+    Returns a page of workers of the user's latest schedule for the preview table.
+
+    Returns:
+        Response: The page as JSON, or a 404 status code if there is no schedule.
+    """
+    latest = latest_schedule(session.get('user_id'))
+    if latest is None:
+        return jsonify({'error': 'no schedule'}), 404
+    return jsonify(preview_page(latest[1], request.args.get('page', 1, type=int)).to_json())
 
 
 @admin.route('/fifth_step', methods=['POST'])
 def fifth_step() -> str:
     """
     Handles the fifth step where the user can enter an email and request to send the generated schedule file.
-    On POST request, the email is sent with the file as an attachment.
+    On POST request, the email with the file as an attachment is queued for background delivery.
 
     Returns:
         str: The rendered HTML template for the fifth step.
@@ -182,8 +252,8 @@ def fifth_step() -> str:
         return render_template('main_page.html')
 
     if send_file_button:
-        send_email(email, search_folder(user_id, file_type))
-        return render_template('main_page.html')
+        job_id = mail_queue.submit(email, partial(ensure_export, user_id, file_type))
+        return render_template('main_page.html', job_id=job_id)
 
     return render_template(
         'fifth_step.html',
@@ -191,6 +261,59 @@ def fifth_step() -> str:
     )
 
 
+@admin.route('/download/<file_type>', methods=['GET'])
+def download(file_type: str) -> Response:
+    """
+    Sends the user's schedule file.
+
+    CSV is streamed in chunks from the cached compact schedule, XLSX and schedules no longer
+    in the cache are sent from the exported file. Both carry an ETag, so a repeated
+    download with If-None-Match returns 304.
+
+    Args:
+        file_type (str): The type of file, 'csv' or 'xlsx'.
+
+    Returns:
+        Response: The file, a 304 status code if unchanged, or a 404 status code if there is none.
+    """
+    user_id = session.get('user_id')
+    if not user_id or file_type not in EXPORT_TYPES:
+        return '', 404
+    download_name = f'schedule.{file_type}'
+
+    latest = latest_schedule(user_id) if file_type == 'csv' else None
+    if latest is not None:
+        key, compact = latest
+        response = Response(iter_csv(compact), mimetype='text/csv')
+        response.set_etag(key)
+        response.headers['Content-Disposition'] = f'attachment; filename="{download_name}"'
+        return response.make_conditional(request)
+
+    path = ensure_export(user_id, file_type)
+    if not os.path.exists(path):
+        return '', 404
+    return send_file(
+        path, as_attachment=True, download_name=download_name, conditional=True, etag=True
+    )
+
+
+@admin.route('/email_status/<job_id>', methods=['GET'])
+def email_status(job_id: str) -> Response:
+    """
+    Returns the delivery status of a queued email.
+
+    Args:
+        job_id (str): The job id returned when the email was queued.
+
+    Returns:
+        Response: The job status as JSON, or a 404 status code if the job is unknown.
+    """
+    status = mail_queue.status(job_id)
+    if status is None:
+        return jsonify({'error': 'unknown job'}), 404
+    return jsonify(status)
+
+
 @admin.route('/cleanup_session', methods=['POST'])
 def cleanup_session() -> str:
     """
@@ -210,6 +333,7 @@ def cleanup_session() -> str:
         db.session.query(Third).filter_by(user_id=user_id).delete()
         db.session.commit()
 
+        discard_exports(user_id)
         file_paths = [
             os.path.join('schedule', f'{user_id}.csv'),
             os.path.join('schedule', f'{user_id}.xlsx')
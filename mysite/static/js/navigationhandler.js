@@ -1,6 +1,12 @@
-export function setupNavigation() {
-    let isNavigation = false;
+let isNavigation = false;
+
+// Pages that leave by setting window.location themselves call this first,
+// so the unload does not count as closing the wizard.
+export function markNavigation() {
+    isNavigation = true;
+}
 
+export function setupNavigation() {
     document.addEventListener('click', function (event) {
         const target = event.target;
         if (target.tagName === 'A' || target.closest('a')) {
@@ -0,0 +1,87 @@
+import { markNavigation } from './navigationhandler.js';
+
+export function setupPreview() {
+    const pager = document.getElementById('schedule-pager');
+    const body = document.getElementById('schedule-rows');
+    const position = document.getElementById('schedule-position');
+    if (!pager || !body) {
+        return;
+    }
+
+    const pages = new Map();
+    let current = Number(pager.dataset.page);
+    const total = Number(pager.dataset.pages);
+
+    function fetchPage(page) {
+        if (!pages.has(page)) {
+            const request = fetch(`${pager.dataset.url}?page=${page}`)
+                .then((response) => {
+                    if (!response.ok) {
+                        throw new Error(`preview page ${page}: ${response.status}`);
+                    }
+                    return response.json();
+                });
+            request.catch(() => pages.delete(page));
+            pages.set(page, request);
+        }
+        return pages.get(page);
+    }
+
+    function renderRow(row) {
+        const tr = document.createElement('tr');
+        const name = document.createElement('th');
+        name.textContent = row.name;
+        tr.appendChild(name);
+        for (const value of [...row.cells, row.days_worked]) {
+            const cell = document.createElement('td');
+            cell.textContent = value;
+            tr.appendChild(cell);
+        }
+        return tr;
+    }
+
+    function renderPage(data) {
+        body.replaceChildren(...data.rows.map(renderRow));
+        current = data.page;
+        const first = Math.min((data.page - 1) * data.per_page + 1, data.total);
+        const last = (data.page - 1) * data.per_page + data.rows.length;
+        position.textContent =
+            `Workers ${first}–${last} of ${data.total}, page ${data.page} / ${data.pages}`;
+
+        for (const link of pager.querySelectorAll('[data-step]')) {
+            const target = current + Number(link.dataset.step);
+            link.classList.toggle('disabled', target < 1 || target > total);
+            link.href = `?page=${target}`;
+        }
+        for (const neighbour of [current - 1, current + 1]) {
+            if (neighbour >= 1 && neighbour <= total) {
+                fetchPage(neighbour);
+            }
+        }
+    }
+
+    pager.addEventListener('click', (event) => {
+        const link = event.target.closest('[data-step]');
+        if (!link) {
+            return;
+        }
+        // Paging stays on this page, so it must not count as leaving it for the session cleanup.
+        event.preventDefault();
+        event.stopPropagation();
+        const target = current + Number(link.dataset.step);
+        if (target < 1 || target > total) {
+            return;
+        }
+        fetchPage(target).then(renderPage).catch(() => {
+            // The server-rendered page needs the draft and the schedule the cleanup would delete.
+            markNavigation();
+            window.location.href = link.href;
+        });
+    });
+
+    for (const neighbour of [current - 1, current + 1]) {
+        if (neighbour >= 1 && neighbour <= total) {
+            fetchPage(neighbour);
+        }
+    }
+}
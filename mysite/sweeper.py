@@ -0,0 +1,231 @@
+import logging
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional, Set
+
+from flask import Flask
+from sqlalchemy import delete, func, literal, select, union_all
+
+from .config import SweeperConfig
+from .metrics import metrics
+from .models import First, Second, Third, db
+from .processor import discard_exports
+
+logger = logging.getLogger(__name__)
+
+DRAFT_MODELS = (First, Second, Third)
+
+SWEPT = metrics.counter(
+    'schedule_swept_total', 'Rows, files and bytes reclaimed by the draft sweeper.', ('kind',)
+)
+
+
+def _draft_ages():
+    """
+    Returns a subquery with the last activity of every user that has draft rows.
+
+    Rows created before the created_at column existed have no timestamp and count as
+    the oldest possible activity.
+    """
+    rows = union_all(*(
+        select(
+            model.user_id.label('user_id'),
+            func.coalesce(model.created_at, literal(datetime.min)).label('created_at')
+        )
+        for model in DRAFT_MODELS
+    )).subquery()
+    return (
+        select(rows.c.user_id, func.max(rows.c.created_at).label('last_seen'))
+        .where(rows.c.user_id.is_not(None))
+        .group_by(rows.c.user_id)
+        .subquery()
+    )
+
+
+def stale_users(
+        cutoff: datetime
+) -> List[str]:
+    """
+    Returns the users whose newest draft row is older than the cutoff.
+    """
+    ages = _draft_ages()
+    statement = select(ages.c.user_id).where(ages.c.last_seen < cutoff)
+    return list(db.session.scalars(statement))
+
+
+def active_users(
+        cutoff: datetime
+) -> Set[str]:
+    """
+    Returns the users with a draft row created at or after the cutoff.
+    """
+    ages = _draft_ages()
+    statement = select(ages.c.user_id).where(ages.c.last_seen >= cutoff)
+    return set(db.session.scalars(statement))
+
+
+def _batches(
+        items: List[str],
+        size: int
+) -> Iterator[List[str]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def file_owner(
+        file_name: str
+) -> str:
+    """
+    Returns the user ID a schedule file belongs to, e.g. 'abc' for 'abc.csv' and 'abc_2025-01.xlsx'.
+    """
+    stem = os.path.splitext(file_name)[0]
+    return stem.split('_', 1)[0]
+
+
+def sweep_drafts(
+        ttl: timedelta,
+        batch_size: int = SweeperConfig.BATCH_SIZE,
+        folder: Optional[str] = None,
+        now: Optional[datetime] = None
+) -> Dict[str, int]:
+    """
+    Deletes the drafts not touched within the TTL and the schedule files nobody owns any more.
+
+    Stale users are deleted in batches, one DELETE ... WHERE user_id IN (...) per table and
+    batch, each batch in its own transaction so the tables are never locked for long. Their
+    schedule files go with them, as do files older than the TTL whose user has no fresh draft.
+    Must be called inside an app context.
+
+    Args:
+        ttl (timedelta): How long a draft is kept after its last row was written.
+        batch_size (int): The number of users deleted per transaction.
+        folder (Optional[str]): The schedule folder, the one in the working directory by default.
+        now (Optional[datetime]): The current UTC time, for testing.
+
+    Returns:
+        Dict[str, int]: The reclaimed users, rows per table, files and bytes.
+    """
+    now = now or datetime.utcnow()
+    cutoff = now - ttl
+    folder = folder or os.path.join(os.getcwd(), 'schedule')
+    reclaimed = {'users': 0, 'files': 0, 'bytes': 0}
+    reclaimed.update({model.__tablename__: 0 for model in DRAFT_MODELS})
+
+    for batch in _batches(stale_users(cutoff), batch_size):
+        try:
+            for model in DRAFT_MODELS:
+                result = db.session.execute(
+                    delete(model).where(model.user_id.in_(batch)),
+                    execution_options={'synchronize_session': False}
+                )
+                reclaimed[model.__tablename__] += result.rowcount
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        reclaimed['users'] += len(batch)
+        for user_id in batch:
+            discard_exports(user_id)
+
+    if os.path.isdir(folder):
+        keep = active_users(cutoff)
+        expired = cutoff.replace(tzinfo=timezone.utc).timestamp()
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                if not entry.is_file() or file_owner(entry.name) in keep:
+                    continue
+                stat = entry.stat()
+                if stat.st_mtime >= expired:
+                    continue
+                try:
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    continue
+                reclaimed['files'] += 1
+                reclaimed['bytes'] += stat.st_size
+
+    for kind, amount in reclaimed.items():
+        if amount:
+            SWEPT.inc(amount, kind=kind)
+    return reclaimed
+
+
+class DraftSweeper:
+    """
+    Background thread running sweep_drafts at a fixed interval inside the app context.
+
+    Requests never wait for it; the browser's cleanup_session beacon stays the fast path
+    and the sweeper only collects what it missed.
+    """
+
+    def __init__(
+            self,
+            app: Flask,
+            ttl: timedelta,
+            interval: float,
+            batch_size: int = SweeperConfig.BATCH_SIZE
+    ) -> None:
+        self.app = app
+        self.ttl = ttl
+        self.interval = interval
+        self.batch_size = batch_size
+        self.last: Optional[Dict[str, int]] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+
+    def run_once(self) -> Dict[str, int]:
+        """
+        Sweeps now and returns what was reclaimed.
+        """
+        with self.app.app_context():
+            reclaimed = sweep_drafts(self.ttl, self.batch_size)
+        self.last = reclaimed
+        if reclaimed['users'] or reclaimed['files']:
+            logger.info('draft sweeper reclaimed %s', reclaimed)
+        return reclaimed
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name='draft-sweeper', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self) -> None:
+        while not self._stopping.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception('draft sweep failed')
+
+
+def start_sweeper(
+        app: Flask
+) -> Optional[DraftSweeper]:
+    """
+    Starts the draft sweeper if SWEEPER_ENABLED is set in the app config.
+
+    Args:
+        app (Flask): The Flask application instance.
+
+    Returns:
+        Optional[DraftSweeper]: The running sweeper, also stored in app.extensions['draft_sweeper'].
+    """
+    if not app.config.get('SWEEPER_ENABLED', False):
+        return None
+    sweeper = DraftSweeper(
+        app,
+        timedelta(hours=app.config.get('DRAFT_TTL_HOURS', SweeperConfig.DRAFT_TTL_HOURS)),
+        app.config.get('SWEEP_INTERVAL', SweeperConfig.INTERVAL),
+        app.config.get('SWEEP_BATCH_SIZE', SweeperConfig.BATCH_SIZE)
+    )
+    app.extensions['draft_sweeper'] = sweeper
+    sweeper.start()
+    return sweeper
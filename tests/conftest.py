@@ -0,0 +1,32 @@
+import threading
+
+import pytest
+
+from benchmarks.smtp_sink import SmtpSink
+
+
+@pytest.fixture
+def smtp_server():
+    server = SmtpSink()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    from mysite.app import create_app
+    from mysite.config import TestConfig
+    from mysite.processor import create_database_structure
+
+    class Config(TestConfig):
+        KEY = 'test'
+        METRICS_ENABLED = False
+        SWEEPER_ENABLED = False
+
+    monkeypatch.chdir(tmp_path)
+    app = create_app(Config)
+    create_database_structure(app)
+    with app.app_context():
+        yield app
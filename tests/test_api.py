@@ -0,0 +1,86 @@
+import pytest
+
+DRAFT = {
+    'creator': 'Ann',
+    'firm_name': 'Shop',
+    'week': [1, 1, 1, 1, 1, 1, 1],
+    'workers': [{'name': 'Bob', 'days': 8, 'personal': [3]}, {'name': 'Eve', 'days': 8}],
+    'year': 2025,
+    'month': 3,
+    'seed': 1
+}
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def test_replan_changes_a_schedule(client):
+    schedule = client.post('/api/schedule', json={**DRAFT, 'restarts': 1}).get_json()
+
+    response = client.post('/api/replan', json={
+        **DRAFT, 'schedule': schedule['schedule'],
+        'delta': {'type': 'personal', 'name': 'Eve', 'personal': [10]}
+    })
+
+    assert response.status_code == 200
+    assert [row['name'] for row in response.get_json()['schedule']] == ['Bob', 'Eve']
+
+
+@pytest.mark.parametrize('rows', [
+    [['x'], ['y']],
+    ['Bob', 'Eve'],
+    [{'name': 'Bob', 'cells': [['+']] * 31}, {'name': 'Eve', 'cells': ['+'] * 31}],
+    [{'name': 'Bob', 'cells': ['+'] * 30}, {'name': 'Eve', 'cells': ['+'] * 31}]
+])
+def test_replan_rejects_malformed_schedule(client, rows):
+    response = client.post('/api/replan', json={
+        **DRAFT, 'schedule': rows, 'delta': {'type': 'remove_worker', 'name': 'Bob'}
+    })
+
+    assert response.status_code == 400
+    assert response.get_json()['error'].startswith('schedule[0] must be Bob')
+
+
+@pytest.mark.parametrize('change, message', [
+    ({'seed': -1}, 'seed must be at least 0'),
+    ({'seed': True}, 'seed must be an integer'),
+    ({'month': 0}, 'month must be between 1 and 12'),
+    ({'year': 0}, 'year must be between 1 and 9999'),
+    ({'restarts': 0}, 'restarts must be between 1 and 32'),
+    ({'workers': [{'name': 'Bob', 'days': 8}, {'name': 'Bob', 'days': 9}]},
+     'workers[1]: the name Bob is used twice')
+])
+def test_schedule_rejects_invalid_options(client, change, message):
+    response = client.post('/api/schedule', json={**DRAFT, **change})
+
+    assert response.status_code == 400
+    assert response.get_json() == {'error': message}
+
+
+def test_replan_rejects_a_second_worker_with_the_same_name(client):
+    schedule = client.post('/api/schedule', json=DRAFT).get_json()
+
+    response = client.post('/api/replan', json={
+        **DRAFT, 'schedule': schedule['schedule'],
+        'delta': {'type': 'add_worker', 'worker': {'name': 'Bob', 'days': 8}}
+    })
+
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'delta.worker: the name Bob is already used'}
+
+
+def test_locations_reject_too_many_workers_in_total(client, monkeypatch):
+    from mysite.config import ScheduleConfig
+
+    monkeypatch.setattr(ScheduleConfig, 'API_MAX_TOTAL_WORKERS', 3)
+    response = client.post('/api/locations', json={
+        **DRAFT, 'locations': [
+            {'name': 'North', 'workers': DRAFT['workers'], 'week': DRAFT['week']},
+            {'name': 'South', 'workers': DRAFT['workers'], 'week': DRAFT['week']}
+        ]
+    })
+
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'the locations hold 4 workers, at most 3 are accepted'}
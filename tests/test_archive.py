@@ -0,0 +1,84 @@
+import multiprocessing
+
+import numpy as np
+
+from mysite.archive import ScheduleArchive
+from mysite.bitset import CompactSchedule
+from mysite.engine import WORK
+
+MONTHS = 6
+
+
+def make_schedule(
+        names,
+        days_worked,
+        days_in_month=30
+):
+    matrix = np.zeros((len(names), days_in_month), dtype=np.int8)
+    matrix[:, :days_worked] = WORK
+    columns = [str(day) for day in range(1, days_in_month + 1)]
+    return CompactSchedule.from_matrix(matrix, names, columns, firm_name='Shop')
+
+
+def append_months(
+        folder,
+        prefix,
+        days_worked,
+        start
+):
+    archive = ScheduleArchive(folder, max_segments=4)
+    names = [f'{prefix}{index}' for index in range(20)]
+    start.wait()
+    for month in range(1, MONTHS + 1):
+        archive.append(make_schedule(names, days_worked), 2024, month)
+
+
+def test_append_from_two_processes(tmp_path):
+    folder = str(tmp_path)
+    context = multiprocessing.get_context('spawn')
+    start = context.Event()
+    writers = [
+        context.Process(target=append_months, args=(folder, prefix, days, start))
+        for prefix, days in (('a', 10), ('b', 20))
+    ]
+    for writer in writers:
+        writer.start()
+    start.set()
+    for writer in writers:
+        writer.join(60)
+        assert writer.exitcode == 0
+
+    worked = ScheduleArchive(folder).days_worked(firm='Shop')
+    expected = {f'a{index}': MONTHS * 10 for index in range(20)}
+    expected.update({f'b{index}': MONTHS * 20 for index in range(20)})
+    assert worked == expected
+
+
+def test_reader_sees_workers_added_by_another_process(tmp_path):
+    folder = str(tmp_path)
+    reader = ScheduleArchive(folder)
+    reader.append(make_schedule(['Anna'], 5), 2024, 1)
+    assert reader.days_worked() == {'Anna': 5}
+
+    context = multiprocessing.get_context('spawn')
+    start = context.Event()
+    start.set()
+    writer = context.Process(target=append_months, args=(folder, 'new', 3, start))
+    writer.start()
+    writer.join(60)
+    assert writer.exitcode == 0
+
+    worked = reader.days_worked()
+    assert worked['Anna'] == 5
+    assert worked['new19'] == MONTHS * 3
+    assert reader.worker_days() == 30 + 20 * MONTHS * 30
+
+
+def test_latest_row_of_a_worker_month_counts(tmp_path):
+    archive = ScheduleArchive(str(tmp_path))
+    archive.append(make_schedule(['Anna', 'Boris'], 5), 2024, 1)
+    archive.append(make_schedule(['Anna'], 8), 2024, 1)
+    assert archive.days_worked() == {'Anna': 8, 'Boris': 5}
+
+    archive.compact()
+    assert archive.days_worked() == {'Anna': 8, 'Boris': 5}
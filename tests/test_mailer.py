@@ -0,0 +1,104 @@
+import pytest
+
+from mysite.mailer import MailQueue
+
+
+@pytest.fixture
+def attachment(tmp_path):
+    path = tmp_path / 'schedule.csv'
+    path.write_text('Name,1\nAnna,+\n')
+    return str(path)
+
+
+@pytest.fixture
+def make_queue(smtp_server):
+    queues = []
+
+    def make(**options):
+        options.setdefault('backoff', 0.01)
+        options.setdefault('idle_timeout', 0.5)
+        mail_queue = MailQueue('127.0.0.1', smtp_server.server_address[1], use_ssl=False, **options)
+        queues.append(mail_queue)
+        return mail_queue
+
+    yield make
+    for mail_queue in queues:
+        mail_queue.stop(timeout=5)
+
+
+def test_sends_attachment(smtp_server, make_queue, attachment):
+    mail_queue = make_queue()
+    job_id = mail_queue.submit('anna@example.com', attachment)
+
+    assert mail_queue.join(timeout=5)
+    assert mail_queue.status(job_id)['status'] == 'sent'
+    assert smtp_server.messages[0]['to'] == ['anna@example.com']
+    assert b'schedule.csv' in smtp_server.messages[0]['body']
+
+
+def test_reuses_connection_for_a_batch(smtp_server, make_queue, attachment):
+    mail_queue = make_queue()
+    for index in range(5):
+        mail_queue.submit(f'worker{index}@example.com', attachment)
+
+    assert mail_queue.join(timeout=5)
+    assert mail_queue.stats()['sent'] == 5
+    assert smtp_server.connections == 1
+
+
+def test_retries_with_backoff(smtp_server, make_queue, attachment):
+    smtp_server.refuse = 2
+    mail_queue = make_queue(max_retries=3)
+    job_id = mail_queue.submit('anna@example.com', attachment)
+
+    assert mail_queue.join(timeout=5)
+    assert mail_queue.status(job_id) == {'id': job_id, 'status': 'sent', 'attempts': 3, 'error': None}
+    assert mail_queue.stats()['retries'] == 2
+    assert len(smtp_server.messages) == 1
+
+
+def test_fails_after_max_retries(smtp_server, make_queue, attachment):
+    smtp_server.refuse = 10
+    mail_queue = make_queue(max_retries=1)
+    job_id = mail_queue.submit('anna@example.com', attachment)
+
+    assert mail_queue.join(timeout=5)
+    status = mail_queue.status(job_id)
+    assert status['status'] == 'failed'
+    assert status['attempts'] == 2
+    assert 'try again later' in status['error']
+
+
+def test_failing_attachment_keeps_worker_alive(smtp_server, make_queue, attachment):
+    mail_queue = make_queue()
+
+    def broken_export():
+        raise ValueError('cannot export')
+
+    failed = mail_queue.submit('broken@example.com', broken_export)
+    missing = mail_queue.submit('missing@example.com', attachment + '.missing')
+    sent = mail_queue.submit('anna@example.com', lambda: attachment)
+
+    assert mail_queue.join(timeout=5)
+    assert mail_queue.status(failed) == {
+        'id': failed, 'status': 'failed', 'attempts': 1, 'error': 'cannot export'
+    }
+    assert mail_queue.status(missing)['status'] == 'failed'
+    assert mail_queue.status(missing)['attempts'] == 1
+    assert mail_queue.status(sent)['status'] == 'sent'
+    assert mail_queue.stats()['retries'] == 0
+    # The local failures do not drop the pooled connection.
+    assert smtp_server.connections == 1
+
+
+def test_closes_idle_connection_while_a_retry_waits(smtp_server, make_queue, attachment):
+    smtp_server.refuse = 1
+    mail_queue = make_queue(backoff=0.5, idle_timeout=0.1)
+    retried = mail_queue.submit('anna@example.com', attachment)
+    sent = mail_queue.submit('bob@example.com', attachment)
+
+    assert mail_queue.join(timeout=5)
+    assert mail_queue.status(sent)['attempts'] == 1
+    assert mail_queue.status(retried)['status'] == 'sent'
+    # The refused send drops the first connection, the idle one is closed before the retry.
+    assert smtp_server.connections == 3
@@ -0,0 +1,21 @@
+from flask import Flask
+from sqlalchemy import create_engine
+
+from mysite.metrics import instrument_app, metrics
+
+
+def test_an_app_without_metrics_keeps_collection_of_another_on(monkeypatch):
+    monkeypatch.setattr(metrics, 'enabled', False)
+    instrumented = Flask('instrumented')
+    instrumented.config['METRICS_ENABLED'] = True
+    plain = Flask('plain')
+
+    engine = create_engine('sqlite://')
+
+    instrument_app(instrumented, lambda: engine)
+    instrument_app(plain, lambda: engine)
+
+    assert metrics.enabled
+    assert instrumented.extensions['metrics'] is True
+    assert plain.extensions['metrics'] is False
+    assert not plain.before_request_funcs
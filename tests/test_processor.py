@@ -0,0 +1,69 @@
+import os
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from mysite import processor
+from mysite.config import WeekConfig
+
+
+@pytest.fixture
+def fresh_pool():
+    processor._pool = None
+    yield
+    if processor._pool is not None:
+        processor._pool.shutdown()
+        processor._pool = None
+
+
+def test_pool_does_not_fork_the_web_process(fresh_pool):
+    method = processor._get_pool()._mp_context.get_start_method()
+    assert method in ('forkserver', 'spawn')
+
+
+def test_broken_pool_is_replaced(fresh_pool):
+    with pytest.raises(BrokenProcessPool):
+        processor.pool_map(os._exit, [1])
+
+    assert processor.pool_map(abs, [-1, -2]) == [1, 2]
+
+
+def test_restarts_run_on_the_pool(fresh_pool):
+    plan = {day: 2 for day in WeekConfig.WEEKDAYS.values()}
+    args = ('fair', [8, 8, 9, 9], [[3], [], [], [14]], 5, plan, 31)
+
+    first = processor.generate_best_schedule(*args, seed=7, restarts=3, time_budget=0.1)
+    second = processor.generate_best_schedule(*args, seed=7, restarts=3, time_budget=0.1)
+
+    assert (first.matrix == second.matrix).all()
+
+
+def test_draft_records_are_picked_by_key():
+    from mysite.drafts import draft_from_records
+
+    records = [
+        {'id': 1, 'week': "['1', '2', '2', '2', '2', '3', '3']"},
+        {'id': 2, 'name': 'Bob', 'days': 8, 'personal': '3,14'},
+        {'id': 1, 'creator': 'Ann', 'firm_name': 'Shop', 'number': 2},
+        {'id': 3, 'name': 'Eve', 'days': 9, 'personal': ''}
+    ]
+
+    draft = draft_from_records(records)
+
+    assert (draft.creator, draft.firm_name) == ('Ann', 'Shop')
+    assert draft.names == ['Bob', 'Eve']
+    assert draft.off_days == [[3, 14], []]
+    assert draft.week == (1, 2, 2, 2, 2, 3, 3)
+
+
+def test_infeasible_month_skips_the_search():
+    plan = {day: 3 for day in WeekConfig.WEEKDAYS.values()}
+    off_days = [[25], [25], [], []]
+
+    result = processor.generate_best_schedule(
+        'local_search', [8] * 4, off_days, 5, plan, 31, seed=1, time_budget=5.0
+    )
+
+    assert not result.feasibility.feasible
+    assert result.feasibility.shortages[0].day == 25
+    assert result.solve_time < 1.0
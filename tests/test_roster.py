@@ -0,0 +1,58 @@
+import io
+import zipfile
+
+import pytest
+
+from mysite.models import Second
+from mysite.roster import import_roster
+
+
+def zip_without_workbook():
+    data = io.BytesIO()
+    with zipfile.ZipFile(data, 'w') as archive:
+        archive.writestr('readme.txt', 'not a workbook')
+    return data.getvalue()
+
+
+@pytest.mark.parametrize('file_type, data', [
+    ('csv', b''),
+    ('csv', b'name,days,personal\n"Anna,8,1\n'),
+    ('csv', b'\xff\xfe\x00'),
+    ('xlsx', b'not a zip'),
+    ('xlsx', zip_without_workbook())
+])
+def test_unreadable_file_is_a_row_error(app, file_type, data):
+    result = import_roster('user', io.BytesIO(data), file_type)
+
+    assert result.saved == 0
+    assert [error.line for error in result.errors] == [1]
+    assert result.errors[0].message.startswith('cannot read file: ')
+    assert Second.query.count() == 0
+
+
+def test_imports_valid_rows(app):
+    data = b'name,days,personal\nAnna,8,1;2\nBoris,9,\n'
+    result = import_roster('user', io.BytesIO(data), 'csv')
+
+    assert result == (2, [])
+    assert [(row.name, row.days, row.personal) for row in Second.query.order_by(Second.name)] == [
+        ('Anna', 8, '1,2'), ('Boris', 9, '')
+    ]
+
+
+def test_extra_fields_are_personal_days(app):
+    data = b'name,days,personal\nEd,8,1,2\nAnna,8,\nBoris,9,3, 4;5\n'
+    result = import_roster('user', io.BytesIO(data), 'csv')
+
+    assert result == (3, [])
+    assert [(row.name, row.personal) for row in Second.query.order_by(Second.name)] == [
+        ('Anna', ''), ('Boris', '3,4,5'), ('Ed', '1,2')
+    ]
+
+
+def test_extra_fields_outside_personal_are_row_errors(app):
+    data = b'personal,name,days\n1,Anna,8\n1,Ed,8,9\n'
+    result = import_roster('user', io.BytesIO(data), 'csv')
+
+    assert result.saved == 0
+    assert result.errors == [(3, 'days off must be a whole number')]